@@ -0,0 +1,48 @@
+from requests.models import RequestEncodingMixin
+
+from resources.apis.sample_groups import Groups
+from utils.endpoints import template_endpoint
+
+
+class LocustGroups(Groups):
+    """
+    Groups api client which sends its requests through a Locust FastHttpUser client.
+
+    Endpoint definitions are inherited from Groups, only the transport is replaced so
+    the load suite and the functional suite always hit the same routes with the same params.
+    The response cache is always off: every request of the load suite has to hit the server.
+    """
+
+    def __init__(self, config, client, token):
+        """
+        :param config: environment config values.
+        :param client: FastHttpUser.client of the running user.
+        :param token: shared auth token, fetched once per process.
+        """
+
+        super().__init__(config, token)
+        self.client = client
+        # cached GETs would go through _fetch and never reach the Locust client or its stats
+        self.cache = None
+
+    def _request(self, method, url, endpoint, data=None, params=None, headers=None):
+        """Send request through the Locust client, grouping stats by templated endpoint.
+        :return: response json or None if request failed.
+        """
+
+        full_url = f'{url}{self.endpoint_version}{endpoint}'
+        if params:
+            full_url = f'{full_url}?{RequestEncodingMixin._encode_params(params)}'
+        with self.client.request(method, full_url,
+                                 name=f'{method} {template_endpoint(endpoint)}',
+                                 headers=headers if headers else self.headers,
+                                 json=data,
+                                 catch_response=True) as response:
+            if response.status_code >= 400:
+                response.failure(f'HTTP {response.status_code}')
+                return None
+            try:
+                return response.json()
+            except ValueError:
+                response.failure('Response is not valid json')
+                return None
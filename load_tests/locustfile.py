@@ -0,0 +1,104 @@
+"""
+Load suite for the Groups query and command endpoints.
+
+Local run:
+    python -m locust -f load_tests/locustfile.py --headless -u 50 -r 5 -t 5m --tempo-env qa --report-json reports/load.json
+
+Distributed run on one machine (see load_tests/run_local.py):
+    python -m locust -f load_tests/locustfile.py --master --expect-workers 4 ...
+    python -m locust -f load_tests/locustfile.py --worker (x4)
+"""
+import random
+from pathlib import Path
+
+import gevent
+from locust import FastHttpUser, between, events, task
+from locust.runners import MasterRunner, WorkerRunner
+
+from data.sample_groups_data import Group
+from load_tests.locust_groups import LocustGroups
+from load_tests.report import write_report
+from resources.apis.sample_groups import Groups
+from utils.config_loader import ConfigLoader
+
+_shared = {'token': None, 'config': None}
+
+
+@events.init_command_line_parser.add_listener
+def _(parser):
+    parser.add_argument('--tempo-env', default='qa', help='Environment config to load (qa, dev, prod)')
+    parser.add_argument('--report-json', default='', help='Write per-endpoint percentiles to this JSON file')
+
+
+@events.init.add_listener
+def on_init(environment, **kwargs):
+    config_path = Path(__file__).parent / f'../configs/{environment.parsed_options.tempo_env}.yaml'
+    _shared['config'] = ConfigLoader.load_config(config_path)
+    GroupsUser.host = GroupsUser.host or _shared['config']['tempo_configuration']['api_base_query_url']
+    if isinstance(environment.runner, WorkerRunner):
+        environment.runner.register_message('token', lambda message, **kw: _shared.update(token=message.data))
+        return
+    # Master and local runners fetch the token once; workers receive it from the master
+    _shared['token'] = Groups(_shared['config']).token
+
+
+@events.test_start.add_listener
+def on_test_start(environment, **kwargs):
+    if isinstance(environment.runner, MasterRunner):
+        environment.runner.send_message('token', _shared['token'])
+
+
+@events.quitting.add_listener
+def on_quitting(environment, **kwargs):
+    report_json = environment.parsed_options.report_json
+    if report_json and not isinstance(environment.runner, WorkerRunner):
+        write_report(environment.stats, report_json)
+
+
+class GroupsUser(FastHttpUser):
+    """Simulated user exercising the Groups query and command endpoints with weighted tasks."""
+
+    wait_time = between(0.5, 2)
+
+    def on_start(self):
+        while _shared['token'] is None:
+            gevent.sleep(0.1)
+        self.groups = LocustGroups(_shared['config'], self.client, _shared['token'])
+        self.group_uuids = []
+
+    def _random_group_uuid(self):
+        if not self.group_uuids:
+            self.list_groups()
+        return random.choice(self.group_uuids) if self.group_uuids else None
+
+    @task(10)
+    def list_groups(self):
+        result = self.groups.get_groups(pageable={'page': 0, 'size': 20, 'sort': ['name']})
+        if result:
+            self.group_uuids = [group['uuid'] for group in result['response']['content']]
+
+    @task(5)
+    def get_group_by_uuid(self):
+        group_uuid = self._random_group_uuid()
+        if group_uuid:
+            self.groups.get_groups_by_uuid(group_uuid)
+
+    @task(3)
+    def get_group_emails(self):
+        group_uuid = self._random_group_uuid()
+        if group_uuid:
+            self.groups.get_group_emails(group_uuid)
+
+    @task(1)
+    def create_group(self):
+        group_data = Group.generate_base_group(self.groups.customer_id, as_json=True)
+        result = self.groups.create_group(group_data)
+        if result:
+            self.group_uuids.append(result['response']['uuid'])
+
+    @task(1)
+    def update_group(self):
+        group_uuid = self._random_group_uuid()
+        if group_uuid:
+            group_data = Group.generate_base_group(self.groups.customer_id, as_json=True)
+            self.groups.update_group(group_uuid, group_data)
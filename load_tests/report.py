@@ -0,0 +1,54 @@
+import json
+from pathlib import Path
+
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+def stats_to_dict(stats) -> dict:
+    """
+    Convert Locust RequestStats into a plain dict with per-endpoint percentiles and failure ratios.
+
+    Args:
+        stats (RequestStats): environment.stats of a finished run.
+
+    Returns:
+        dict: Endpoint name mapped to its metrics, plus an `Aggregated` entry.
+    """
+    entries = sorted(stats.entries.values(), key=lambda entry: entry.name)
+    report = {entry.name: _entry_to_dict(entry) for entry in entries}
+    report['Aggregated'] = _entry_to_dict(stats.total)
+    return report
+
+
+def write_report(stats, path: str) -> Path:
+    """
+    Write the per-endpoint report as sorted, indented JSON so two releases diff cleanly.
+
+    Args:
+        stats (RequestStats): environment.stats of a finished run.
+        path (str): Output file path.
+
+    Returns:
+        Path: The written file.
+    """
+    report_path = Path(path)
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(stats_to_dict(stats), indent=2, sort_keys=True))
+    return report_path
+
+
+def _entry_to_dict(entry) -> dict:
+    num_requests = entry.num_requests
+    result = {
+        'method': entry.method,
+        'num_requests': num_requests,
+        'num_failures': entry.num_failures,
+        'failure_ratio': round(entry.num_failures / num_requests, 4) if num_requests else 0.0,
+        'avg_ms': round(entry.avg_response_time, 2),
+        'min_ms': entry.min_response_time,
+        'max_ms': entry.max_response_time,
+        'rps': round(entry.total_rps, 2),
+    }
+    for percentile in PERCENTILES:
+        result[f'p{int(percentile * 100)}_ms'] = entry.get_response_time_percentile(percentile)
+    return result
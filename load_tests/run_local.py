@@ -0,0 +1,44 @@
+"""
+Run the load suite in master/worker mode on the local machine.
+
+Usage:
+    python -m load_tests.run_local --workers 4 --users 200 --spawn-rate 20 --run-time 5m --env qa
+"""
+import argparse
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+LOCUSTFILE = Path(__file__).parent / 'locustfile.py'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run Groups load suite with local master and workers')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--spawn-rate', type=float, default=5)
+    parser.add_argument('--run-time', default='5m')
+    parser.add_argument('--env', default='qa')
+    parser.add_argument('--report-json', default='reports/load_groups.json')
+    args = parser.parse_args()
+
+    locust = [sys.executable, '-m', 'locust', '-f', str(LOCUSTFILE)]
+    master = subprocess.Popen(locust + ['--master', '--headless',
+                                        '--expect-workers', str(args.workers),
+                                        '-u', str(args.users),
+                                        '-r', str(args.spawn_rate),
+                                        '-t', args.run_time,
+                                        '--tempo-env', args.env,
+                                        '--report-json', args.report_json])
+    workers = [subprocess.Popen(locust + ['--worker', '--tempo-env', args.env]) for _ in range(args.workers)]
+    try:
+        exit_code = master.wait()
+    finally:
+        for worker in workers:
+            worker.wait(timeout=30)
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
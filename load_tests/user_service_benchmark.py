@@ -0,0 +1,78 @@
+"""
+Benchmark UserService at scale on one storage backend.
+
+Usage:
+    python -m load_tests.user_service_benchmark --users 1000000 --backend memory
+    python -m load_tests.user_service_benchmark --users 1000000 --backend sqlite --db users.sqlite
+"""
+import argparse
+import os
+import random
+import time
+from contextlib import contextmanager
+
+if os.name != 'nt':
+    import resource
+
+from tests.ui.user_service import SQLiteStorage, UserService
+
+ROLES = ('admin', 'moderator', 'editor')
+
+
+@contextmanager
+def timed(operation: str, count: int):
+    start = time.perf_counter()
+    yield
+    elapsed = time.perf_counter() - start
+    print(f"{operation:<20} {count:>10} ops {elapsed:>9.3f}s {count / elapsed if elapsed else 0:>12.0f} ops/s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark UserService creation, lookups and paging')
+    parser.add_argument('--users', type=int, default=1_000_000)
+    parser.add_argument('--backend', choices=('memory', 'sqlite'), default='memory')
+    parser.add_argument('--db', default=':memory:', help='SQLite database path')
+    parser.add_argument('--lookups', type=int, default=10_000)
+    parser.add_argument('--batch', type=int, default=10_000, help='Users per bulk_create_users call')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    randomizer = random.Random(args.seed)
+    storage = SQLiteStorage(args.db) if args.backend == 'sqlite' else None
+    service = UserService(storage)
+
+    with timed('bulk_create_users', args.users):
+        for offset in range(0, args.users, args.batch):
+            service.bulk_create_users((f"user{i}", f"user{i}@test.com", f"password{i}")
+                                      for i in range(offset, min(offset + args.batch, args.users)))
+    with timed('add_role', args.users // 100):
+        for i in range(0, args.users, 100):
+            service.add_role(f"user{i}", ROLES[i % len(ROLES)])
+
+    sample = [randomizer.randrange(args.users) for _ in range(args.lookups)]
+    with timed('get_user', args.lookups):
+        for i in sample:
+            service.get_user(f"user{i}")
+    with timed('get_user_by_email', args.lookups):
+        for i in sample:
+            service.get_user_by_email(f"USER{i}@test.com")
+    with timed('get_users_with_role', len(ROLES)):
+        for role in ROLES:
+            service.get_users_with_role(role)
+    with timed('authenticate', args.lookups):
+        for i in sample:
+            service.authenticate(f"user{i}", f"password{i}")
+    with timed('bulk_authenticate', args.lookups):
+        service.bulk_authenticate((f"user{i}", f"password{i}") for i in sample)
+    with timed('iter_users', args.users):
+        for _ in service.iter_users():
+            pass
+
+    if os.name != 'nt':
+        print(f"peak rss: {resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024:.0f}MiB")  # ru_maxrss is KiB on Linux
+    if storage:
+        storage.close()
+
+
+if __name__ == '__main__':
+    main()
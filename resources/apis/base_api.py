@@ -1,12 +1,40 @@
+import json
+
 import requests
 from requests_oauthlib import OAuth2Session
 from oauthlib.oauth2 import LegacyApplicationClient
 
+from utils.cassette import Cassettes, RecordedResponse
+from utils.latency import sample_latency, shared_worker
+from utils.rate_limiter import RateLimiter
+from utils.resilience import ResiliencePolicy
+from utils.response_cache import ResponseCache
+from utils.tracing import Tracer, describe_requests_response
+
+
+def flatten_params(params):
+    """Spread nested dict params (pageable) into top level query params the way Spring binds them,
+    requests would otherwise send only their keys: pageable=page&pageable=size
+    :param params: api query param
+    :return: query params without nested dicts
+    """
+
+    if not params:
+        return params
+    flat = {}
+    for key, value in params.items():
+        if isinstance(value, dict):
+            flat.update(value)
+        else:
+            flat[key] = value
+    return flat
+
 
 class BaseApi:
-    def __init__(self, config):
+    def __init__(self, config, token=None):
         """Base api class constractor
         :param config: environment config values
+        :param token: already fetched auth token to share between clients (optional)
         """
 
         self.config = config['tempo_configuration']
@@ -20,7 +48,10 @@ class BaseApi:
         self.client_id = self.config['client_id']
         self.client_secret = self.config['client_secret']
         self.token_url = self.config['token_url']
-        self.token = self.get_token()
+        self.cache = ResponseCache.shared(config.get('response_cache'))
+        self.resilience = ResiliencePolicy.from_config(config.get('resilience'))
+        self.track_resources = bool((config.get('cleanup') or {}).get('enabled'))
+        self.token = token if token else self.get_token()
         self.headers = {
             'Authorization': f'{self.token["token_type"]} {self.token["access_token"]}',
             'X-customerId': self.config['x_customer_id']
@@ -38,6 +69,8 @@ class BaseApi:
         :return: token
         """
 
+        if Cassettes.replaying():
+            return {'token_type': 'Bearer', 'access_token': 'replay'}
         client = LegacyApplicationClient(client_id=self.client_id)
         oauth = OAuth2Session(client=client)
         token = oauth.fetch_token(token_url=self.token_url,
@@ -57,10 +90,10 @@ class BaseApi:
         :return:api response
         """
 
-        headers = headers if headers else self.headers
-        response = requests.get(f'{url}{self.endpoint_version}{endpoint}', headers=headers, params=params)
-        response.raise_for_status()
-        return response.json()
+        params = flatten_params(params)
+        if self.cache is None:
+            return self._request('GET', url, endpoint, params=params, headers=headers)
+        return self._cached_get(url, endpoint, params, headers)
 
     def post(self, url, endpoint, data=None, headers=None, params=None):
         """http post method with necessary data
@@ -72,10 +105,7 @@ class BaseApi:
         :return:api response
         """
 
-        headers = headers if headers else self.headers
-        response = requests.post(f'{url}{self.endpoint_version}{endpoint}', headers=headers, json=data, params=params)
-        response.raise_for_status()
-        return response.json()
+        return self._request('POST', url, endpoint, data=data, params=params, headers=headers)
 
     def put(self, url, endpoint, data=None, headers=None, params=None):
         """http put method with necessary data
@@ -87,10 +117,7 @@ class BaseApi:
         :return:api response
         """
 
-        headers = headers if headers else self.headers
-        response = requests.put(f'{url}{self.endpoint_version}{endpoint}', headers=headers, json=data, params=params)
-        response.raise_for_status()
-        return response.json()
+        return self._request('PUT', url, endpoint, data=data, params=params, headers=headers)
 
     def patch(self, url, endpoint, data=None, headers=None):
         """http patch method with necessary data
@@ -101,10 +128,7 @@ class BaseApi:
         :return:api response
         """
 
-        headers = headers if headers else self.headers
-        response = requests.patch(f'{url}{self.endpoint_version}{endpoint}', headers=headers, json=data)
-        response.raise_for_status()
-        return response.json()
+        return self._request('PATCH', url, endpoint, data=data, headers=headers)
 
     def delete(self, url, endpoint, data=None, headers=None):
         """http delete method with necessary data
@@ -115,11 +139,77 @@ class BaseApi:
         :return:api response
         """
 
+        return self._request('DELETE', url, endpoint, data=data, headers=headers)
+
+    def _request(self, method, url, endpoint, data=None, params=None, headers=None):
+        """Send http request, going through the active cassette if one is set
+        :param method: http method
+        :param url: api base url
+        :param endpoint: api endpoint
+        :param data: api payload
+        :param params: api query param
+        :param headers: api header
+        :return:api response json
+        """
+
+        response = self._fetch(method, f'{url}{self.endpoint_version}{endpoint}', endpoint, data, params, headers)
+        response.raise_for_status()
+        return response.json()
+
+    def _fetch(self, method, full_url, endpoint, data=None, params=None, headers=None):
+        """Send http request through the active cassette if one is set, emitting tracing events
+        and retrying transient failures when a resilience policy is configured
+        :return: requests response
+        """
+
         headers = headers if headers else self.headers
-        response = requests.delete(f'{url}{self.endpoint_version}{endpoint}', headers=headers, json=data)
+        cassette = Cassettes.current()
+        if cassette:
+            send = lambda: cassette.play(method, full_url, params, data,
+                                         lambda: RecordedResponse.from_requests(
+                                             self._send(method, full_url, data, params, headers))
+                                         ).to_requests_response()
+        else:
+            send = lambda: self._send(method, full_url, data, params, headers)
+        traced_send = lambda: Tracer.trace('requests', method, full_url, endpoint, send, describe_requests_response)
+        if self.resilience is None:
+            return traced_send()
+        return self.resilience.call(method, full_url, traced_send)
+
+    def _cached_get(self, url, endpoint, params=None, headers=None):
+        """http get served from the shared response cache, revalidating stale entries by ETag
+        :return: api response json
+        """
+
+        full_url = f'{url}{self.endpoint_version}{endpoint}'
+        ttl = self.cache.ttl_for(endpoint)
+        entry = self.cache.lookup(full_url, params)
+        if entry is not None and entry.fresh:
+            return json.loads(entry.body)
+        if entry is not None and entry.etag:
+            headers = {**(headers if headers else self.headers), 'If-None-Match': entry.etag}
+        response = self._fetch('GET', full_url, endpoint, params=params, headers=headers)
+        if response.status_code == 304 and entry is not None:
+            self.cache.revalidated(entry, ttl)
+            return json.loads(entry.body)
         response.raise_for_status()
+        self.cache.store(full_url, params, response.content, response.headers.get('ETag'), ttl)
         return response.json()
 
+    def invalidate_cache(self, url, endpoint):
+        """Drop cached responses of an endpoint after a write changed it
+        :param url: api base url
+        :param endpoint: api endpoint
+        """
+
+        if self.cache is not None:
+            self.cache.invalidate(f'{url}{self.endpoint_version}{endpoint}')
+
+    @staticmethod
+    def _send(method, full_url, data, params, headers):
+        RateLimiter.acquire(full_url)
+        return requests.request(method, full_url, headers=headers, json=data, params=params)
+
     def refresh_token(self):
         """
         :return:
@@ -127,3 +217,18 @@ class BaseApi:
 
         self.token = self.get_token()
         self.headers['Authorization'] = f'Bearer {self.token["access_token"]}'
+
+    def measure(self, url, endpoint, params=None, headers=None, n=200, warmup=20, concurrency=1):
+        """Sample latency of a get endpoint instead of timing a single call
+        :param url: api base url
+        :param endpoint: api endpoint
+        :param params: api query param
+        :param headers: api header
+        :param n: number of timed requests
+        :param warmup: number of untimed requests sent first
+        :param concurrency: number of parallel workers
+        :return: LatencyStats with min/p50/p90/p95/p99/max and throughput
+        """
+
+        return sample_latency(shared_worker(lambda: self.get(url, endpoint, params, headers)),
+                              n=n, warmup=warmup, concurrency=concurrency)
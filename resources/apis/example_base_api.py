@@ -1,9 +1,19 @@
 import json
 import logging
-from typing import Dict, Any, Optional
+import time
+from collections.abc import Mapping
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Any, List, Optional
 from urllib.parse import urljoin
 from playwright.sync_api import sync_playwright
 
+from utils.cassette import Cassettes, RecordedResponse
+from utils.latency import LatencyStats, sample_latency, shared_worker
+from utils.rate_limiter import RateLimiter
+from utils.request_context_pool import RequestContextPool
+from utils.tracing import Tracer, describe_playwright_response
+
 
 class BaseAPIController:
     """
@@ -11,13 +21,14 @@ class BaseAPIController:
     Надає основні методи для HTTP запитів та обробки відповідей.
     """
 
-    def __init__(self, base_url: str, timeout: int = 30000):
+    def __init__(self, base_url: str, timeout: int = 30000, log_sample_rate: float = 1.0):
         """
         Ініціалізація контролера
 
         Args:
             base_url: Базова URL для API
             timeout: Таймаут для запитів в мілісекундах
+            log_sample_rate: Частка запитів, що логуються (1.0 - всі, 0.01 - кожен сотий, 0 - жоден)
         """
         self.base_url = base_url.rstrip('/')
         self.timeout = timeout
@@ -27,10 +38,25 @@ class BaseAPIController:
         }
         self.playwright = None
         self.request_context = None
+        self.pool = None
+        self._pool_key = None
         self.logger = logging.getLogger(__name__)
+        self._log_every = round(1 / log_sample_rate) if log_sample_rate > 0 else 0
+        self._request_count = 0
+        self._undisposed: List['LazyResponse'] = []
+
+    def setup(self, pool: Optional[RequestContextPool] = None):
+        """
+        Налаштування Playwright та request context
 
-    def setup(self):
-        """Налаштування Playwright та request context"""
+        Args:
+            pool: Спільний пул контекстів сесії. Якщо задано, контекст позичається з пулу
+                замість запуску нового драйвера Playwright для кожного тесту
+        """
+        if pool:
+            self.pool = pool
+            self._pool_key, self.request_context = pool.borrow(self.base_url, self.timeout)
+            return
         self.playwright = sync_playwright().start()
         self.request_context = self.playwright.request.new_context(
             base_url=self.base_url,
@@ -39,6 +65,13 @@ class BaseAPIController:
 
     def teardown(self):
         """Очищення ресурсів"""
+        for response in self._undisposed:
+            response.dispose()
+        self._undisposed.clear()
+        if self.pool:
+            self.pool.give_back(self._pool_key, self.request_context)
+            self.request_context = None
+            return
         if self.request_context:
             self.request_context.dispose()
         if self.playwright:
@@ -56,7 +89,7 @@ class BaseAPIController:
         return headers
 
     def get(self, endpoint: str, params: Optional[Dict] = None,
-            headers: Optional[Dict] = None) -> Dict[str, Any]:
+            headers: Optional[Dict] = None, save_to: Optional[str] = None) -> Dict[str, Any]:
         """
         Виконання GET запиту
 
@@ -64,89 +97,224 @@ class BaseAPIController:
             endpoint: API endpoint
             params: Query параметри
             headers: Додаткові заголовки
+            save_to: Шлях для збереження великого тіла у файл; тоді data містить шлях
 
         Returns:
             Словник з даними відповіді
         """
-        url = self._build_url(endpoint)
-        prepared_headers = self._prepare_headers(headers)
-
-        self.logger.info(f"GET запит до: {url}")
-
-        response = self.request_context.get(
-            url,
-            params=params,
-            headers=prepared_headers
-        )
-
-        return self._process_response(response)
+        return self._request('GET', endpoint, params=params, headers=headers, save_to=save_to)
 
     def post(self, endpoint: str, data: Optional[Dict] = None,
              headers: Optional[Dict] = None) -> Dict[str, Any]:
         """Виконання POST запиту"""
-        url = self._build_url(endpoint)
-        prepared_headers = self._prepare_headers(headers)
-
-        self.logger.info(f"POST запит до: {url}")
-
-        response = self.request_context.post(
-            url,
-            data=json.dumps(data) if data else None,
-            headers=prepared_headers
-        )
-
-        return self._process_response(response)
+        return self._request('POST', endpoint, data=data, headers=headers)
 
     def put(self, endpoint: str, data: Optional[Dict] = None,
             headers: Optional[Dict] = None) -> Dict[str, Any]:
         """Виконання PUT запиту"""
-        url = self._build_url(endpoint)
-        prepared_headers = self._prepare_headers(headers)
+        return self._request('PUT', endpoint, data=data, headers=headers)
 
-        self.logger.info(f"PUT запит до: {url}")
+    def delete(self, endpoint: str, headers: Optional[Dict] = None) -> Dict[str, Any]:
+        """Виконання DELETE запиту"""
+        return self._request('DELETE', endpoint, headers=headers)
 
-        response = self.request_context.put(
-            url,
-            data=json.dumps(data) if data else None,
-            headers=prepared_headers
-        )
+    def _request(self, method: str, endpoint: str, params: Optional[Dict] = None,
+                 data: Optional[Dict] = None, headers: Optional[Dict] = None,
+                 save_to: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Виконання запиту через активну касету (якщо є) або напряму
 
-        return self._process_response(response)
+        Args:
+            method: HTTP метод
+            endpoint: API endpoint
+            params: Query параметри
+            data: Тіло запиту
+            headers: Додаткові заголовки
+            save_to: Шлях для збереження тіла у файл замість пам'яті
 
-    def delete(self, endpoint: str, headers: Optional[Dict] = None) -> Dict[str, Any]:
-        """Виконання DELETE запиту"""
+        Returns:
+            Словник з даними відповіді
+        """
         url = self._build_url(endpoint)
         prepared_headers = self._prepare_headers(headers)
 
-        self.logger.info(f"DELETE запит до: {url}")
+        log = self._should_log()
+        if log:
+            self.logger.info("%s запит до: %s", method, url)
+
+        cassette = Cassettes.current()
+        if cassette:
+            send = lambda: cassette.play(method, url, params, data,
+                                         lambda: self._send_recorded(method, url, params, data, prepared_headers)
+                                         ).to_playwright_response()
+        else:
+            send = lambda: self._send(method, url, params, data, prepared_headers)
+        response = Tracer.trace('playwright', method, url, endpoint, send, describe_playwright_response)
+        result = self._process_response(response, save_to)
+
+        if log:
+            self.logger.info("Отримано відповідь: %s", result['status_code'])
+        return result
 
-        response = self.request_context.delete(
+    def _send(self, method: str, url: str, params: Optional[Dict], data: Optional[Dict], headers: Dict):
+        """Відправка запиту через Playwright request context з урахуванням спільного ліміту запитів"""
+        RateLimiter.acquire(url)
+        return self.request_context.fetch(
             url,
-            headers=prepared_headers
+            method=method,
+            params=params,
+            data=json.dumps(data) if data else None,
+            headers=headers
         )
 
-        return self._process_response(response)
+    def _send_recorded(self, method: str, url: str, params: Optional[Dict], data: Optional[Dict],
+                       headers: Dict) -> RecordedResponse:
+        """Відправка запиту з записом відповіді для касети"""
+        start = time.perf_counter()
+        response = self._send(method, url, params, data, headers)
+        return RecordedResponse.from_playwright(response, (time.perf_counter() - start) * 1000)
 
-    def _process_response(self, response) -> Dict[str, Any]:
+    def measure(self, endpoint: str, params: Optional[Dict] = None, headers: Optional[Dict] = None,
+                n: int = 200, warmup: int = 20, concurrency: int = 1) -> LatencyStats:
         """
-        Обробка відповіді від API
+        Вимірювання латентності GET запиту серією викликів
+
+        Args:
+            endpoint: API endpoint
+            params: Query параметри
+            headers: Додаткові заголовки
+            n: Кількість виміряних запитів
+            warmup: Кількість запитів для прогріву (не враховуються)
+            concurrency: Кількість паралельних воркерів
 
         Returns:
-            Словник з статус кодом, заголовками та даними
+            LatencyStats з min/p50/p90/p95/p99/max та пропускною здатністю
         """
-        result = {
-            'status_code': response.status,
-            'headers': dict(response.headers),
-            'url': response.url
-        }
+        if concurrency == 1:
+            worker = shared_worker(lambda: self._checked_get(endpoint, params, headers))
+        else:
+            worker = lambda: self._thread_worker(endpoint, params, headers)
+        return sample_latency(worker, n=n, warmup=warmup, concurrency=concurrency)
 
+    def _checked_get(self, endpoint: str, params: Optional[Dict], headers: Optional[Dict]) -> 'LazyResponse':
+        """GET, що піднімає помилку для статусів 4xx/5xx, щоб measure рахував їх як помилки"""
+        response = self.get(endpoint, params, headers)
+        response.dispose()
+        if response['status_code'] >= 400:
+            raise RuntimeError(f"GET {endpoint} повернув статус {response['status_code']}")
+        return response
+
+    @contextmanager
+    def _thread_worker(self, endpoint: str, params: Optional[Dict], headers: Optional[Dict]):
+        """Окремий контролер для потоку, бо sync API Playwright прив'язаний до потоку"""
+        controller = BaseAPIController(self.base_url, self.timeout)
+        controller.default_headers = self.default_headers.copy()
+        controller.setup()
         try:
-            # Спроба парсингу JSON
-            result['data'] = response.json()
-        except:
-            # Якщо не JSON, зберігаємо як текст
-            result['data'] = response.text()
+            yield lambda: controller._checked_get(endpoint, params, headers)
+        finally:
+            controller.teardown()
 
-        self.logger.info(f"Отримано відповідь: {result['status_code']}")
+    def _process_response(self, response, save_to: Optional[str] = None) -> 'LazyResponse':
+        """
+        Обробка відповіді від API
 
+        Args:
+            response: Відповідь Playwright (або відтворена з касети)
+            save_to: Шлях для збереження тіла у файл замість пам'яті
+
+        Returns:
+            LazyResponse з статус кодом, заголовками та даними
+        """
+        result = LazyResponse(response)
+        if save_to:
+            result.save_body(save_to)
+        else:
+            # тіло, яке тест так і не прочитав, звільняється в teardown
+            self._undisposed.append(result)
         return result
+
+    def _should_log(self) -> bool:
+        """Чи логувати поточний запит з урахуванням рівня логування та семплювання"""
+        if not self._log_every or not self.logger.isEnabledFor(logging.INFO):
+            return False
+        self._request_count += 1
+        return (self._request_count - 1) % self._log_every == 0
+
+
+class LazyResponse(Mapping):
+    """
+    Відповідь API з лінивим декодуванням.
+
+    Ключі status_code та url доступні одразу, headers та data декодуються лише при першому
+    зверненні і кешуються. Тіло читається з відповіді один раз, після чого відповідь
+    звільняється в драйвері Playwright (dispose). Об'єкт поводиться як словник, тож код,
+    що працює з result['data'], не змінюється.
+    """
+
+    _KEYS = ('status_code', 'headers', 'url', 'data')
+
+    def __init__(self, response):
+        self._response = response
+        self._body = None
+        self._disposed = False
+        self._values = {'status_code': response.status, 'url': response.url}
+
+    def __getitem__(self, key: str) -> Any:
+        if key not in self._values:
+            if key == 'headers':
+                self._values['headers'] = dict(self._response.headers)
+            elif key == 'data':
+                self._values['data'] = self._decode()
+            else:
+                raise KeyError(key)
+        return self._values[key]
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self) -> int:
+        return len(self._KEYS)
+
+    def __repr__(self) -> str:
+        return f"LazyResponse(status_code={self._values['status_code']}, url={self._values['url']!r})"
+
+    @property
+    def body(self) -> bytes:
+        """Сире тіло відповіді, читається один раз"""
+        if self._body is None:
+            self._body = self._response.body()
+            self.dispose()
+        return self._body
+
+    def dispose(self) -> None:
+        """Звільнення тіла відповіді в драйвері Playwright; після цього непрочитане тіло недоступне"""
+        if not self._disposed:
+            self._disposed = True
+            self._response.dispose()
+
+    def save_body(self, path: str) -> Path:
+        """
+        Збереження тіла відповіді у файл; data стає шляхом до файлу, тіло не тримається в пам'яті
+
+        Args:
+            path: Шлях до файлу
+
+        Returns:
+            Шлях до збереженого файлу
+        """
+        file_path = Path(path)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_bytes(self.body)
+        self._body = None
+        self._values['data'] = file_path
+        return file_path
+
+    def _decode(self) -> Any:
+        body = self.body
+        try:
+            # Спроба парсингу JSON
+            return json.loads(body)
+        except ValueError:
+            # Якщо не JSON, повертаємо як текст
+            return body.decode('utf-8', errors='replace')
@@ -2,16 +2,18 @@
 # https://time-based-parking-query-service.dev.link.t2systems.com/swagger-ui/index.html#/
 # https://time-based-parking-service.dev.link.t2systems.com/swagger-ui/index.html
 from resources.apis.base_api import BaseApi
+from utils.resource_tracker import ResourceTracker
 
 
 class Groups(BaseApi):
 
-    def __init__(self, config):
+    def __init__(self, config, token=None):
         """Constractor for group object.
         :param config: environment config values.
+        :param token: already fetched auth token to share between clients (optional).
         """
 
-        super().__init__(config)
+        super().__init__(config, token)
         self.endpoint = 'groups'
 
     def get_groups(self, customer_id=None, group_name=None, pageable=None):
@@ -109,7 +111,10 @@ class Groups(BaseApi):
         :return: response json.
         """
 
-        return self.put(url=self.api_base_url, endpoint=f'{self.endpoint}/{group_uuid}', data=pay_load)
+        response = self.put(url=self.api_base_url, endpoint=f'{self.endpoint}/{group_uuid}', data=pay_load)
+        self.invalidate_cache(self.api_base_query_url, self.endpoint)
+        self.invalidate_cache(self.api_base_query_url, f'{self.endpoint}/{group_uuid}')
+        return response
 
     def create_group(self, pay_load):
         """Create group in tempo.
@@ -117,7 +122,22 @@ class Groups(BaseApi):
         :return: response json.
         """
 
-        return self.post(url=self.api_base_url, endpoint=self.endpoint, data=pay_load)
+        response = self.post(url=self.api_base_url, endpoint=self.endpoint, data=pay_load)
+        self.invalidate_cache(self.api_base_query_url, self.endpoint)
+        if self.track_resources and response.get('response'):
+            ResourceTracker.track('group', response['response']['uuid'])
+        return response
+
+    def delete_group(self, group_uuid):
+        """Deleting group.
+        :param group_uuid: specific group uuid to be deleted.
+        :return: response json.
+        """
+
+        response = self.delete(url=self.api_base_url, endpoint=f'{self.endpoint}/{group_uuid}')
+        self.invalidate_cache(self.api_base_query_url, self.endpoint)
+        self.invalidate_cache(self.api_base_query_url, f'{self.endpoint}/{group_uuid}')
+        return response
 
     def add_emails_to_group(self, group_uuid, pay_load):
         """Adding email address to a specific group.
@@ -126,4 +146,6 @@ class Groups(BaseApi):
         :return: response json.
         """
 
-        return self.patch(url=self.api_base_url, endpoint=f'{self.endpoint}/{group_uuid}/emails', data=pay_load)
+        response = self.patch(url=self.api_base_url, endpoint=f'{self.endpoint}/{group_uuid}/emails', data=pay_load)
+        self.invalidate_cache(self.api_base_query_url, f'{self.endpoint}/{group_uuid}/emails')
+        return response
@@ -1,5 +1,9 @@
+import inspect
+
 from playwright.sync_api import Page, Locator, expect
+from utils.emulation import timed
 from utils.enums.ui import Tabs, SubPageMenu
+from utils.web_vitals import WebVitals, page_name
 
 
 class BasePage:
@@ -14,13 +18,17 @@ class BasePage:
         self.footer_popup = page.locator("[class='mat-simple-snack-bar-content']")
         self.account_button = page.locator('[data-qaid="accountBtn"]')
 
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _time_actions(cls)
+
     def navigate(self, url: str) -> None:
         """
         Navigate to the specified URL.
         :param url: The URL to navigate to.
         :return:
         """
-        self.page.goto(url)
+        WebVitals.measure(self.page, page_name(url), 'navigation', lambda: self.page.goto(url))
 
     def get_title(self) -> str:
         """
@@ -39,8 +47,11 @@ class BasePage:
         """
         if not self.is_tab_selected(tab):
             self.page.wait_for_selector("[class='mat-simple-snack-bar-content']", state="detached")
-            self.page.click(tab.selector)
-            self.page.wait_for_load_state("load", timeout=1_000)
+            WebVitals.measure(self.page, f"tab {tab.tab_name}", 'tab', lambda: self._click_and_wait(tab.selector))
+
+    def _click_and_wait(self, selector: str) -> None:
+        self.page.click(selector)
+        self.page.wait_for_load_state("load", timeout=1_000)
 
     def navigate_to_sub_page(self, sub_page: SubPageMenu) -> None:
         """
@@ -52,7 +63,8 @@ class BasePage:
         self.page.wait_for_load_state("load", timeout=1_000)
         self.page.wait_for_selector('[data-qaid="accountBtn"]', state="detached")
         self.account_button.click()
-        self.page.click(sub_page.selector)
+        WebVitals.measure(self.page, f"sub page {sub_page.name_}", 'sub page',
+                          lambda: self.page.click(sub_page.selector))
 
     def is_tab_selected(self, tab: Tabs) -> bool:
         """
@@ -65,6 +77,43 @@ class BasePage:
         """
         return self.page.get_attribute(tab.selector, "aria-current") == "page"
 
+    def assert_page_budget(self, duration_ms: float = None, lcp_ms: float = None, cls: float = None,
+                           inp_ms: float = None, ttfb_ms: float = None, load_ms: float = None,
+                           long_task_ms: float = None, transfer_bytes: float = None) -> None:
+        """
+        Asserts the last measured navigation or tab switch of the page stayed within the budget.
+        Needs web vitals collection enabled; metrics the browser does not report are not checked.
+
+        :param duration_ms:
+            (float): Maximum duration of the navigation call.
+        :param lcp_ms:
+            (float): Maximum Largest Contentful Paint, e.g. 2500.
+        :param cls:
+            (float): Maximum Cumulative Layout Shift, e.g. 0.1.
+        :param inp_ms:
+            (float): Maximum Interaction to Next Paint, e.g. 200.
+        :param ttfb_ms:
+            (float): Maximum time to first byte of the document.
+        :param load_ms:
+            (float): Maximum time until the end of the load event.
+        :param long_task_ms:
+            (float): Maximum total duration of long tasks.
+        :param transfer_bytes:
+            (float): Maximum bytes transferred by resources.
+        :return:
+            None
+        """
+        metrics = WebVitals.last(self.page)
+        if metrics is None:
+            raise AssertionError("No page performance measured, enable web_vitals in the env config or "
+                                 "run with --web-vitals")
+        budget = dict(duration_ms=duration_ms, lcp_ms=lcp_ms, cls=cls, inp_ms=inp_ms, ttfb_ms=ttfb_ms,
+                      load_ms=load_ms, long_task_ms=long_task_ms, transfer_bytes=transfer_bytes)
+        over = metrics.over_budget(**budget)
+        if over:
+            raise AssertionError(f"{metrics.name} over budget: " + ', '.join(
+                f"{metric} {value:g} > {budget[metric]:g}" for metric, value in over.items()))
+
     @staticmethod
     def get_shadow_input_text(selector: Locator) -> str:
         """
@@ -185,3 +234,13 @@ class BasePage:
             None
         """
         self.assert_text_in_element(self.footer_popup, text)
+
+
+def _time_actions(cls) -> None:
+    """Record the duration of every public page object method, see utils.emulation.ActionTimings."""
+    for name, attribute in list(vars(cls).items()):
+        if not name.startswith('_') and inspect.isfunction(attribute):
+            setattr(cls, name, timed(f"{cls.__name__}.{name}", attribute))
+
+
+_time_actions(BasePage)
@@ -2,6 +2,7 @@ from playwright.sync_api import Page, Locator, expect
 
 from data.sample_groups_data import Group
 from resources.pom.base_page import BasePage
+from utils.resource_tracker import ResourceTracker
 
 
 class GroupsPage(BasePage):
@@ -87,6 +88,7 @@ class GroupsPage(BasePage):
         self._click_add_group_button()
         self._fill_group_info(group_info)
         self._click_save_group_button()
+        ResourceTracker.track('group_name', group_info.name)
 
     def assert_group_in_list(self, group_name: str) -> None:
         """
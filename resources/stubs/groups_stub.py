@@ -0,0 +1,321 @@
+"""
+Local stand-in for the Tempo Groups query/command services and the OAuth token endpoint.
+
+Run:
+    python -m resources.stubs.groups_stub --port 8099 --latency-ms 20 --error-rate 0.01
+
+Point the environment config at it (api_base_url, api_base_query_url = http://127.0.0.1:8099/,
+token_url = http://127.0.0.1:8099/token) and set OAUTHLIB_INSECURE_TRANSPORT=1 so the OAuth
+client accepts plain http. Use `--server gevent` for thousands of requests per second.
+"""
+import argparse
+import os
+import random
+import threading
+import time
+import uuid
+from typing import Dict, List, Optional
+
+from flask import Flask, jsonify, request
+from werkzeug.serving import WSGIRequestHandler, make_server
+
+API_PREFIX = '/api/v1/groups'
+
+
+class GroupsStore:
+    """
+    In-memory groups storage with indexes for the lookups the Groups endpoints need.
+
+    Indexes:
+        by uuid                     -> group
+        by customer id              -> insertion ordered group uuids
+        by (customer id, name)      -> group uuids, case insensitive
+        by group uuid               -> insertion ordered email entries
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.groups: Dict[str, dict] = {}
+        self.by_customer: Dict[int, Dict[str, None]] = {}
+        self.by_name: Dict[tuple, Dict[str, None]] = {}
+        self.emails: Dict[str, Dict[str, dict]] = {}
+
+    def add(self, group: dict) -> dict:
+        group = dict(group)
+        group['uuid'] = group.get('uuid') or str(uuid.uuid4())
+        group.setdefault('description', '')
+        group.setdefault('classifications', [])
+        group.setdefault('customGroups', [])
+        group.setdefault('isActive', True)
+        group.setdefault('isDeleted', False)
+        group['description'] = group['description'] or ''
+        group['classifications'] = group['classifications'] or []
+        group['customGroups'] = group['customGroups'] or []
+        with self._lock:
+            self.groups[group['uuid']] = group
+            self.by_customer.setdefault(group['customerId'], {})[group['uuid']] = None
+            self.by_name.setdefault(self._name_key(group), {})[group['uuid']] = None
+            self.emails.setdefault(group['uuid'], {})
+        return group
+
+    def update(self, group_uuid: str, changes: dict) -> Optional[dict]:
+        with self._lock:
+            group = self.groups.get(group_uuid)
+            if group is None:
+                return None
+            self.by_name.get(self._name_key(group), {}).pop(group_uuid, None)
+            self.by_customer.get(group['customerId'], {}).pop(group_uuid, None)
+            group.update({key: value for key, value in changes.items() if key != 'uuid' and value is not None})
+            self.by_customer.setdefault(group['customerId'], {})[group_uuid] = None
+            self.by_name.setdefault(self._name_key(group), {})[group_uuid] = None
+            return group
+
+    def remove(self, group_uuid: str) -> Optional[dict]:
+        with self._lock:
+            group = self.groups.pop(group_uuid, None)
+            if group is None:
+                return None
+            self.by_name.get(self._name_key(group), {}).pop(group_uuid, None)
+            self.by_customer.get(group['customerId'], {}).pop(group_uuid, None)
+            self.emails.pop(group_uuid, None)
+            return group
+
+    def find(self, customer_id: int, name: Optional[str] = None) -> List[dict]:
+        if name:
+            uuids = self.by_name.get((customer_id, name.lower()), {})
+        else:
+            uuids = self.by_customer.get(customer_id, {})
+        return [self.groups[group_uuid] for group_uuid in list(uuids)]
+
+    def add_emails(self, group_uuid: str, emails: List[str]) -> Optional[List[dict]]:
+        with self._lock:
+            group_emails = self.emails.get(group_uuid)
+            if group_emails is None:
+                return None
+            for email in emails:
+                group_emails.setdefault(email.lower(), {'uuid': str(uuid.uuid4()), 'emailAddress': email})
+            return list(group_emails.values())
+
+    @staticmethod
+    def _name_key(group: dict) -> tuple:
+        return group['customerId'], group['name'].lower()
+
+
+def _page(items: list, page: int, size: int) -> dict:
+    """Spring Data style page object as described in data/schema/sample_groups."""
+    total = len(items)
+    content = items[page * size:(page + 1) * size]
+    total_pages = (total + size - 1) // size if size else 0
+    sort = {'sorted': False, 'unsorted': True, 'empty': True}
+    return {
+        'content': content,
+        'pageable': {'sort': sort, 'pageSize': size, 'pageNumber': page, 'offset': page * size,
+                     'paged': True, 'unpaged': False},
+        'totalPages': total_pages,
+        'totalElements': total,
+        'last': page >= total_pages - 1,
+        'numberOfElements': len(content),
+        'first': page == 0,
+        'number': page,
+        'size': size,
+        'sort': sort,
+        'empty': not content
+    }
+
+
+def _success(response, status_code: int = 200):
+    return jsonify({'response': response, 'status': {'responseStatus': 'Success'}}), status_code
+
+
+def _fail(message: str, status_code: int = 200):
+    return jsonify({'response': None, 'status': {'responseStatus': 'Fail', 'message': message}}), status_code
+
+
+def create_app(store: Optional[GroupsStore] = None, latency_ms: float = 0, latency_jitter_ms: float = 0,
+               error_rate: float = 0.0, reference_size: int = 5) -> Flask:
+    """
+    Build the stub application.
+
+    Args:
+        store (GroupsStore, optional): Pre-populated store, a new empty one by default.
+        latency_ms (float): Delay added to every api response.
+        latency_jitter_ms (float): Random extra delay between 0 and this value.
+        error_rate (float): Share of api requests answered with 503.
+        reference_size (int): Number of verification fields and classifications per customer.
+
+    Returns:
+        Flask: The application. Its `store` attribute holds the GroupsStore.
+    """
+    app = Flask(__name__)
+    app.store = store if store else GroupsStore()
+    app.chaos = {'latency_ms': latency_ms, 'latency_jitter_ms': latency_jitter_ms, 'error_rate': error_rate}
+    reference_data: Dict[int, dict] = {}
+
+    def customer_id() -> int:
+        return request.args.get('customerId', type=int)
+
+    def page_args() -> tuple:
+        return request.args.get('page', 0, type=int), request.args.get('size', 20, type=int)
+
+    def customer_reference(customer: int) -> dict:
+        if customer not in reference_data:
+            reference_data[customer] = {
+                'verificationfields': [{'verificationFieldUid': i, 'verificationFieldLabel': f'Field {i}'}
+                                       for i in range(1, reference_size + 1)],
+                'classifications': [{'classificationUid': i, 'subclassificationUid': i,
+                                     'classificationLabel': f'Classification {i}',
+                                     'verificationFieldUid': i, 'verificationFieldLabel': f'Field {i}'}
+                                    for i in range(1, reference_size + 1)]
+            }
+        return reference_data[customer]
+
+    @app.before_request
+    def inject_chaos():
+        if not request.path.startswith(API_PREFIX):
+            return None
+        delay = app.chaos['latency_ms'] + random.uniform(0, app.chaos['latency_jitter_ms'])
+        if delay:
+            time.sleep(delay / 1000)
+        if app.chaos['error_rate'] and random.random() < app.chaos['error_rate']:
+            return _fail('Injected error', 503)
+        return None
+
+    @app.post('/token')
+    def token():
+        return jsonify({'access_token': uuid.uuid4().hex, 'token_type': 'Bearer', 'expires_in': 3600,
+                        'refresh_token': uuid.uuid4().hex, 'scope': 'openid'})
+
+    @app.get(API_PREFIX)
+    def get_groups():
+        groups = app.store.find(customer_id(), request.args.get('groupName'))
+        return _success(_page(groups, *page_args()))
+
+    def reference_response(kind: str):
+        customer = customer_id()
+        etag = f'"{kind}-{customer}-{reference_size}"'
+        if request.headers.get('If-None-Match') == etag:
+            return '', 304, {'ETag': etag}
+        body, status_code = _success(_page(customer_reference(customer)[kind], *page_args()))
+        body.headers['ETag'] = etag
+        return body, status_code
+
+    @app.get(f'{API_PREFIX}/verificationfields')
+    def get_verification_fields():
+        return reference_response('verificationfields')
+
+    @app.get(f'{API_PREFIX}/classifications')
+    def get_classifications():
+        return reference_response('classifications')
+
+    @app.get(f'{API_PREFIX}/<group_uuid>')
+    def get_group(group_uuid):
+        group = app.store.groups.get(group_uuid)
+        if group is None:
+            return _fail(f'Group {group_uuid} not found')
+        return _success(group)
+
+    @app.get(f'{API_PREFIX}/<group_uuid>/emails')
+    def get_group_emails(group_uuid):
+        emails = app.store.emails.get(group_uuid)
+        if emails is None:
+            return _fail(f'Group {group_uuid} not found')
+        email = request.args.get('emailaddress')
+        if email:
+            entries = [emails[email.lower()]] if email.lower() in emails else []
+        else:
+            entries = list(emails.values())
+        return _success(_page(entries, *page_args()))
+
+    @app.post(API_PREFIX)
+    def create_group():
+        pay_load = request.get_json(silent=True) or {}
+        if not pay_load.get('name') or pay_load.get('customerId') is None:
+            return _fail('customerId and name are required', 400)
+        return _success(app.store.add(pay_load), 201)
+
+    @app.put(f'{API_PREFIX}/<group_uuid>')
+    def update_group(group_uuid):
+        group = app.store.update(group_uuid, request.get_json(silent=True) or {})
+        if group is None:
+            return _fail(f'Group {group_uuid} not found', 404)
+        return _success(group)
+
+    @app.delete(f'{API_PREFIX}/<group_uuid>')
+    def delete_group(group_uuid):
+        group = app.store.remove(group_uuid)
+        if group is None:
+            return _fail(f'Group {group_uuid} not found', 404)
+        return _success(group)
+
+    @app.patch(f'{API_PREFIX}/<group_uuid>/emails')
+    def add_emails(group_uuid):
+        pay_load = request.get_json(silent=True) or {}
+        emails = pay_load.get('emails', pay_load if isinstance(pay_load, list) else [])
+        entries = app.store.add_emails(group_uuid, emails)
+        if entries is None:
+            return _fail(f'Group {group_uuid} not found', 404)
+        return _success(_page(entries, 0, max(len(entries), 1)))
+
+    return app
+
+
+class _QuietRequestHandler(WSGIRequestHandler):
+    def log_request(self, *args, **kwargs):
+        pass
+
+
+def serve_in_thread(app: Flask, host: str = '127.0.0.1', port: int = 0):
+    """Start the stub in a daemon thread, e.g. from a pytest fixture
+    :param app: application built by create_app.
+    :param host: interface to bind.
+    :param port: port to bind, 0 picks a free one.
+    :return: (server, base url). Call server.shutdown() to stop it.
+    """
+
+    server = make_server(host, port, app, threaded=True, request_handler=_QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, name='groups-stub', daemon=True).start()
+    return server, f'http://{host}:{server.server_port}/'
+
+
+def point_config_to(config: dict, base_url: str) -> dict:
+    """Redirect the tempo api and token urls of an environment config to the stub
+    :param config: environment config values, changed in place.
+    :param base_url: stub base url.
+    :return: the changed config.
+    """
+
+    os.environ.setdefault('OAUTHLIB_INSECURE_TRANSPORT', '1')
+    tempo_config = config.setdefault('tempo_configuration', {})
+    tempo_config.update({'api_base_url': base_url, 'api_base_query_url': base_url,
+                         'token_url': f'{base_url}token'})
+    tempo_config['customer_id'] = tempo_config.get('customer_id') or 208230
+    for key in ('x_customer_id', 'username', 'password', 'client_id', 'client_secret'):
+        tempo_config[key] = tempo_config.get(key) or 'stub'
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Local stand-in for the Groups query/command services')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency-ms', type=float, default=0)
+    parser.add_argument('--latency-jitter-ms', type=float, default=0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--server', choices=('gevent', 'flask'), default='gevent')
+    args = parser.parse_args()
+
+    if args.server == 'gevent':
+        from gevent import monkey
+        monkey.patch_all()
+        from gevent.pywsgi import WSGIServer
+        app = create_app(latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms,
+                         error_rate=args.error_rate)
+        WSGIServer((args.host, args.port), app, log=None).serve_forever()
+    else:
+        app = create_app(latency_ms=args.latency_ms, latency_jitter_ms=args.latency_jitter_ms,
+                         error_rate=args.error_rate)
+        app.run(host=args.host, port=args.port, threaded=True)
+
+
+if __name__ == '__main__':
+    main()
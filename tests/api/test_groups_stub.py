@@ -0,0 +1,146 @@
+# API TESTS AGAINST THE LOCAL GROUPS STUB
+import json
+from urllib.parse import urlsplit
+
+import pytest
+from requests import HTTPError
+
+from data.sample_groups_data import Group
+from resources.apis.sample_groups import Groups
+from resources.stubs.groups_stub import create_app, serve_in_thread, point_config_to
+from utils.enums.api import ApiResponseStatus
+from utils.resilience import ResiliencePolicy
+from utils.resource_tracker import ResourceTracker
+from utils.response_cache import ResponseCache
+from utils.schema_validator import validate_json_schema
+
+
+@pytest.fixture(scope="module")
+def stub_config():
+    server, base_url = serve_in_thread(create_app())
+    yield point_config_to({}, base_url)
+    server.shutdown()
+
+
+@pytest.fixture
+def cached_stub_config(stub_config):
+    ResponseCache.reset()
+    yield {**stub_config, 'response_cache': {'enabled': True, 'ttl': {'groups/classifications': 300}}}
+    ResponseCache.reset()
+
+
+class TestGroupsStub:
+
+    @pytest.mark.API
+    def test_create_and_list_group(self, stub_config):
+        group = Groups(stub_config)
+        group_data = Group.generate_base_group(group.customer_id, as_json=True)
+
+        created = group.create_group(group_data)['response']
+        result = group.get_groups(group_name=group_data['name'])
+
+        assert result['status']['responseStatus'] == ApiResponseStatus.SUCCESS
+        assert validate_json_schema(result, "sample_groups/sample_get_all_groups")
+        assert [item['uuid'] for item in result['response']['content']] == [created['uuid']]
+
+    @pytest.mark.API
+    def test_update_group_and_add_emails(self, stub_config):
+        group = Groups(stub_config)
+        created = group.create_group(Group.generate_base_group(group.customer_id, as_json=True))['response']
+
+        group.update_group(created['uuid'], {'name': 'Renamed group'})
+        group.add_emails_to_group(created['uuid'], {'emails': ['automation@testautomation.com']})
+
+        assert group.get_groups_by_uuid(created['uuid'])['response']['name'] == 'Renamed group'
+        emails = group.get_group_emails(created['uuid'])['response']['content']
+        assert [email['emailAddress'] for email in emails] == ['automation@testautomation.com']
+
+    @pytest.mark.API
+    def test_list_groups_second_page(self, stub_config):
+        group = Groups(stub_config)
+        group_data = Group.generate_base_group(group.customer_id, as_json=True)
+        created = [group.create_group(group_data)['response']['uuid'] for _ in range(3)]
+
+        result = group.get_groups(group_name=group_data['name'], pageable={'page': 1, 'size': 2, 'sort': ['name']})
+
+        assert (result['response']['number'], result['response']['totalElements']) == (1, 3)
+        assert [item['uuid'] for item in result['response']['content']] == created[2:]
+
+    @pytest.mark.API
+    def test_get_group_by_unknown_uuid(self, stub_config):
+        result = Groups(stub_config).get_groups_by_uuid('invalid uuid here')
+
+        assert result['status']['responseStatus'] == ApiResponseStatus.FAIL
+
+    @pytest.mark.API
+    def test_reference_data_is_cached(self, cached_stub_config):
+        group = Groups(cached_stub_config)
+
+        first = group.get_group_classifications()
+        second = group.get_group_classifications()
+
+        assert first == second
+        assert (group.cache.stats.hits, group.cache.stats.misses) == (1, 1)
+
+    @pytest.mark.API
+    def test_create_group_invalidates_cached_list(self, cached_stub_config):
+        cached_stub_config['response_cache']['ttl']['groups'] = 300
+        group = Groups(cached_stub_config)
+        group_data = Group.generate_base_group(group.customer_id, as_json=True)
+
+        group.get_groups(group_name=group_data['name'])
+        group.create_group(group_data)
+        result = group.get_groups(group_name=group_data['name'])
+
+        assert result['response']['totalElements'] == 1
+
+    @pytest.mark.API
+    def test_transient_errors_are_retried(self):
+        server, base_url = serve_in_thread(create_app(error_rate=1.0))
+        try:
+            config = point_config_to({'resilience': {'enabled': True, 'max_attempts': 3, 'backoff_base': 0}},
+                                     base_url)
+            group = Groups(config)
+
+            with pytest.raises(HTTPError, match='503'):
+                group.get_groups()
+        finally:
+            server.shutdown()
+
+        assert ResiliencePolicy.summary()[urlsplit(base_url).netloc].retries == 2
+
+    @pytest.mark.API
+    def test_tracked_groups_are_deleted(self, stub_config, tmp_path):
+        group = Groups({**stub_config, 'cleanup': {'enabled': True}})
+        tracker = ResourceTracker(tmp_path)
+        tracker.register_deleter('group', group.delete_group)
+        previous = tracker.activate()
+        try:
+            uuids = [group.create_group(Group.generate_base_group(group.customer_id, as_json=True))['response']['uuid']
+                     for _ in range(3)]
+            tracker.cleanup()
+        finally:
+            tracker.close()
+            if previous:
+                previous.activate()
+
+        assert (tracker.stats.tracked, tracker.stats.deleted) == (3, 3)
+        assert all(group.get_groups_by_uuid(group_uuid)['status']['responseStatus'] == ApiResponseStatus.FAIL
+                   for group_uuid in uuids)
+        assert not list(tmp_path.iterdir())
+
+    @pytest.mark.API
+    def test_orphans_of_crashed_run_are_deleted(self, stub_config, tmp_path):
+        group = Groups(stub_config)
+        created = group.create_group(Group.generate_base_group(group.customer_id, as_json=True))['response']
+        orphan = {'op': 'created', 'kind': 'group', 'key': created['uuid'], 'namespace': '', 'owner': None}
+        (tmp_path / 'ledger-1-1.jsonl').write_text(json.dumps(orphan) + '\n')
+
+        tracker = ResourceTracker(tmp_path)
+        tracker.register_deleter('group', group.delete_group)
+        tracker.cleanup_orphans()
+        tracker.close()
+
+        assert tracker.stats.orphans_deleted == 1
+        assert group.get_groups_by_uuid(created['uuid'])['status']['responseStatus'] == ApiResponseStatus.FAIL
+        assert not list(tmp_path.iterdir())
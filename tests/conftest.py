@@ -1,10 +1,40 @@
+import os
+import copy
+import json
+import functools
+import time
+import uuid
+from dataclasses import asdict
 import pytest
 from pathlib import Path
 from playwright.sync_api import sync_playwright
 from utils.config_loader import ConfigLoader
 from datetime import datetime
 from utils.zephyr_helper import ZephyrHelper
+from utils.data_pool import DataPool
+from utils.request_context_pool import RequestContextPool
+from utils.cassette import Cassettes
+from utils.response_cache import ResponseCache
+from utils.resilience import ResiliencePolicy
+from utils.rate_limiter import RateLimiter
+from utils.tracing import Tracer, TraceCollector
+from utils.resource_tracker import ResourceTracker
+from utils.flaky import FlakyReruns, FlakyStore
+from utils.latency_history import LatencyHistory, LatencyRecorder, format_regressions
+from utils.impact import CoverageRecorder, ImpactMap, changed_files, runs_everything
+from utils.sharding import DurationStore, ResultCollector, assign_shards, write_shard_results
+from utils.profiling import TestProfiler
+from utils.web_vitals import WebVitals, WebVitalsReport
+from utils.async_runner import AsyncioRunner
+from utils.emulation import (NO_PROFILE, ActionTimings, ActionTimingsReport, EmulationProfile, apply_profile,
+                             format_action_timings)
+from utils.browser_monitor import MIB, BrowserMemoryReport, BrowserMonitor
+from utils.preflight import DEPENDENT_MARKERS, ProbeResult, run_preflight, skipped_markers
+from resources.apis.sample_groups import Groups
+from resources.stubs.groups_stub import create_app, serve_in_thread, point_config_to
+from data.sample_groups_data import Group
 import traceback
+import warnings
 
 
 def pytest_addoption(parser):
@@ -27,13 +57,258 @@ def pytest_addoption(parser):
                      action="store",
                      default=None,
                      help="Name of the test cycle to create or use")
+    parser.addoption("--reuse-cycle",
+                     action="store_true",
+                     default=False,
+                     help="Publish into the existing cycle named --cycle-name and only send statuses and "
+                          "attachments which changed since the last published run")
+    parser.addoption("--groups-stub",
+                     action="store_true",
+                     default=False,
+                     help="Run Groups API tests against a local stand-in server instead of the tenant")
+    parser.addoption("--request-trace",
+                     action="store",
+                     default=None,
+                     help="Write every API request of the run to <path>.json and <path>.trace.json (Chrome trace)")
+    parser.addoption("--cassette-mode",
+                     action="store",
+                     default="passthrough",
+                     choices=Cassettes.MODES,
+                     help="Record API responses to cassettes, replay them offline or pass through to live services")
+    parser.addoption("--cassette-dir",
+                     action="store",
+                     default=str(Path(__file__).parent / '../cassettes'),
+                     help="Directory holding recorded cassettes")
+    parser.addoption("--flaky-reruns",
+                     action="store",
+                     type=int,
+                     default=None,
+                     help="Rerun failing tests in place up to this many times (default: flaky.reruns of the env config)")
+    parser.addoption("--quarantine",
+                     action="store",
+                     default="include",
+                     choices=("include", "exclude", "only"),
+                     help="Run quarantined flaky tests with the rest, leave them out, or run only them")
+    parser.addoption("--latency-history",
+                     action="store_true",
+                     default=False,
+                     help="Store per-endpoint API latency histograms of the run in the latency history database")
+    parser.addoption("--fail-on-latency-regression",
+                     action="store_true",
+                     default=False,
+                     help="Fail the session when an endpoint's p50/p95 regressed against the latency history")
+    parser.addoption("--impact-record",
+                     action="store_true",
+                     default=False,
+                     help="Record which project files every test executes into the impact map")
+    parser.addoption("--impact-since",
+                     action="store",
+                     default=None,
+                     help="Run only tests affected by files changed since this git revision, using the impact map")
+    parser.addoption("--impact-dir",
+                     action="store",
+                     default=str(Path(__file__).parent / '../.impact'),
+                     help="Directory holding the test impact map")
+    parser.addoption("--preflight",
+                     action="store",
+                     default="off",
+                     choices=("off", "abort", "skip"),
+                     help="Probe the configured services before any test runs and abort the session "
+                          "or skip the API/UI tests whose service is down (under xdist once, on the controller)")
+    parser.addoption("--preflight-timeout",
+                     action="store",
+                     type=float,
+                     default=3.0,
+                     help="Timeout in seconds of each pre-flight probe")
+    parser.addoption("--shard-index",
+                     action="store",
+                     type=int,
+                     default=None,
+                     help="Run only this shard (0-based) of the collected tests, see --shard-count")
+    parser.addoption("--shard-count",
+                     action="store",
+                     type=int,
+                     default=None,
+                     help="Split the collected tests into this many shards balanced on recorded durations")
+    parser.addoption("--shard-results-dir",
+                     action="store",
+                     default=None,
+                     help="Directory of the shard result files (default: sharding.results_dir of the env config)")
+    parser.addoption("--store-durations",
+                     action="store_true",
+                     default=False,
+                     help="Record the test durations used to balance shards. Sharded runs only read them, "
+                          "`python -m utils.sharding --durations` records the merged durations of all shards")
+    parser.addoption("--web-vitals",
+                     action="store_true",
+                     default=False,
+                     help="Collect navigation timing and Core Web Vitals of every BasePage navigation and tab switch "
+                          "(also enabled by web_vitals.enabled of the env config)")
+    parser.addoption("--emulation",
+                     action="store",
+                     default=None,
+                     help="Throttle UI tests with this emulation profile of the env config (e.g. 3g, slow-4g, cpu-4x); "
+                          "the EMULATION marker of a test takes precedence")
+    parser.addoption("--profile",
+                     action="store_true",
+                     default=False,
+                     help="Profile CPU (cProfile) and peak Python memory (tracemalloc) of every test")
+    parser.addoption("--profile-dir",
+                     action="store",
+                     default=str(Path(__file__).parent / '../.profiles'),
+                     help="Directory receiving a subdirectory of per-test profiles for every profiled run")
+    parser.addoption("--profile-top",
+                     action="store",
+                     type=int,
+                     default=20,
+                     help="Number of hottest framework functions and memory heaviest tests in the profile summary")
+
+
+def pytest_configure(config):
+    config.flaky_config = ConfigLoader.load_config(config_path(config)).get('flaky') or {}
+    reruns = config.getoption("--flaky-reruns")
+    reruns = config.flaky_config.get('reruns', 0) if reruns is None else reruns
+    config.flaky_store = FlakyStore(config.flaky_config.get('store') or Path(__file__).parent / '../.flaky/store.json',
+                                    config.flaky_config.get('window', 20)) if config.flaky_config else None
+    if config.flaky_store is not None or reruns:
+        config.flaky_reruns = FlakyReruns(reruns, config.flaky_store)
+        config.pluginmanager.register(config.flaky_reruns, 'flaky-reruns')
+    Cassettes.configure(config.getoption("--cassette-mode"), config.getoption("--cassette-dir"))
+    trace_path = config.getoption("--request-trace")
+    if trace_path:
+        worker = os.environ.get("PYTEST_XDIST_WORKER")
+        config.trace_collector = TraceCollector(f"{trace_path}-{worker}" if worker else trace_path)
+        Tracer.subscribe(config.trace_collector)
+    if config.getoption("--latency-history"):
+        # workers inherit the run id from the controller, their histograms are stored as one run
+        os.environ.setdefault("PYTEST_LATENCY_RUN_ID", uuid.uuid4().hex)
+        config.latency_recorder = LatencyRecorder()
+        Tracer.subscribe(config.latency_recorder)
+    shard_index, shard_count = config.getoption("--shard-index"), config.getoption("--shard-count")
+    if shard_index is not None or shard_count is not None:
+        if shard_count is None or shard_count < 1 or shard_index is None or not 0 <= shard_index < shard_count:
+            raise pytest.UsageError("--shard-count needs a positive count and --shard-index between 0 and count - 1")
+    config.sharding_config = ConfigLoader.get_config().get('sharding') or {}
+    config.result_collector = ResultCollector(extract_relevant_stack_trace)
+    config.pluginmanager.register(config.result_collector, 'result-collector')
+    if config.getoption("--profile"):
+        profile_dir = Path(config.getoption("--profile-dir")) / datetime.now().strftime('%Y%m%d_%H%M%S')
+        config.pluginmanager.register(TestProfiler(profile_dir, config.rootpath, config.getoption("--profile-top")),
+                                      'test-profiler')
+    if not config.pluginmanager.hasplugin('asyncio'):
+        # pytest-asyncio, when installed, runs the async tests itself
+        config.asyncio_runner = AsyncioRunner((ConfigLoader.get_config().get('asyncio') or {}).get('slow_callback_ms'))
+        config.pluginmanager.register(config.asyncio_runner, 'asyncio-runner')
+    WebVitals.configure(config.getoption("--web-vitals")
+                        or bool((ConfigLoader.get_config().get('web_vitals') or {}).get('enabled')))
+    # action timing is switched on per collected items, which the xdist controller does not see
+    config.action_timings_report = ActionTimingsReport()
+    config.pluginmanager.register(config.action_timings_report, 'action-timings-report')
+    if WebVitals.enabled:
+        config.web_vitals_report = WebVitalsReport()
+        config.pluginmanager.register(config.web_vitals_report, 'web-vitals-report')
+    if (ConfigLoader.get_config().get('browser_monitor') or {}).get('enabled'):
+        config.browser_memory_report = BrowserMemoryReport()
+        config.pluginmanager.register(config.browser_memory_report, 'browser-memory-report')
+    if config.getoption("--impact-record"):
+        config.impact_recorder = CoverageRecorder(config.rootpath)
+        config.impact_map = ImpactMap.load(config.getoption("--impact-dir"))
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_runtest_protocol(item):
+    Tracer.current_test = item.nodeid
+    recorder = getattr(item.config, 'impact_recorder', None)
+    if recorder:
+        start = time.perf_counter()
+        recorder.start()
+    yield
+    if recorder:
+        files = (recorder.stop() | recorder.imported_files(str(item.path))
+                 | recorder.files_of_fixtures(fixturedefs[-1] for fixturedefs
+                                              in item._fixtureinfo.name2fixturedefs.values()))
+        item.config.impact_map.record(item.nodeid, files, time.perf_counter() - start)
+    Tracer.current_test = None
+
+
+@pytest.hookimpl(hookwrapper=True)
+def pytest_fixture_setup(fixturedef, request):
+    recorder = getattr(request.config, 'impact_recorder', None)
+    shared = recorder is not None and fixturedef.scope != 'function'
+    if shared:
+        recorder.start_fixture()
+    yield
+    if shared:
+        recorder.stop_fixture(fixturedef.baseid, fixturedef.argname)
+
+
+def config_path(config):
+    env = config.getoption("--env")
+    return Path(__file__).parent / f'../configs/{env}.yaml'
 
 
 @pytest.fixture(scope='session', autouse=True)
 def load_config(pytestconfig):
-    env = pytestconfig.getoption("--env")
-    config_path = Path(__file__).parent / f'../configs/{env}.yaml'
-    ConfigLoader.load_config(config_path)
+    ConfigLoader.load_config(config_path(pytestconfig))
+    RateLimiter.configure(ConfigLoader.get_config().get('rate_limits'))
+
+
+@pytest.fixture(scope='session', autouse=True)
+def groups_stub(pytestconfig, load_config):
+    if not pytestconfig.getoption("--groups-stub"):
+        yield None
+        return
+    server, base_url = serve_in_thread(create_app())
+    point_config_to(ConfigLoader.get_config(), base_url)
+    yield base_url
+    server.shutdown()
+
+
+@pytest.fixture(scope='session', autouse=True)
+def resource_tracker(pytestconfig, groups_stub):
+    config = ConfigLoader.get_config()
+    cleanup_config = config.get('cleanup')
+    # stub groups disappear with the stub, there is nothing to clean up
+    tracker = None if pytestconfig.getoption("--groups-stub") else ResourceTracker.from_config(
+        cleanup_config, Path(__file__).parent / '../resource_ledger',
+        config.get('tempo_configuration', {}).get('api_base_url', ''))
+    if tracker is None:
+        yield None
+        return
+
+    @functools.lru_cache(maxsize=None)
+    def groups_api():
+        # created on the first deletion, so runs which create nothing do not fetch a token for it
+        return Groups(config)
+
+    def delete_groups_by_name(group_name):
+        pageable = {"page": 0, "size": 50, "sort": ["string"]}
+        for group in groups_api().get_groups(group_name=group_name, pageable=pageable)['response']['content']:
+            groups_api().delete_group(group['uuid'])
+
+    tracker.register_deleter('group', lambda group_uuid: groups_api().delete_group(group_uuid))
+    tracker.register_deleter('group_name', delete_groups_by_name)
+    tracker.activate()
+    if cleanup_config.get('orphans_on_start', True):
+        tracker.cleanup_orphans()
+    yield tracker
+    tracker.cleanup()
+    tracker.close()
+    pytestconfig.cleanup_stats = tracker.stats
+
+
+@pytest.fixture(scope='module', autouse=True)
+def module_resources(request, resource_tracker):
+    yield
+    if resource_tracker and resource_tracker.scope == 'module':
+        resource_tracker.cleanup(module=request.node.nodeid)
+
+
+@pytest.fixture(scope='function', autouse=True)
+def test_resources(request, resource_tracker):
+    yield
+    if resource_tracker and resource_tracker.scope == 'test':
+        resource_tracker.cleanup(owner=request.node.nodeid)
 
 
 @pytest.fixture(scope="session")
@@ -53,20 +328,98 @@ def playwright():
 
 
 @pytest.fixture(scope="session")
-def browser(config, playwright):
+def browser_monitor(config, playwright):
     browser_type = config.get('browser', 'chromium')
-    browser = playwright[browser_type].launch(headless=config.get('headless', True))
-    yield browser
-    browser.close()
+    options = config.get('browser_monitor') or {}
+    monitor = BrowserMonitor(lambda: playwright[browser_type].launch(headless=config.get('headless', True)),
+                             bool(options.get('enabled')), options.get('max_rss_mb'), options.get('max_cpu_percent'))
+    yield monitor
+    monitor.close()
+
+
+@pytest.fixture(scope="function")
+def browser(request, browser_monitor):
+    # one browser per session; the monitor may relaunch it between tests
+    yield browser_monitor.browser
+    measurements = browser_monitor.sample()
+    if measurements:
+        request.node.user_properties.extend((f'browser_{name}', value) for name, value in measurements.items())
+
+
+@pytest.fixture(scope="session")
+def request_context_pool(pytestconfig, playwright):
+    pool = RequestContextPool(playwright)
+    yield pool
+    pool.close()
+    pytestconfig.request_context_pool_stats = pool.stats
 
 
 @pytest.fixture(scope="function")
-def page(browser):
+def page(request, browser):
     page = browser.new_page()
+    marker = request.node.get_closest_marker("EMULATION")
+    profile_name = marker.args[0] if marker else request.config.getoption("--emulation")
+    ActionTimings.current_profile = profile_name or NO_PROFILE
+    if profile_name:
+        profile = EmulationProfile.from_config(ConfigLoader.get_config().get('emulation_profiles'), profile_name)
+        unsupported = apply_profile(page, profile)
+        if unsupported:
+            warnings.warn(f"{browser.browser_type.name} cannot emulate {', '.join(unsupported)} of the "
+                          f"'{profile_name}' profile, only its latency is applied")
     yield page
+    web_vitals = WebVitals.take()
+    if web_vitals:
+        request.node.user_properties.append(('web_vitals', web_vitals))
+    action_timings = ActionTimings.take()
+    if action_timings:
+        request.node.user_properties.append(('action_timings', action_timings))
+    ActionTimings.current_profile = NO_PROFILE
     page.close()
 
 
+@pytest.fixture(scope="session")
+def groups_pool(config, groups_stub, resource_tracker):
+    pool_config = config.get('data_pool', {}).get('groups', {})
+    groups_api = Groups(config)
+    customer_id = config['tempo_configuration'].get('customer_id')
+    originals = {}
+
+    def create_group():
+        group_data = Group.generate_base_group(customer_id, as_json=True)
+        with ResourceTracker.session_owned():
+            group = groups_api.create_group(group_data)['response']
+        originals[group['uuid']] = copy.deepcopy(group)
+        return group
+
+    def reset_group(group):
+        # from the snapshot taken at creation, the leased dict may have been changed by the test
+        original = originals[group['uuid']]
+        groups_api.update_group(original['uuid'], {key: value for key, value in original.items() if key != 'uuid'})
+        return copy.deepcopy(original)
+
+    def delete_group(group):
+        groups_api.delete_group(group['uuid'])
+
+    # with cleanup enabled the resource tracker deletes the session owned pool groups
+    deletes_supported = groups_stub or (config.get('cleanup') or {}).get('deletes_supported')
+    destroy = delete_group if deletes_supported and not resource_tracker else None
+    pool = DataPool(create_group, reset_group, destroy=destroy, **pool_config)
+    pool.fill()
+    yield pool
+    pool.close()
+
+
+@pytest.fixture(scope="function")
+def pooled_group(groups_pool):
+    with groups_pool.leased() as group:
+        yield group
+
+
+@pytest.fixture(scope="function", autouse=True)
+def cassette(request):
+    yield Cassettes.use(request.module.__name__)
+
+
 def pytest_collection_modifyitems(config, items):
     test_id = config.getoption("--test-id")
     if test_id:
@@ -79,12 +432,123 @@ def pytest_collection_modifyitems(config, items):
                 deselected_items.append(item)
         items[:] = selected_items
         config.hook.pytest_deselected(items=deselected_items)
+    if config.getoption("--quarantine") != "include" and config.flaky_store is not None:
+        select_quarantine_lane(config, items, config.getoption("--quarantine") == "only")
+    impact_since = config.getoption("--impact-since")
+    if impact_since and items:
+        select_impacted(config, items, impact_since)
+    if config.getoption("--shard-count") is not None and items:
+        select_shard(config, items, config.getoption("--shard-index"), config.getoption("--shard-count"))
+    ActionTimings.enabled = bool(config.getoption("--emulation")
+                                 or any(item.get_closest_marker("EMULATION") for item in items))
+    if config.getoption("--preflight") != "off" and items:
+        preflight(config, items)
+
+
+def select_quarantine_lane(config, items, quarantined):
+    """Keep only the quarantined flaky tests, or only the others."""
+    threshold = config.flaky_config.get('quarantine_score', 0.3)
+    min_runs = config.flaky_config.get('min_runs', 5)
+    selected_items = [item for item in items
+                      if config.flaky_store.quarantined(item.nodeid, threshold, min_runs) == quarantined]
+    deselected_items = [item for item in items if item not in selected_items]
+    items[:] = selected_items
+    config.hook.pytest_deselected(items=deselected_items)
+
+
+def select_impacted(config, items, revision):
+    """Deselect tests which execute none of the files changed since the revision."""
+    impact_map = ImpactMap.load(config.getoption("--impact-dir"))
+    changed = changed_files(config.rootpath, revision)
+    if not impact_map.tests or runs_everything(changed):
+        config.impact_summary = f"all {len(items)} tests selected, " + (
+            f"{', '.join(runs_everything(changed))} changed" if impact_map.tests else "no impact map recorded")
+        return
+    selected_items = [item for item in items if impact_map.affected(item.nodeid, changed)]
+    deselected_items = [item for item in items if item not in selected_items]
+    saved = sum(impact_map.tests[item.nodeid]['duration'] for item in deselected_items)
+    items[:] = selected_items
+    config.hook.pytest_deselected(items=deselected_items)
+    config.impact_summary = (f"{len(selected_items)} tests selected, {len(deselected_items)} skipped "
+                             f"({len(changed)} files changed since {revision}), ~{saved:.1f}s saved")
+
+
+def select_shard(config, items, index, count):
+    """Keep the tests of one shard; tests sharing a TEST_ID stay together."""
+    units = {}
+    for item in items:
+        marker = item.get_closest_marker("TEST_ID")
+        unit = f"TEST_ID {marker.kwargs['id']}" if marker and marker.kwargs.get('id') else item.nodeid
+        units.setdefault(unit, []).append(item.nodeid)
+    shards = assign_shards(units, durations_store(config).durations, count)
+    selected_items = [item for item in items if shards[item.nodeid] == index]
+    deselected_items = [item for item in items if shards[item.nodeid] != index]
+    items[:] = selected_items
+    config.hook.pytest_deselected(items=deselected_items)
+
+
+def durations_store(config):
+    return DurationStore(config.sharding_config.get('durations') or Path(__file__).parent / '../.durations.json')
+
+
+def preflight(config, items):
+    """
+    Probe the services the selected tests need, before any browser or session fixture starts.
+
+    Under xdist the controller has already probed in pytest_sessionstart; the workers take its
+    results from PYTEST_PREFLIGHT_RESULTS instead of probing each on their own.
+    """
+    shared_results = os.environ.get("PYTEST_PREFLIGHT_RESULTS")
+    if shared_results is not None:
+        config.preflight_results = [ProbeResult(**result) for result in json.loads(shared_results)]
+    else:
+        probe_services(config, {probe for probe, dependents in DEPENDENT_MARKERS.items()
+                                if any(item.get_closest_marker(marker) for item in items for marker in dependents)})
+    down = [result for result in config.preflight_results if not result.healthy]
+    if not down:
+        return
+    details = ', '.join(f"{result.name} ({result.url}: {result.detail})" for result in down)
+    skip = pytest.mark.skip(reason=f"Pre-flight failed: {details}")
+    skipped = skipped_markers(config.preflight_results)
+    for item in items:
+        if any(item.get_closest_marker(marker) for marker in skipped):
+            item.add_marker(skip)
+
+
+def probe_services(config, markers):
+    """Probe the services of the given probe markers, ending the session in abort mode when one is down."""
+    if config.getoption("--groups-stub"):
+        markers.discard('API')
+    if config.getoption("--push-to-zephyr"):
+        markers.add('ZEPHYR')
+    env_config = ConfigLoader.load_config(config_path(config))
+    config.preflight_results = run_preflight(env_config, config.getoption("--preflight-timeout"), markers)
+    down = [result for result in config.preflight_results if not result.healthy]
+    if down and config.getoption("--preflight") == "abort":
+        details = ', '.join(f"{result.name} ({result.url}: {result.detail})" for result in down)
+        pytest.exit(f"Pre-flight failed: {details}", returncode=pytest.ExitCode.INTERRUPTED)
+
+
+def pytest_sessionstart(session):
+    config = session.config
+    if (config.getoption("--preflight") == "off" or config.getoption("dist", "no") == "no"
+            or hasattr(config, 'workerinput')):
+        return
+    # the xdist controller collects no tests: it probes every service the run may need, once,
+    # before the workers start, and hands the results to them through the environment
+    probe_services(config, {'API', 'UI'})
+    os.environ["PYTEST_PREFLIGHT_RESULTS"] = json.dumps([asdict(result) for result in config.preflight_results])
 
 
 @pytest.hookimpl(tryfirst=True, hookwrapper=True)
 def pytest_runtest_makereport(item):
     outcome = yield
     report = outcome.get_result()
+    setattr(item, f"rep_{report.when}", report)
+    marker = item.get_closest_marker("TEST_ID")
+    if marker and marker.kwargs.get('id'):
+        report.user_properties.append(('test_case_key', marker.kwargs['id']))
+    report.user_properties.append(('attempts', getattr(item, 'attempts', 1)))
 
     if report.when == 'call' and report.failed:
         page = item.funcargs.get('page')
@@ -94,12 +558,27 @@ def pytest_runtest_makereport(item):
             screenshot_dir.mkdir(exist_ok=True)
             screenshot_path = screenshot_dir / f"{item.nodeid.replace('::', '_')}_{timestamp}.png"
             page.screenshot(path=str(screenshot_path))
-            # Store the screenshot path in the item
+            # Store the screenshot path in the item and the report
             item.screenshot_path = screenshot_path
+            report.user_properties.append(('screenshot', str(screenshot_path)))
             # Store the failure report in the item
             item.failure_report = report
 
 
+def store_latency_history(session, latency_recorder):
+    """Store this process' histograms; the controller then compares the run with the history."""
+    config = session.config
+    env = config.getoption("--env")
+    options = dict(ConfigLoader.get_config().get('latency_history') or {})
+    history = LatencyHistory(options.pop('db', None) or Path(__file__).parent / '../.latency/history.sqlite')
+    history.store(os.environ["PYTEST_LATENCY_RUN_ID"], env, latency_recorder.histograms)
+    if hasattr(config, 'workerinput'):
+        return
+    config.latency_regressions = history.compare(env, os.environ["PYTEST_LATENCY_RUN_ID"], **options)
+    if config.latency_regressions and config.getoption("--fail-on-latency-regression"):
+        session.exitstatus = pytest.ExitCode.TESTS_FAILED
+
+
 def extract_relevant_stack_trace(longrepr):
     if isinstance(longrepr, tuple):
         # Handle case when longrepr is a tuple (e.g., (file, lineno, msg))
@@ -115,64 +594,108 @@ def extract_relevant_stack_trace(longrepr):
         return str(longrepr)
 
 
+def pytest_terminal_summary(terminalreporter):
+    for line in format_regressions(getattr(terminalreporter.config, 'latency_regressions', [])):
+        terminalreporter.write_line(f"Latency regression {line}", red=True)
+    flaky_reruns = getattr(terminalreporter.config, 'flaky_reruns', None)
+    if flaky_reruns and flaky_reruns.flaky:
+        terminalreporter.write_line(f"Flaky: {len(flaky_reruns.flaky)} tests passed on rerun: "
+                                    f"{', '.join(flaky_reruns.flaky)}")
+    impact_summary = getattr(terminalreporter.config, 'impact_summary', None)
+    if impact_summary:
+        terminalreporter.write_line(f"Impact analysis: {impact_summary}")
+    for result in getattr(terminalreporter.config, 'preflight_results', []):
+        terminalreporter.write_line(f"Pre-flight {result.name}: {'up' if result.healthy else 'DOWN'} "
+                                    f"in {result.latency_ms:.1f}ms ({result.detail})")
+    browser_memory_report = getattr(terminalreporter.config, 'browser_memory_report', None)
+    if browser_memory_report and browser_memory_report.samples:
+        terminalreporter.write_line(f"Browser monitor: {browser_memory_report.samples} samples, peak RSS "
+                                    f"{browser_memory_report.peak_rss / MIB:.0f}MiB, "
+                                    f"{len(browser_memory_report.recycles)} relaunches")
+        for recycle in browser_memory_report.recycles:
+            terminalreporter.write_line(f"Browser relaunched after {recycle}")
+        top = ConfigLoader.get_config()['browser_monitor'].get('report_top') or 10
+        for nodeid, rss in browser_memory_report.leak_prone(top):
+            terminalreporter.write_line(f"Browser memory +{rss / MIB:.1f}MiB {nodeid}")
+    web_vitals_report = getattr(terminalreporter.config, 'web_vitals_report', None)
+    for name, metrics in web_vitals_report.summary().items() if web_vitals_report else []:
+        terminalreporter.write_line(f"Web vitals {name} (p75 of {metrics['count']}): " + ', '.join(
+            f"{metric} {value:g}" for metric, value in metrics.items() if metric != 'count' and value is not None))
+    asyncio_runner = getattr(terminalreporter.config, 'asyncio_runner', None)
+    for slow_callback in asyncio_runner.slow_callbacks if asyncio_runner else []:
+        terminalreporter.write_line(f"Slow async callback in {slow_callback.test}: {slow_callback.callback} "
+                                    f"blocked the loop for {slow_callback.seconds:.3f}s", yellow=True)
+    for line in format_action_timings(terminalreporter.config.action_timings_report.summary()):
+        terminalreporter.write_line(f"POM action {line}")
+    for budget, stats in RateLimiter.summary().items():
+        terminalreporter.write_line(f"Rate limit {budget}: {stats.requests} requests, {stats.throttled} throttled "
+                                    f"for {stats.throttled_seconds:.2f}s")
+    for host, metrics in ResiliencePolicy.summary().items():
+        terminalreporter.write_line(f"Resilience {host}: {metrics.attempts} attempts, {metrics.retries} retries "
+                                    f"({metrics.backoff_seconds:.2f}s backoff), {metrics.breaker_opens} breaker opens, "
+                                    f"{metrics.short_circuited} short-circuited")
+    pool_stats = getattr(terminalreporter.config, 'request_context_pool_stats', None)
+    if pool_stats:
+        terminalreporter.write_line(f"Request context pool: {pool_stats.borrows} borrows, "
+                                    f"{pool_stats.created} contexts created, "
+                                    f"{pool_stats.discarded} discarded with state, "
+                                    f"borrow mean {pool_stats.mean_borrow_ms:.3f}ms, "
+                                    f"max {pool_stats.max_borrow_ms:.3f}ms")
+    cache = ResponseCache.instance()
+    if cache:
+        stats = cache.stats
+        terminalreporter.write_line(f"Response cache: {stats.hits} hits, {stats.misses} misses, "
+                                    f"{stats.revalidated} revalidated, {stats.evictions} evicted, "
+                                    f"{stats.invalidations} invalidated")
+    cleanup_stats = getattr(terminalreporter.config, 'cleanup_stats', None)
+    if cleanup_stats:
+        terminalreporter.write_line(f"Resource cleanup: {cleanup_stats.tracked} tracked, {cleanup_stats.deleted} deleted, "
+                                    f"{cleanup_stats.failed} failed, {cleanup_stats.orphans_deleted} orphans deleted "
+                                    f"in {cleanup_stats.seconds:.2f}s")
+    for name, stats in Cassettes.summary().items():
+        terminalreporter.write_line(f"Cassette {name}: replayed {stats.replayed}, recorded {stats.recorded}, "
+                                    f"saved {stats.saved_ms / 1000:.2f}s")
+
+
 @pytest.hookimpl(tryfirst=True)
 def pytest_sessionfinish(session, exitstatus):
+    Cassettes.save_all()
+    if session.config.flaky_store is not None:
+        session.config.flaky_store.save()
+    recorder = getattr(session.config, 'impact_recorder', None)
+    if recorder:
+        recorder.close()
+        session.config.impact_map.save(os.environ.get("PYTEST_XDIST_WORKER", "main"))
+    try:
+        if not hasattr(session.config, 'workerinput'):
+            report_results(session)
+    finally:
+        # after publishing, so the Zephyr requests are traced and timed as well
+        trace_collector = getattr(session.config, 'trace_collector', None)
+        if trace_collector:
+            trace_collector.write()
+        latency_recorder = getattr(session.config, 'latency_recorder', None)
+        if latency_recorder:
+            store_latency_history(session, latency_recorder)
+
+
+def report_results(session):
+    """Store the durations, write the shard results or publish the results to Zephyr."""
+    results = list(session.config.result_collector.results.values())
+    shard_count = session.config.getoption("--shard-count")
+    if shard_count is None and session.config.getoption("--store-durations"):
+        durations_store(session.config).save({result.nodeid: result.duration for result in results})
+    if shard_count is not None:
+        # shards are published together by `python -m utils.sharding` after all of them finished
+        results_dir = (session.config.getoption("--shard-results-dir")
+                       or session.config.sharding_config.get('results_dir') or Path(__file__).parent / '../shard_results')
+        write_shard_results(results_dir, session.config.getoption("--shard-index"), shard_count, results)
+        return
     if not session.config.getoption("--push-to-zephyr"):
         return
     cycle_name = session.config.getoption("--cycle-name")
     if not cycle_name:
         cycle_name = f"Automation Run {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
     config = ConfigLoader.get_config()['zephyr']
-    zephyr_helper = ZephyrHelper(config)
-    new_cycle = zephyr_helper.create_test_cycle(cycle_name)
-
-    if not new_cycle:
-        print("Failed to create or retrieve test cycle.")
-        return
-
-    cycle_id = new_cycle['id']
-    issue_ids = []
-
-    for item in session.items:
-        test_case_key = None
-        marker = item.get_closest_marker("TEST_ID")
-        if marker and marker.kwargs.get('id'):
-            test_case_key = marker.kwargs.get('id')
-        if test_case_key:
-            issue_ids.append(test_case_key)
-
-    if issue_ids:
-        add_cases_response = zephyr_helper.add_test_case_to_cycle(cycle_id, issue_ids)
-        if not add_cases_response:
-            print("Failed to add test cases to the cycle.")
-            return
-
-        execution_ids = zephyr_helper.get_executions_by_cycle(cycle_id, issue_ids)
-        if execution_ids:
-            for item in session.items:
-                test_case_key = None
-                marker = item.get_closest_marker("TEST_ID")
-                if marker and marker.kwargs.get('id'):
-                    test_case_key = marker.kwargs.get('id')
-                if not test_case_key:
-                    continue
-
-                execution_id = execution_ids.get(test_case_key)
-                if not execution_id:
-                    continue
-                comment = None
-                status = 1 if item.rep_call.passed else 2  # 1 for pass, 2 for fail
-                if hasattr(item, 'failure_report'):
-                    screenshot_path = getattr(item, 'screenshot_path', None)
-                    if screenshot_path:
-                        with open(screenshot_path, 'rb') as f:
-                            screenshot_data = f.read()
-                if hasattr(item, 'rep_call') and item.rep_call.failed:
-                    # Capture short stack trace from longrepr
-                    comment = extract_relevant_stack_trace(item.rep_call.longrepr)
-                zephyr_helper.update_test_results(execution_id, cycle_id, status, comment)
-
-                screenshot_path = getattr(item, 'screenshot_path', None)
-
-                if screenshot_path:
-                    zephyr_helper.upload_attachment(str(screenshot_path), execution_id, cycle_id)
+    snapshot_dir = config.get('snapshot_dir') or Path(__file__).parent / '../zephyr_snapshots'
+    ZephyrHelper(config).publish_results(cycle_name, results, session.config.getoption("--reuse-cycle"), snapshot_dir)
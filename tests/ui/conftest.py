@@ -0,0 +1,27 @@
+import pytest
+
+from tests.ui.user_service import SQLiteStorage, User, UserService
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def user_service(request):
+    """UserService on each storage backend."""
+    if request.param == 'memory':
+        yield UserService()
+        return
+    storage = SQLiteStorage()
+    yield UserService(storage)
+    storage.close()
+
+
+@pytest.fixture
+def populated_user_service(user_service):
+    user_service.bulk_create_users([("admin", "admin@test.com", "admin123"),
+                                    ("user1", "user1@test.com", "user123")])
+    user_service.add_role("admin", "admin")
+    return user_service
+
+
+@pytest.fixture
+def sample_user():
+    return User("sample", "sample@test.com", "sample123")
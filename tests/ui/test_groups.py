@@ -27,3 +27,15 @@ class TestGroupPage:
         groups_page.assert_group_in_list(group_data.name)
 
         """ Test cleanup """
+
+    @pytest.mark.UI
+    @pytest.mark.REGRESSION
+    def test_pooled_group_in_list(self, page, pooled_group):
+        """ Pages initialization """
+        login_page = LoginPage(page)
+        groups_page = GroupsPage(page)
+
+        """ Test start """
+        login_page.login()
+        groups_page.navigate_to_tab(Tabs.GROUPS)
+        groups_page.assert_group_in_list(pooled_group['name'])
@@ -84,4 +84,94 @@ class TestUserRoles:
 
         assert sample_user.has_role("admin")
         assert sample_user.has_role("moderator")
-        assert not sample_user.has_role("user")
\ No newline at end of file
+        assert not sample_user.has_role("user")
+
+class TestUserLookups:
+    """Тести індексів, пакетних операцій і посторінкового обходу"""
+
+    @pytest.mark.unit
+    def test_get_user_by_email(self, populated_user_service):
+        """Пошук за email без урахування регістру"""
+        user = populated_user_service.get_user_by_email("ADMIN@test.com")
+        assert user.username == "admin"
+        assert populated_user_service.get_user_by_email("missing@test.com") is None
+
+    @pytest.mark.unit
+    def test_get_users_with_role(self, populated_user_service):
+        """Пошук за роллю слідує за додаванням і видаленням"""
+        populated_user_service.add_role("user1", "admin")
+        assert {user.username for user in populated_user_service.get_users_with_role("admin")} == {"admin", "user1"}
+
+        populated_user_service.delete_user("admin")
+        assert [user.username for user in populated_user_service.get_users_with_role("admin")] == ["user1"]
+        assert populated_user_service.get_user_by_email("admin@test.com") is None
+
+    @pytest.mark.unit
+    def test_bulk_create_is_atomic(self, populated_user_service):
+        """Пакетне створення нічого не зберігає, якщо один запис невалідний"""
+        with pytest.raises(ValueError, match="Пароль має бути не менше 6 символів"):
+            populated_user_service.bulk_create_users([("user2", "u2@test.com", "user234"),
+                                                      ("user3", "u3@test.com", "123")])
+        assert populated_user_service.get_user("user2") is None
+
+    @pytest.mark.unit
+    def test_bulk_authenticate(self, populated_user_service):
+        """Пакетна аутентифікація зберігає порядок запиту"""
+        populated_user_service.deactivate_user("user1")
+        users = populated_user_service.bulk_authenticate([("admin", "admin123"), ("admin", "wrongpassword"),
+                                                          ("user1", "user123"), ("nonexistent", "password")])
+        assert [user and user.username for user in users] == ["admin", None, None, None]
+
+    @pytest.mark.unit
+    def test_iter_users(self, user_service):
+        """Посторінковий обхід у порядку створення"""
+        user_service.bulk_create_users((f"user{i}", f"user{i}@test.com", "password") for i in range(5))
+        pages = [[user.username for user in page] for page in user_service.iter_users(page_size=2)]
+        assert pages == [["user0", "user1"], ["user2", "user3"], ["user4"]]
+
+
+class TestUserWriteThrough:
+    """Зміни користувача зберігаються на кожному бекенді"""
+
+    @pytest.mark.unit
+    def test_changes_of_a_fetched_user_are_stored(self, populated_user_service):
+        """Роль і деактивація через отриманий об'єкт видно в сервісі"""
+        user = populated_user_service.get_user("user1")
+        user.add_role("admin")
+        user.is_active = False
+
+        assert {user.username for user in populated_user_service.get_users_with_role("admin")} == {"admin", "user1"}
+        assert populated_user_service.get_user("user1").has_role("admin")
+        assert populated_user_service.get_user("user1").is_active is False
+        assert populated_user_service.authenticate("user1", "user123") is None
+
+    @pytest.mark.unit
+    def test_changes_of_a_created_user_are_stored(self, user_service):
+        """Зміни щойно створеного користувача зберігаються"""
+        user = user_service.create_user("newuser", "new@test.com", "password123")
+        user.add_role("editor")
+
+        assert [user.username for user in user_service.get_users_with_role("editor")] == ["newuser"]
+
+    @pytest.mark.unit
+    def test_deleted_user_leaves_no_role(self, populated_user_service):
+        """Видалений користувач не передає ролі новому з тим самим ім'ям"""
+        user = populated_user_service.get_user("user1")
+        populated_user_service.delete_user("user1")
+        user.add_role("moderator")
+        populated_user_service.create_user("user1", "user1@test.com", "user123")
+
+        assert populated_user_service.get_users_with_role("moderator") == []
+
+    @pytest.mark.unit
+    def test_users_is_a_read_only_mapping(self, populated_user_service):
+        """users читається як словник на кожному бекенді"""
+        users = populated_user_service.users
+
+        assert list(users) == ["admin", "user1"]
+        assert len(users) == 2 and "admin" in users
+        assert users["admin"].has_role("admin")
+        assert users.get("missing") is None
+        assert [user.username for user in users.values()] == ["admin", "user1"]
+        with pytest.raises(KeyError):
+            users["missing"]
@@ -1,65 +1,326 @@
 import hashlib
-from typing import Optional, Dict, List
+import sqlite3
+from collections.abc import Mapping
+from itertools import islice
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+MIN_PASSWORD_LENGTH = 6
+SQLITE_VARIABLES = 500  # usernames per IN (...) query, below SQLite's host parameter limit
+
+
+class Roles(set):
+    """Set of role names; `count` keeps the list API of older callers."""
+
+    def count(self, role: str) -> int:
+        return int(role in self)
 
 
 class User:
-    def __init__(self, username: str, email: str, password: str):
+    """
+    A user account.
+
+    Users handed out by a storage are bound to it: setting `is_active` and `add_role` write
+    through, so every backend sees the change. Username, email and password are fixed once stored.
+    """
+    __slots__ = ('username', 'email', 'password_hash', '_is_active', 'roles', '_storage')
+
+    def __init__(self, username: str, email: str, password: Optional[str] = None, *,
+                 password_hash: Optional[str] = None, is_active: bool = True, roles: Iterable[str] = ()):
         self.username = username
         self.email = email
-        self.password_hash = self._hash_password(password)
-        self.is_active = True
-        self.roles = []
+        self.password_hash = password_hash if password_hash is not None else self._hash_password(password)
+        self._is_active = is_active
+        self.roles = Roles(roles)
+        self._storage = None
 
-    def _hash_password(self, password: str) -> str:
+    @staticmethod
+    def _hash_password(password: str) -> str:
         return hashlib.sha256(password.encode()).hexdigest()
 
+    @property
+    def is_active(self) -> bool:
+        return self._is_active
+
+    @is_active.setter
+    def is_active(self, is_active: bool):
+        self._is_active = is_active
+        if self._storage is not None:
+            self._storage.set_active(self.username, is_active)
+
+    def bind(self, storage) -> 'User':
+        """Write later changes of the user through to a storage."""
+        self._storage = storage
+        return self
+
     def check_password(self, password: str) -> bool:
         return self._hash_password(password) == self.password_hash
 
     def add_role(self, role: str):
-        if role not in self.roles:
-            self.roles.append(role)
+        self.roles.add(role)
+        if self._storage is not None:
+            self._storage.add_role(self.username, role)
 
     def has_role(self, role: str) -> bool:
         return role in self.roles
 
 
-class UserService:
+class MemoryStorage(Mapping):
+    """
+    Users by username, with email and role indexes holding usernames.
+
+    Users returned are the stored objects; changes made through them keep the indexes up to date.
+    """
+
     def __init__(self):
         self.users: Dict[str, User] = {}
+        self.by_email: Dict[str, Dict[str, None]] = {}  # insertion ordered set of usernames
+        self.by_role: Dict[str, Set[str]] = {}
 
-    def create_user(self, username: str, email: str, password: str) -> User:
-        if username in self.users:
-            raise ValueError(f"Користувач {username} вже існує")
+    def __getitem__(self, username: str) -> User:
+        return self.users[username]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.users)
+
+    def __contains__(self, username: str) -> bool:
+        return username in self.users
 
-        if len(password) < 6:
-            raise ValueError("Пароль має бути не менше 6 символів")
+    def __len__(self) -> int:
+        return len(self.users)
 
-        user = User(username, email, password)
-        self.users[username] = user
+    def add_many(self, users: List[User]) -> None:
+        for user in users:
+            self.users[user.username] = user.bind(self)
+            self.by_email.setdefault(user.email.lower(), {})[user.username] = None
+            for role in user.roles:
+                self.by_role.setdefault(role, set()).add(user.username)
+
+    def get(self, username: str, default: Optional[User] = None) -> Optional[User]:
+        return self.users.get(username, default)
+
+    def get_many(self, usernames: Iterable[str]) -> Dict[str, User]:
+        return {username: self.users[username] for username in usernames if username in self.users}
+
+    def get_by_email(self, email: str) -> Optional[User]:
+        usernames = self.by_email.get(email.lower())
+        return self.users[next(iter(usernames))] if usernames else None
+
+    def with_role(self, role: str) -> List[User]:
+        return [self.users[username] for username in self.by_role.get(role, ())]
+
+    def set_active(self, username: str, is_active: bool) -> None:
+        self.users[username]._is_active = is_active
+
+    def add_role(self, username: str, role: str) -> None:
+        self.users[username].roles.add(role)
+        self.by_role.setdefault(role, set()).add(username)
+
+    def delete(self, username: str) -> None:
+        user = self.users.pop(username).bind(None)
+        usernames = self.by_email[user.email.lower()]
+        del usernames[username]
+        if not usernames:
+            del self.by_email[user.email.lower()]
+        for role in user.roles:
+            self.by_role.get(role, set()).discard(username)
+
+    def pages(self, page_size: int) -> Iterator[List[User]]:
+        users = iter(self.users.values())
+        while page := list(islice(users, page_size)):
+            yield page
+
+
+class SQLiteStorage(Mapping):
+    """
+    Users in a SQLite database, `:memory:` by default.
+
+    Users returned are snapshots which write their changes through to the database; other
+    snapshots of the same user taken before the change keep the old values.
+    """
+
+    def __init__(self, path: str = ':memory:'):
+        self.connection = sqlite3.connect(path)
+        self.connection.executescript('''
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY,
+                username TEXT NOT NULL UNIQUE,
+                email TEXT NOT NULL,
+                email_key TEXT NOT NULL,
+                password_hash TEXT NOT NULL,
+                is_active INTEGER NOT NULL);
+            CREATE INDEX IF NOT EXISTS users_email ON users (email_key, id);
+            CREATE TABLE IF NOT EXISTS user_roles (
+                role TEXT NOT NULL,
+                username TEXT NOT NULL,
+                PRIMARY KEY (role, username)) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS user_roles_username ON user_roles (username);
+        ''')
+
+    def __getitem__(self, username: str) -> User:
+        user = self.get(username)
+        if user is None:
+            raise KeyError(username)
         return user
 
+    def __iter__(self) -> Iterator[str]:
+        return (row[0] for row in self.connection.execute('SELECT username FROM users ORDER BY id'))
+
+    def __contains__(self, username: str) -> bool:
+        return self.connection.execute('SELECT 1 FROM users WHERE username = ?', (username,)).fetchone() is not None
+
+    def __len__(self) -> int:
+        return self.connection.execute('SELECT COUNT(*) FROM users').fetchone()[0]
+
+    def add_many(self, users: List[User]) -> None:
+        with self.connection:
+            self.connection.executemany(
+                'INSERT INTO users (username, email, email_key, password_hash, is_active) VALUES (?, ?, ?, ?, ?)',
+                ((user.username, user.email, user.email.lower(), user.password_hash, user.is_active) for user in users))
+            self.connection.executemany('INSERT INTO user_roles VALUES (?, ?)',
+                                        ((role, user.username) for user in users for role in user.roles))
+        for user in users:
+            user.bind(self)
+
+    def get(self, username: str, default: Optional[User] = None) -> Optional[User]:
+        return self.get_many([username]).get(username, default)
+
+    def get_many(self, usernames: Iterable[str]) -> Dict[str, User]:
+        users = {}
+        usernames = iter(usernames)
+        while chunk := list(islice(usernames, SQLITE_VARIABLES)):
+            placeholders = ','.join('?' * len(chunk))
+            users.update(self._load(f'SELECT username, email, password_hash, is_active FROM users '
+                                    f'WHERE username IN ({placeholders})', chunk))
+        return users
+
+    def get_by_email(self, email: str) -> Optional[User]:
+        users = self._load('SELECT username, email, password_hash, is_active FROM users '
+                           'WHERE email_key = ? ORDER BY id LIMIT 1', (email.lower(),))
+        return next(iter(users.values()), None)
+
+    def with_role(self, role: str) -> List[User]:
+        return list(self._load('SELECT users.username, email, password_hash, is_active FROM user_roles '
+                               'JOIN users ON users.username = user_roles.username WHERE role = ?', (role,)).values())
+
+    def set_active(self, username: str, is_active: bool) -> None:
+        with self.connection:
+            self.connection.execute('UPDATE users SET is_active = ? WHERE username = ?', (is_active, username))
+
+    def add_role(self, username: str, role: str) -> None:
+        with self.connection:
+            # a snapshot of a deleted user must not leave a role behind for a later user of its name
+            self.connection.execute('INSERT OR IGNORE INTO user_roles SELECT ?, username FROM users WHERE username = ?',
+                                    (role, username))
+
+    def delete(self, username: str) -> None:
+        with self.connection:
+            self.connection.execute('DELETE FROM users WHERE username = ?', (username,))
+            self.connection.execute('DELETE FROM user_roles WHERE username = ?', (username,))
+
+    def pages(self, page_size: int) -> Iterator[List[User]]:
+        last_id = 0
+        while True:
+            rows = self.connection.execute('SELECT id, username, email, password_hash, is_active FROM users '
+                                           'WHERE id > ? ORDER BY id LIMIT ?', (last_id, page_size)).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1][0]
+            yield list(self._users([row[1:] for row in rows]).values())
+
+    def close(self) -> None:
+        self.connection.close()
+
+    def _load(self, query: str, parameters) -> Dict[str, User]:
+        return self._users(self.connection.execute(query, parameters))
+
+    def _users(self, rows) -> Dict[str, User]:
+        """Users of (username, email, password_hash, is_active) rows, with their roles."""
+        users = {username: User(username, email, password_hash=password_hash, is_active=bool(is_active)).bind(self)
+                 for username, email, password_hash, is_active in rows}
+        usernames = iter(users)
+        while chunk := list(islice(usernames, SQLITE_VARIABLES)):
+            placeholders = ','.join('?' * len(chunk))
+            for role, username in self.connection.execute(
+                    f'SELECT role, username FROM user_roles WHERE username IN ({placeholders})', chunk):
+                users[username].roles.add(role)
+        return users
+
+
+class UserService:
+    """
+    User accounts on a storage backend, MemoryStorage by default.
+
+    `users` is the storage: a read-only mapping of username to User on every backend. Create and
+    delete users through the service.
+    """
+
+    def __init__(self, storage=None):
+        self.users = storage if storage is not None else MemoryStorage()
+
+    def create_user(self, username: str, email: str, password: str) -> User:
+        return self.bulk_create_users([(username, email, password)])[0]
+
+    def bulk_create_users(self, records: Iterable[Tuple[str, str, str]]) -> List[User]:
+        """Create users from (username, email, password) records; nothing is stored if one is invalid."""
+        users, seen = [], set()
+        for username, email, password in records:
+            if username in seen or username in self.users:
+                raise ValueError(f"Користувач {username} вже існує")
+
+            if len(password) < MIN_PASSWORD_LENGTH:
+                raise ValueError("Пароль має бути не менше 6 символів")
+
+            seen.add(username)
+            users.append(User(username, email, password))
+        self.users.add_many(users)
+        return users
+
     def get_user(self, username: str) -> Optional[User]:
         return self.users.get(username)
 
+    def get_user_by_email(self, email: str) -> Optional[User]:
+        return self.users.get_by_email(email)
+
+    def get_users_with_role(self, role: str) -> List[User]:
+        return self.users.with_role(role)
+
     def authenticate(self, username: str, password: str) -> Optional[User]:
         user = self.get_user(username)
         if user and user.check_password(password) and user.is_active:
             return user
         return None
 
+    def bulk_authenticate(self, credentials: Iterable[Tuple[str, str]]) -> List[Optional[User]]:
+        """Authenticate (username, password) pairs with one storage lookup; results keep the input order."""
+        credentials = list(credentials)
+        users = self.users.get_many(username for username, _ in credentials)
+        results = []
+        for username, password in credentials:
+            user = users.get(username)
+            results.append(user if user and user.is_active and user.check_password(password) else None)
+        return results
+
+    def add_role(self, username: str, role: str) -> bool:
+        if username not in self.users:
+            return False
+        self.users.add_role(username, role)
+        return True
+
     def deactivate_user(self, username: str) -> bool:
-        user = self.get_user(username)
-        if user:
-            user.is_active = False
+        if username in self.users:
+            self.users.set_active(username, False)
             return True
         return False
 
     def get_all_users(self) -> List[User]:
-        return list(self.users.values())
+        return [user for page in self.iter_users() for user in page]
+
+    def iter_users(self, page_size: int = 1000) -> Iterator[List[User]]:
+        """Pages of users in creation order, without copying the whole user base."""
+        return self.users.pages(page_size)
 
     def delete_user(self, username: str) -> bool:
         if username in self.users:
-            del self.users[username]
+            self.users.delete(username)
             return True
-        return False
\ No newline at end of file
+        return False
@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+setups = []
+
+
+@pytest.fixture(scope="session")
+async def shared_session():
+    setups.append(asyncio.get_running_loop())
+    yield {'loop': asyncio.get_running_loop(), 'requests': 0}
+
+
+async def test_session_fixture_runs_on_the_runner_loop(shared_session, asyncio_runner_loop):
+    shared_session['requests'] += 1
+    assert shared_session['loop'] is asyncio.get_running_loop() is asyncio_runner_loop
+
+
+async def test_session_fixture_is_shared(shared_session):
+    await asyncio.sleep(0)
+    shared_session['requests'] += 1
+    assert len(setups) == 1
+    assert shared_session['requests'] == 2
+    assert shared_session['loop'] is asyncio.get_running_loop()
+
+
+def test_sync_code_submits_to_the_loop(asyncio_runner_loop):
+    async def loop_of_coroutine():
+        return asyncio.get_running_loop()
+
+    assert asyncio.run_coroutine_threadsafe(loop_of_coroutine(), asyncio_runner_loop).result() is asyncio_runner_loop
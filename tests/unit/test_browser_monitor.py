@@ -0,0 +1,110 @@
+import subprocess
+import sys
+from types import SimpleNamespace
+
+from utils.browser_monitor import MIB, BrowserMemoryReport, BrowserMonitor, BrowserSample
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+class ScriptedMonitor(BrowserMonitor):
+    """BrowserMonitor measuring the given samples, one per measurement, instead of a process tree."""
+
+    def __init__(self, samples, **thresholds):
+        self.samples = list(samples)
+        self.browsers = []
+        super().__init__(self._launch, **thresholds)
+
+    def _launch(self):
+        self.browsers.append(FakeBrowser())
+        return self.browsers[-1]
+
+    def _measure(self):
+        return self.samples.pop(0)
+
+
+def sample(rss_mib, taken_at, **cpu_seconds):
+    return BrowserSample(rss_mib * MIB, {int(pid[1:]): seconds for pid, seconds in cpu_seconds.items()}, taken_at)
+
+
+def test_sample_reports_rss_and_cpu_since_the_previous_sample():
+    monitor = ScriptedMonitor([sample(100, 0.0, p1=1.0, p2=4.0),
+                               # p2 exited, p3 started during the test
+                               sample(150, 2.0, p1=1.5, p3=0.5),
+                               sample(120, 4.0, p1=1.5, p3=0.5)])
+
+    assert monitor.sample() == {'rss': 150 * MIB, 'rss_delta': 50 * MIB, 'cpu_seconds': 1.0, 'cpu_percent': 50.0,
+                                'recycled': None}
+    assert monitor.sample() == {'rss': 120 * MIB, 'rss_delta': -30 * MIB, 'cpu_seconds': 0.0, 'cpu_percent': 0.0,
+                                'recycled': None}
+    assert monitor.recycles == 0
+
+
+def test_rss_above_the_threshold_relaunches_the_browser():
+    monitor = ScriptedMonitor([sample(100, 0.0), sample(1600, 1.0), sample(90, 2.0), sample(95, 3.0)],
+                              max_rss_mb=1500)
+    first_browser = monitor.browser
+
+    measurements = monitor.sample()
+
+    assert measurements['recycled'] == 'rss 1600MiB > 1500MiB'
+    assert first_browser.closed and monitor.browser is monitor.browsers[1]
+    assert monitor.recycles == 1
+    # the next test is measured against the relaunched browser
+    assert monitor.sample()['rss_delta'] == 5 * MIB
+
+
+def test_cpu_above_the_threshold_relaunches_the_browser():
+    monitor = ScriptedMonitor([sample(100, 0.0, p1=0.0), sample(100, 1.0, p1=0.9), sample(100, 1.0, p1=0.0)],
+                              max_cpu_percent=80)
+
+    assert monitor.sample()['recycled'] == 'cpu 90.0% > 80%'
+    assert monitor.recycles == 1
+
+
+def test_disabled_monitor_only_launches():
+    monitor = ScriptedMonitor([], enabled=False, max_rss_mb=1)
+
+    assert monitor.sample() is None
+    assert len(monitor.browsers) == 1
+
+
+def test_process_tree_of_the_launch_is_measured():
+    processes = []
+
+    def launch():
+        processes.append(subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(30)']))
+        return SimpleNamespace(close=processes[-1].kill)
+
+    monitor = BrowserMonitor(launch)
+    try:
+        assert [root.pid for root in monitor._roots] == [processes[0].pid]
+        assert monitor.sample()['rss'] > MIB
+    finally:
+        monitor.close()
+        processes[0].wait()
+
+
+def teardown_report(nodeid, rss_mib, delta_mib, recycled=None):
+    return SimpleNamespace(nodeid=nodeid, when='teardown', user_properties=[
+        ('browser_rss', rss_mib * MIB), ('browser_rss_delta', delta_mib * MIB), ('browser_recycled', recycled)])
+
+
+def test_leak_prone_tests_are_ordered_by_added_memory():
+    report = BrowserMemoryReport()
+    for teardown in (teardown_report('test_small', 200, 5), teardown_report('test_big', 400, 80),
+                     teardown_report('test_freed', 300, -50), teardown_report('test_twice', 500, 30),
+                     teardown_report('test_twice', 1600, 70, 'rss 1600MiB > 1500MiB')):
+        report.pytest_runtest_logreport(teardown)
+    report.pytest_runtest_logreport(SimpleNamespace(nodeid='test_call', when='call', user_properties=[]))
+
+    assert report.leak_prone() == [('test_twice', 100 * MIB), ('test_big', 80 * MIB), ('test_small', 5 * MIB)]
+    assert report.leak_prone(top=1) == [('test_twice', 100 * MIB)]
+    assert (report.samples, report.peak_rss) == (5, 1600 * MIB)
+    assert report.recycles == ['test_twice (rss 1600MiB > 1500MiB)']
@@ -0,0 +1,66 @@
+import pytest
+
+from utils.cassette import Cassette, CassetteMiss, RecordedResponse, request_key
+
+URL = 'https://api.example.com/api/v1/groups'
+
+
+def response(body: bytes, status: int = 200) -> RecordedResponse:
+    return RecordedResponse(status=status, reason='OK', headers={'Content-Type': 'application/json'},
+                            body=body, url=URL, elapsed_ms=12.5)
+
+
+def record(directory, interactions):
+    cassette = Cassette(directory, 'module', 'record')
+    for params, body in interactions:
+        cassette.play('GET', URL, params, None, lambda: response(body))
+    cassette.save()
+    return cassette
+
+
+def test_request_key_normalizes_query_order():
+    assert request_key('get', f'{URL}?b=2', {'a': 1}) == request_key('GET', f'{URL}?a=1&b=2')
+    assert request_key('POST', URL, body={'a': 1, 'b': 2}) == request_key('POST', URL, body={'b': 2, 'a': 1})
+
+
+def test_record_replay_round_trip(tmp_path):
+    record(tmp_path, [({'page': 0}, b'{"page": 0}'), ({'page': 1}, b'{"page": 1}')])
+
+    replay = Cassette(tmp_path, 'module', 'replay')
+    sent = []
+    replayed = replay.play('GET', URL, {'page': 1}, None, lambda: sent.append(1))
+    assert replayed == response(b'{"page": 1}')
+    assert replayed.to_requests_response().json() == {'page': 1}
+    assert not sent
+    assert (replay.stats.replayed, replay.stats.saved_ms) == (1, 12.5)
+
+
+def test_repeated_requests_replay_in_recorded_order(tmp_path):
+    record(tmp_path, [(None, b'first'), (None, b'second')])
+
+    replay = Cassette(tmp_path, 'module', 'replay')
+    bodies = [replay.play('GET', URL, None, None, None).body for _ in range(3)]
+    assert bodies == [b'first', b'second', b'first']
+
+
+def test_replay_miss_raises(tmp_path):
+    record(tmp_path, [(None, b'body')])
+
+    with pytest.raises(CassetteMiss):
+        Cassette(tmp_path, 'module', 'replay').play('GET', URL, {'page': 5}, None, None)
+
+
+def test_equal_bodies_are_stored_once_without_temp_files(tmp_path):
+    record(tmp_path, [({'page': 0}, b'same'), ({'page': 1}, b'same')])
+
+    assert len(list((tmp_path / 'module' / 'objects').iterdir())) == 1
+    assert not list(tmp_path.rglob('*.tmp'))
+
+
+def test_save_merges_keys_recorded_by_other_workers(tmp_path):
+    record(tmp_path, [({'page': 0}, b'worker 0')])
+    record(tmp_path, [({'page': 1}, b'worker 1')])
+
+    replay = Cassette(tmp_path, 'module', 'replay')
+    assert replay.play('GET', URL, {'page': 0}, None, None).body == b'worker 0'
+    assert replay.play('GET', URL, {'page': 1}, None, None).body == b'worker 1'
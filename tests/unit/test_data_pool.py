@@ -0,0 +1,93 @@
+import threading
+
+import pytest
+
+from utils.data_pool import DataPool
+
+
+class FakeFactory:
+    """Creates numbered items and remembers which of them were destroyed."""
+
+    def __init__(self, fail: bool = False):
+        self.fail = fail
+        self.created = 0
+        self.destroyed = []
+        self.lock = threading.Lock()
+
+    def create(self):
+        if self.fail:
+            raise ConnectionError('backend down')
+        with self.lock:
+            self.created += 1
+            return {'id': self.created - 1}
+
+    def destroy(self, item):
+        with self.lock:
+            self.destroyed.append(item['id'])
+
+
+@pytest.fixture
+def factory():
+    return FakeFactory()
+
+
+def drain(pool):
+    # wait for background resets and refills
+    pool._executor.submit(lambda: None).result()
+    pool._executor.shutdown(wait=True)
+
+
+def test_fill_creates_size_items(factory):
+    pool = DataPool(factory.create, size=3)
+    pool.fill()
+    assert pool.available == 3
+    pool.close()
+
+
+def test_fill_raises_factory_errors():
+    pool = DataPool(FakeFactory(fail=True).create, size=2)
+    with pytest.raises(ConnectionError, match='backend down'):
+        pool.fill()
+    pool.close()
+
+
+def test_leased_items_are_not_replaced(factory):
+    pool = DataPool(factory.create, size=2, refill_threshold=2, workers=1)
+    pool.fill()
+    first, second = pool.lease(), pool.lease()
+    pool.give_back(first)
+    pool.give_back(second)
+    drain(pool)
+    assert pool.available == 2
+    assert factory.created == 2
+
+
+def test_dropped_item_is_replaced_and_destroyed(factory):
+    def reset(item):
+        raise RuntimeError('reset failed')
+
+    pool = DataPool(factory.create, reset, size=1, refill_threshold=1, workers=1, destroy=factory.destroy)
+    pool.fill()
+    item = pool.lease()
+    pool.give_back(item)
+    drain(pool)
+    assert factory.destroyed == [item['id']]
+    assert pool.available == 1
+
+
+def test_close_destroys_available_and_late_returned_items(factory):
+    pool = DataPool(factory.create, size=3, destroy=factory.destroy)
+    pool.fill()
+    leased = pool.lease()
+    pool.close()
+    pool.give_back(leased)
+    assert sorted(factory.destroyed) == [0, 1, 2]
+
+
+def test_reset_return_value_replaces_item(factory):
+    pool = DataPool(factory.create, lambda item: {'id': item['id']}, size=1, workers=1)
+    pool.fill()
+    with pool.leased() as item:
+        item['name'] = 'changed by the test'
+    drain(pool)
+    assert pool.lease() == {'id': 0}
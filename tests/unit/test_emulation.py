@@ -0,0 +1,52 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils.emulation import NO_PROFILE, ActionTimings, ActionTimingsReport, EmulationProfile, format_action_timings, timed
+
+PROFILES = {'slow-4g': {'latency_ms': 150, 'download_kbps': 1600, 'upload_kbps': 750}, 'cpu-4x': {'cpu_slowdown': 4}}
+
+
+def test_profile_from_config():
+    profile = EmulationProfile.from_config(PROFILES, 'slow-4g')
+
+    assert profile == EmulationProfile('slow-4g', latency_ms=150, download_kbps=1600, upload_kbps=750)
+    assert profile.throttles_network
+    assert not EmulationProfile.from_config(PROFILES, 'cpu-4x').throttles_network
+
+
+def test_unknown_profile_names_the_configured_ones():
+    with pytest.raises(KeyError, match='configured: slow-4g, cpu-4x'):
+        EmulationProfile.from_config(PROFILES, '3g')
+    with pytest.raises(KeyError, match='configured: none'):
+        EmulationProfile.from_config(None, '3g')
+
+
+def test_format_action_timings_compares_with_the_unthrottled_run():
+    summary = {'GroupsPage.open': {'slow-4g': (2, 900.0), NO_PROFILE: (4, 300.0)},
+               'GroupsPage.search': {'cpu-4x': (1, 120.0)}}
+
+    assert format_action_timings(summary) == ['GroupsPage.open: none 300ms x4, slow-4g 900ms x2 (3.0x)',
+                                              'GroupsPage.search: cpu-4x 120ms x1']
+
+
+def test_report_collects_the_timings_of_all_workers():
+    action = timed('GroupsPage.open', lambda: None)
+    ActionTimings.enabled = True
+    try:
+        worker_timings = []
+        for profile in (NO_PROFILE, 'slow-4g', 'slow-4g'):
+            ActionTimings.current_profile = profile
+            action()
+            worker_timings.append(ActionTimings.take())
+    finally:
+        ActionTimings.enabled, ActionTimings.current_profile = False, NO_PROFILE
+    report = ActionTimingsReport()
+    for index, timings in enumerate(worker_timings):
+        report.pytest_runtest_logreport(SimpleNamespace(nodeid=f'test_{index}', when='teardown',
+                                                        user_properties=[('action_timings', timings)]))
+
+    summary = report.summary()
+
+    assert {profile: count for profile, (count, _) in summary['GroupsPage.open'].items()} == {NO_PROFILE: 1, 'slow-4g': 2}
+    assert ActionTimings.take() == []
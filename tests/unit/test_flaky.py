@@ -0,0 +1,93 @@
+import subprocess
+import sys
+from pathlib import Path
+
+from utils.flaky import FlakyStore
+
+ROOT = Path(__file__).parents[2]
+
+CONFTEST = '''
+import pytest
+from utils.flaky import FlakyReruns
+
+
+def pytest_configure(config):
+    config.pluginmanager.register(FlakyReruns(2))
+
+
+@pytest.fixture(scope='module')
+def shared():
+    print('SETUP shared')
+    yield
+    print('TEARDOWN shared')
+
+
+instances = []
+
+
+@pytest.fixture
+def fresh():
+    instances.append(object())
+    print(f'SETUP fresh {len(instances)}')
+    yield instances[-1]
+    print(f'TEARDOWN fresh {len(instances)}')
+'''
+
+FIRST = '''
+runs = []
+
+
+def test_flaky(shared, fresh):
+    runs.append(fresh)
+    print(f'ATTEMPT {len(runs)} distinct {len(set(map(id, runs)))}')
+    assert len(runs) > 1
+
+
+def test_stable(shared):
+    pass
+'''
+
+SECOND = '''
+def test_broken(shared):
+    assert False
+'''
+
+
+def run_suite(tmp_path):
+    (tmp_path / 'pytest.ini').write_text('[pytest]\n')
+    (tmp_path / 'conftest.py').write_text(CONFTEST)
+    (tmp_path / 'test_first.py').write_text(FIRST)
+    (tmp_path / 'test_second.py').write_text(SECOND)
+    return subprocess.run([sys.executable, '-m', 'pytest', '-q', '-s', '-p', 'no:cacheprovider', '-c', str(tmp_path / 'pytest.ini'),
+                           '--rootdir', str(tmp_path), str(tmp_path)],
+                          cwd=tmp_path, capture_output=True, text=True, env={'PYTHONPATH': str(ROOT)})
+
+
+def test_reruns_keep_module_fixtures_up(tmp_path):
+    output = run_suite(tmp_path).stdout
+
+    assert '1 failed, 2 passed, 3 rerun' in output
+    # one setup and teardown per module, however many attempts its tests take
+    assert output.count('SETUP shared') == 2
+    assert output.count('TEARDOWN shared') == 2
+    assert 'not torn down properly' not in output
+
+
+def test_reruns_get_fresh_function_fixtures(tmp_path):
+    output = run_suite(tmp_path).stdout
+
+    assert 'SETUP fresh 1' in output and 'TEARDOWN fresh 1' in output
+    assert 'SETUP fresh 2' in output and 'TEARDOWN fresh 2' in output
+    assert 'ATTEMPT 2 distinct 2' in output
+
+
+def test_flakiness_score(tmp_path):
+    store = FlakyStore(tmp_path / 'store.json')
+    store.history = {'flip': ['passed', 'failed', 'passed', 'passed'],
+                     'broken': ['failed'] * 4,
+                     'flaky': ['passed', 'flaky']}
+
+    assert store.score('flip') == 0.5
+    assert store.score('broken') == 0.0
+    assert store.score('flaky') == 0.5
+    assert store.score('unknown') == 0.0
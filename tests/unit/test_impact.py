@@ -0,0 +1,81 @@
+import importlib
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from utils.impact import CoverageRecorder, ImpactMap, runs_everything
+
+FILES = {
+    'proj/__init__.py': '',
+    'proj/enums.py': 'import enum\n\n\nclass Tabs(enum.Enum):\n    GROUPS = "#groups"\n',
+    'proj/helpers.py': 'from proj.enums import Tabs\n\n\ndef selector():\n    return Tabs.GROUPS.value\n',
+    'proj/setup.py': 'def connect():\n    return "connected"\n',
+    'proj/unused.py': 'def unused():\n    pass\n',
+    'tests_proj/test_tabs.py': 'from proj import helpers\nfrom proj.enums import Tabs\n',
+}
+
+
+@pytest.fixture
+def project(tmp_path):
+    for name, source in FILES.items():
+        (tmp_path / name).parent.mkdir(exist_ok=True)
+        (tmp_path / name).write_text(source)
+    sys.path.insert(0, str(tmp_path))
+    modules = {name: importlib.import_module(name) for name in ('proj.helpers', 'proj.setup', 'proj.unused')}
+    recorder = CoverageRecorder(tmp_path)
+    yield SimpleNamespace(root=tmp_path, recorder=recorder, **{name.split('.')[1]: module
+                                                                  for name, module in modules.items()})
+    recorder.close()
+    sys.path.remove(str(tmp_path))
+    for name in [name for name in sys.modules if name == 'proj' or name.startswith('proj.')]:
+        del sys.modules[name]
+
+
+def test_executed_files_are_recorded(project):
+    project.recorder.start()
+    project.helpers.selector()
+    files = project.recorder.stop()
+
+    assert 'proj/helpers.py' in files
+    assert 'proj/unused.py' not in files
+
+
+def test_import_only_modules_are_reached(project):
+    files = project.recorder.imported_files(str(project.root / 'tests_proj/test_tabs.py'))
+
+    # the enum is only read, never called, and reached both directly and through helpers
+    assert files == {'proj/__init__.py', 'proj/enums.py', 'proj/helpers.py'}
+
+
+def test_shared_fixture_files_go_to_every_test_using_it(project):
+    fixturedef = SimpleNamespace(baseid='', argname='connection')
+    project.recorder.start()
+    project.setup.connect()  # the first test reaches the file itself before the fixture
+    project.recorder.start_fixture()
+    project.setup.connect()
+    project.recorder.stop_fixture(fixturedef.baseid, fixturedef.argname)
+    project.recorder.stop()
+
+    project.recorder.start()
+    files = project.recorder.stop() | project.recorder.files_of_fixtures([fixturedef])
+
+    assert files == {'proj/setup.py'}
+    assert project.recorder.files_of_fixtures([SimpleNamespace(baseid='', argname='other')]) == set()
+
+
+def test_affected_tests():
+    impact_map = ImpactMap('unused', {'tests/test_a.py::test_a': {'files': ['utils/enums/ui.py'], 'duration': 1.0,
+                                                                  'recorded_at': 0.0}})
+
+    assert impact_map.affected('tests/test_a.py::test_a', {'utils/enums/ui.py'})
+    assert impact_map.affected('tests/test_a.py::test_a', {'tests/test_a.py'})
+    assert not impact_map.affected('tests/test_a.py::test_a', {'utils/generator.py'})
+    assert impact_map.affected('tests/test_new.py::test_new', {'utils/generator.py'})
+
+
+def test_data_files_and_configs_run_everything():
+    assert runs_everything({'data/schema/sample_groups/sample_get_all_groups.json', 'utils/generator.py'}) == [
+        'data/schema/sample_groups/sample_get_all_groups.json']
+    assert runs_everything({'configs/qa.yaml', 'tests/conftest.py'}) == ['configs/qa.yaml', 'tests/conftest.py']
+    assert runs_everything({'data/sample_groups_data.py', 'README.md'}) == []
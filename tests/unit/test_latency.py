@@ -0,0 +1,60 @@
+import pytest
+
+from utils.latency import LatencyStats, assert_latency, percentile, sample_latency, shared_worker
+
+MS = 1_000_000
+
+
+def test_percentile_nearest_rank():
+    ordered = [i * MS for i in range(1, 101)]
+    assert percentile(ordered, 50) == 50.0
+    assert percentile(ordered, 95) == 95.0
+    assert percentile(ordered, 99) == 99.0
+    assert percentile(ordered, 100) == 100.0
+    assert percentile(ordered, 0) == 1.0
+
+
+def test_percentile_of_few_samples():
+    assert percentile([], 95) == 0.0
+    assert percentile([3 * MS], 95) == 3.0
+    assert percentile([1 * MS, 2 * MS], 50) == 1.0
+
+
+def test_stats_from_samples():
+    stats = LatencyStats.from_samples([30 * MS, 10 * MS, 20 * MS], errors=1, elapsed_ns=1_000_000_000)
+    assert (stats.count, stats.errors) == (3, 1)
+    assert (stats.min_ms, stats.mean_ms, stats.p50_ms, stats.max_ms) == (10.0, 20.0, 20.0, 30.0)
+    assert stats.throughput == 3.0
+
+
+def test_assert_latency_within_budget():
+    stats = LatencyStats.from_samples([i * MS for i in range(1, 101)], errors=0, elapsed_ns=10 ** 9)
+    assert_latency(stats, p95=100, p99=200, min_throughput=50)
+
+
+def test_assert_latency_lists_every_violation():
+    stats = LatencyStats.from_samples([i * MS for i in range(1, 101)], errors=0, elapsed_ns=10 ** 9)
+    with pytest.raises(AssertionError) as error:
+        assert_latency(stats, p50=10, p95=95, min_throughput=200)
+    message = str(error.value)
+    assert 'p50_ms=50.00ms exceeds budget 10ms' in message
+    assert 'p95_ms=95.00ms exceeds budget 95ms' in message
+    assert 'throughput 100.0/s is below 200/s' in message
+
+
+def test_assert_latency_fails_on_any_error_by_default():
+    stats = LatencyStats.from_samples([MS] * 100, errors=1, elapsed_ns=10 ** 9)
+    with pytest.raises(AssertionError, match='error ratio 1.00% exceeds 0.00%'):
+        assert_latency(stats, p95=100)
+    assert_latency(stats, max_error_ratio=0.05, p95=100)
+
+
+def test_sample_latency_counts_failed_calls():
+    calls = iter(range(30))
+
+    def call():
+        if next(calls) % 2:
+            raise RuntimeError('HTTP 500')
+
+    stats = sample_latency(shared_worker(call), n=20, warmup=10)
+    assert (stats.count, stats.errors) == (20, 10)
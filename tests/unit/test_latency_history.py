@@ -0,0 +1,31 @@
+import random
+
+from utils.latency_history import SUB_BUCKETS, LatencyHistogram, _bucket, _bucket_value
+
+
+def test_bucket_round_trip_is_within_one_sub_bucket():
+    generator = random.Random(0)
+    values = list(range(4 * SUB_BUCKETS)) + [generator.randrange(1, 10 ** 9) for _ in range(10000)] + [2 ** 40 - 1]
+    for value in values:
+        middle = _bucket_value(_bucket(value))
+        assert abs(middle - value) <= max(value, 1) / SUB_BUCKETS, value
+
+
+def test_small_values_are_exact_and_buckets_are_ordered():
+    assert [_bucket_value(_bucket(value)) for value in range(2 * SUB_BUCKETS)] == list(range(2 * SUB_BUCKETS))
+    indexes = [_bucket(value) for value in range(0, 10 ** 6, 7)]
+    assert indexes == sorted(indexes)
+
+
+def test_percentiles_survive_merge_and_json():
+    first, second = LatencyHistogram(), LatencyHistogram()
+    for duration_ms in range(1, 51):
+        first.add(duration_ms)
+        second.add(duration_ms + 50)
+    first.merge(LatencyHistogram.from_json(second.to_json()))
+
+    assert first.total == 100
+    assert abs(first.percentile(50) - 50) <= 50 / SUB_BUCKETS
+    assert abs(first.percentile(99) - 99) <= 99 / SUB_BUCKETS
+    assert LatencyHistogram().percentile(95) == 0.0
+
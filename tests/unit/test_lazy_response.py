@@ -0,0 +1,39 @@
+from resources.apis.example_base_api import LazyResponse
+
+
+class FakeAPIResponse:
+    """Stand-in for playwright APIResponse whose body is only readable until disposed."""
+
+    status = 200
+    url = 'https://api.example.com/posts/1'
+    headers = {'content-type': 'application/json'}
+
+    def __init__(self, body: bytes):
+        self._body = body
+        self.disposed = 0
+
+    def body(self) -> bytes:
+        assert not self.disposed, 'body read after dispose'
+        return self._body
+
+    def dispose(self) -> None:
+        self.disposed += 1
+
+
+def test_response_is_disposed_once_body_is_read():
+    response = FakeAPIResponse(b'{"id": 1}')
+    result = LazyResponse(response)
+
+    assert result['data'] == {'id': 1}
+    assert result['headers'] == {'content-type': 'application/json'}
+    assert result.body == b'{"id": 1}'
+    result.dispose()
+    assert response.disposed == 1
+
+
+def test_saved_body_is_disposed(tmp_path):
+    response = FakeAPIResponse(b'large body')
+    result = LazyResponse(response)
+
+    assert result.save_body(tmp_path / 'body.bin').read_bytes() == b'large body'
+    assert response.disposed == 1
@@ -0,0 +1,69 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.preflight import ProbeResult, run_preflight, skipped_markers
+
+
+class StatusHandler(BaseHTTPRequestHandler):
+    """Answers HEAD /<status> with that status."""
+
+    def do_HEAD(self):
+        self.send_response(int(self.path.strip('/')))
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def status_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StatusHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f'http://127.0.0.1:{server.server_port}'
+    finally:
+        server.shutdown()
+
+
+@pytest.fixture
+def closed_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def result(marker, healthy):
+    return ProbeResult(name='url', url='http://example.com', marker=marker, healthy=healthy, latency_ms=1.0, detail='')
+
+
+def test_probe_outcomes(status_server, closed_port):
+    config = {'tempo_configuration': {'api_base_url': f'{status_server}/404', 'base_ui_url': f'{status_server}/503',
+                                      'token_url': f'http://127.0.0.1:{closed_port}/token'},
+              'zephyr': {'zephyr_base_url': f'{status_server}/200'}}
+
+    results = {result.name: result for result in run_preflight(config, timeout=2)}
+
+    assert set(results) == {'api_base_url', 'base_ui_url', 'token_url', 'zephyr_base_url'}
+    assert (results['api_base_url'].healthy, results['api_base_url'].detail) == (True, 'HTTP 404')
+    assert (results['base_ui_url'].healthy, results['base_ui_url'].detail) == (False, 'HTTP 503')
+    assert (results['token_url'].healthy, results['token_url'].detail) == (False, 'ConnectionError')
+    assert results['zephyr_base_url'].healthy
+
+
+def test_only_configured_urls_of_the_requested_markers_are_probed(status_server):
+    config = {'tempo_configuration': {'api_base_url': f'{status_server}/200', 'base_ui_url': f'{status_server}/200',
+                                      'token_url': '[env] placeholder'}}
+
+    assert [result.name for result in run_preflight(config, markers=('UI',))] == ['base_ui_url']
+    assert run_preflight({}, markers=('API', 'UI')) == []
+
+
+def test_skipped_markers():
+    assert skipped_markers([result('API', True), result('UI', True)]) == []
+    assert skipped_markers([result('API', False), result('API', True)]) == ['API']
+    assert skipped_markers([result('UI', False)]) == ['E2E', 'UI']
+    # tests do not depend on Zephyr, only publishing does
+    assert skipped_markers([result('ZEPHYR', False)]) == []
@@ -0,0 +1,47 @@
+import cProfile
+
+from utils.profiling import collapsed_stacks
+
+OUTER = ('suite.py', 1, 'outer')
+INNER = ('suite.py', 10, 'inner')
+SHARED = ('helpers.py', 5, 'shared')
+
+
+def test_own_time_is_split_over_the_callers():
+    # (calls, primitive calls, own seconds, cumulative seconds, {caller: (..., cumulative under it)})
+    stats = {
+        OUTER: (1, 1, 0.5, 3.5, {}),
+        INNER: (1, 1, 1.5, 2.0, {OUTER: (1, 1, 1.5, 2.0)}),
+        SHARED: (2, 2, 1.5, 1.5, {OUTER: (1, 1, 1.0, 1.0), INNER: (1, 1, 0.5, 0.5)}),
+    }
+
+    assert collapsed_stacks(stats) == {
+        'outer (suite.py:1)': 500000,
+        'outer (suite.py:1);inner (suite.py:10)': 1500000,
+        'outer (suite.py:1);shared (helpers.py:5)': 1000000,
+        'outer (suite.py:1);inner (suite.py:10);shared (helpers.py:5)': 500000,
+    }
+
+
+def busy(rounds):
+    return sum(index * index for index in range(rounds))
+
+
+def work():
+    for rounds in (20000, 40000):
+        busy(rounds)
+    return sorted(str(busy(1000)) * 2000)
+
+
+def test_stacks_add_up_to_the_profiled_time():
+    profiler = cProfile.Profile()
+    profiler.runcall(work)
+    profiler.create_stats()
+
+    stacks = collapsed_stacks(profiler.stats)
+    own = sum(entry[2] for entry in profiler.stats.values()) * 1e6
+    edges = sum(len(entry[4]) for entry in profiler.stats.values())
+
+    # every stack is truncated to whole microseconds, every caller edge below one is dropped
+    assert own - edges - len(stacks) <= sum(stacks.values()) <= own
+    assert all(stack.startswith('work (') for stack in stacks if 'busy' in stack)
@@ -0,0 +1,50 @@
+import pytest
+
+from utils.latency import sample_latency, shared_worker
+from utils.rate_limiter import RateLimiter
+from utils.tracing import Tracer
+
+URL = 'https://api.example.com/api/v1/groups'
+
+
+@pytest.fixture
+def throttled(tmp_path):
+    # one token at a time, refilled every 50ms
+    RateLimiter.configure({'directory': str(tmp_path), 'budgets': {'api.example.com': {'rate': 20, 'burst': 1}}})
+    yield
+    RateLimiter.configure(None)
+
+
+def send():
+    RateLimiter.acquire(URL)
+    return 200
+
+
+def test_acquire_waits_for_a_token(throttled):
+    RateLimiter.acquire(URL)
+    before = RateLimiter.thread_seconds()
+    assert RateLimiter.acquire(URL) > 0.03
+    assert RateLimiter.thread_seconds() - before > 0.03
+    assert RateLimiter.summary()['api.example.com'].throttled == 1
+
+
+def test_traced_duration_leaves_out_the_throttle_wait(throttled):
+    events = []
+    listener = lambda kind, event: events.append(event)
+    Tracer.subscribe(listener)
+    try:
+        for _ in range(2):
+            Tracer.trace('requests', 'GET', URL, 'groups', send, lambda response: {'status': response})
+    finally:
+        Tracer.unsubscribe(listener)
+
+    response = events[-1]
+    assert response['throttled_ms'] > 30
+    assert response['duration_ms'] < 20
+
+
+def test_sampled_latency_leaves_out_the_throttle_wait(throttled):
+    stats = sample_latency(shared_worker(send), n=4, warmup=1)
+
+    assert stats.max_ms < 20
+    assert stats.throughput < 30
@@ -0,0 +1,62 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils.request_context_pool import RequestContextPool
+
+
+class CookieHandler(BaseHTTPRequestHandler):
+    """/login sets a session cookie, every other path echoes the Cookie header."""
+
+    def do_GET(self):
+        body = (self.headers.get('Cookie') or '').encode()
+        self.send_response(200)
+        if self.path == '/login':
+            self.send_header('Set-Cookie', 'session=first-test; Path=/')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture(scope='module')
+def cookie_server():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), CookieHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        yield f'http://127.0.0.1:{server.server_port}'
+    finally:
+        server.shutdown()
+
+
+@pytest.fixture
+def pool(playwright):
+    pool = RequestContextPool(playwright)
+    yield pool
+    pool.close()
+
+
+def test_borrows_do_not_share_cookies(pool, cookie_server):
+    key, context = pool.borrow(cookie_server, 5000)
+    context.get('/login')
+    assert context.get('/echo').text() == 'session=first-test'
+    pool.give_back(key, context)
+
+    key, context = pool.borrow(cookie_server, 5000)
+    assert context.get('/echo').text() == ''
+    pool.give_back(key, context)
+    assert (pool.stats.created, pool.stats.discarded) == (2, 1)
+
+
+def test_stateless_context_is_reused(pool, cookie_server):
+    key, first = pool.borrow(cookie_server, 5000)
+    first.get('/echo')
+    pool.give_back(key, first)
+
+    key, second = pool.borrow(cookie_server, 5000)
+    pool.give_back(key, second)
+    assert second is first
+    assert pool.stats.created == 1
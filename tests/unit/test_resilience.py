@@ -0,0 +1,100 @@
+import uuid
+
+import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
+
+from utils.resilience import CircuitOpenError, ResiliencePolicy
+
+
+def host_url() -> str:
+    # breakers are process wide, every test gets its own host
+    return f'https://{uuid.uuid4().hex}.example.com/api/v1/groups'
+
+
+def response(status: int) -> requests.Response:
+    result = requests.Response()
+    result.status_code = status
+    return result
+
+
+def refused(url: str) -> requests.exceptions.ConnectionError:
+    return requests.exceptions.ConnectionError(MaxRetryError(None, url, NewConnectionError(None, 'refused')))
+
+
+class Responses:
+    """send callable returning, or raising, the given outcomes in order."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, BaseException):
+            raise outcome
+        return response(outcome)
+
+
+def policy(**options) -> ResiliencePolicy:
+    return ResiliencePolicy(backoff_base=0, sleep=lambda seconds: None, **options)
+
+
+def open_breaker(resilience: ResiliencePolicy, url: str) -> None:
+    with pytest.raises(requests.exceptions.ConnectionError):
+        resilience.call('GET', url, Responses(*[refused(url)] * resilience.max_attempts))
+
+
+def test_half_open_trial_answered_with_429_closes_the_breaker():
+    url = host_url()
+    resilience = policy(max_attempts=1, failure_threshold=1, reset_timeout=0)
+    open_breaker(resilience, url)
+
+    assert resilience.call('GET', url, Responses(429)).status_code == 429
+    assert resilience.call('GET', url, Responses(200)).status_code == 200
+
+
+def test_half_open_trial_raising_unexpectedly_allows_another_trial():
+    url = host_url()
+    resilience = policy(max_attempts=1, failure_threshold=1, reset_timeout=0)
+    open_breaker(resilience, url)
+
+    with pytest.raises(ValueError):
+        resilience.call('GET', url, Responses(ValueError('bug in send')))
+    assert resilience.call('GET', url, Responses(200)).status_code == 200
+
+
+def test_open_breaker_fails_fast():
+    url = host_url()
+    resilience = policy(max_attempts=1, failure_threshold=1, reset_timeout=60)
+    open_breaker(resilience, url)
+
+    send = Responses(200)
+    with pytest.raises(CircuitOpenError):
+        resilience.call('GET', url, send)
+    assert send.calls == 0
+
+
+def test_refused_post_is_retried():
+    url = host_url()
+    send = Responses(refused(url), 201)
+
+    assert policy().call('POST', url, send).status_code == 201
+    assert send.calls == 2
+
+
+def test_post_dropped_after_sending_is_not_retried():
+    url = host_url()
+    send = Responses(requests.exceptions.ConnectionError(ProtocolError('Connection aborted.')), 201)
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        policy().call('POST', url, send)
+    assert send.calls == 1
+
+
+def test_policies_with_other_thresholds_do_not_share_a_breaker():
+    url = host_url()
+    open_breaker(policy(max_attempts=1, failure_threshold=1, reset_timeout=60), url)
+
+    assert policy(failure_threshold=5).call('GET', url, Responses(200)).status_code == 200
@@ -0,0 +1,122 @@
+import logging
+
+import pytest
+
+from utils.resource_tracker import Ledger, ResourceTracker, TrackedResource
+from utils.tracing import Tracer
+
+
+@pytest.fixture
+def tracker(tmp_path, monkeypatch):
+    # one worker deletes in submission order, so the order the deleter sees is the cleanup order
+    tracker = ResourceTracker(tmp_path, namespace='qa', scope='test', workers=1)
+    previous = tracker.activate()
+    yield tracker
+    tracker.close()
+    ResourceTracker.active = previous
+
+
+def create(monkeypatch, test, *keys):
+    monkeypatch.setattr(Tracer, 'current_test', test)
+    for key in keys:
+        ResourceTracker.track('group', key)
+
+
+def test_cleanup_is_off_unless_enabled_for_a_target_which_deletes(tmp_path, caplog):
+    assert ResourceTracker.from_config(None, tmp_path) is None
+    assert ResourceTracker.from_config({'enabled': False, 'deletes_supported': True}, tmp_path) is None
+    with caplog.at_level(logging.WARNING):
+        assert ResourceTracker.from_config({'enabled': True}, tmp_path) is None
+        assert ResourceTracker.from_config({'enabled': True, 'deletes_supported': False}, tmp_path) is None
+    assert 'does not support deletes' in caplog.text
+    assert not list(tmp_path.iterdir())  # no ledger either
+
+    tracker = ResourceTracker.from_config({'enabled': True, 'deletes_supported': True, 'scope': 'test'}, tmp_path)
+    tracker.close()
+    assert tracker.scope == 'test'
+
+
+def test_track_is_a_no_op_without_an_active_tracker(tmp_path):
+    tracker = ResourceTracker(tmp_path)
+    ResourceTracker.track('group', 'g1')
+    tracker.close()
+
+    assert tracker.stats.tracked == 0
+
+
+def test_track_records_the_running_test_as_owner(tracker, monkeypatch):
+    create(monkeypatch, 'tests/api/test_groups.py::test_create', 'g1')
+    with ResourceTracker.session_owned():
+        ResourceTracker.track('group', 'pool')
+
+    assert Ledger.pending(tracker._ledger.path) == [
+        TrackedResource('group', 'g1', 'qa', 'tests/api/test_groups.py::test_create'),
+        TrackedResource('group', 'pool', 'qa', None),
+    ]
+    assert tracker.stats.tracked == 2
+
+
+def test_cleanup_deletes_newest_first(tracker, monkeypatch):
+    deleted = []
+    tracker.register_deleter('group', deleted.append)
+    create(monkeypatch, 'tests/api/test_groups.py::test_create', 'g1', 'g2', 'g3')
+
+    tracker.cleanup()
+
+    assert deleted == ['g3', 'g2', 'g1']
+    assert (tracker.stats.deleted, tracker.stats.failed) == (3, 0)
+    assert Ledger.pending(tracker._ledger.path) == []
+
+
+def test_cleanup_by_owner_and_module(tracker, monkeypatch):
+    deleted = []
+    tracker.register_deleter('group', deleted.append)
+    create(monkeypatch, 'tests/api/test_groups.py::test_create', 'a1')
+    create(monkeypatch, 'tests/api/test_groups.py::test_rename', 'a2')
+    create(monkeypatch, 'tests/api/test_users.py::test_create', 'b1')
+
+    tracker.cleanup(owner='tests/api/test_groups.py::test_rename')
+    assert deleted == ['a2']
+    tracker.cleanup(module='tests/api/test_groups.py')
+    assert deleted == ['a2', 'a1']
+    tracker.cleanup()
+    assert deleted == ['a2', 'a1', 'b1']
+
+
+def test_failed_deletes_are_logged_not_raised_and_stay_in_the_ledger(tracker, monkeypatch, caplog):
+    def delete(key):
+        if key == 'g2':
+            raise ConnectionError('refused')
+        deleted.append(key)
+
+    deleted = []
+    tracker.register_deleter('group', delete)
+    create(monkeypatch, 'tests/api/test_groups.py::test_create', 'g1', 'g2', 'g3')
+    ResourceTracker.track('user', 'u1')  # no deleter registered
+
+    with caplog.at_level(logging.ERROR):
+        tracker.cleanup()
+
+    assert deleted == ['g3', 'g1']
+    assert (tracker.stats.deleted, tracker.stats.failed) == (2, 2)
+    assert "Failed to delete group g2: ConnectionError('refused')" in caplog.text
+    assert 'No deleter registered for user u1' in caplog.text
+    assert [resource.key for resource in Ledger.pending(tracker._ledger.path)] == ['g2', 'u1']
+
+
+def test_failed_deletes_are_retried_as_orphans_by_the_next_run(tmp_path, monkeypatch):
+    crashed = ResourceTracker(tmp_path, namespace='qa')
+    previous = crashed.activate()
+    create(monkeypatch, None, 'g1')
+    crashed.close()  # the ledger keeps g1, nothing deleted it
+    ResourceTracker.active = previous
+
+    deleted = []
+    tracker = ResourceTracker(tmp_path, namespace='qa')
+    tracker.register_deleter('group', deleted.append)
+    tracker.cleanup_orphans()
+    tracker.close()
+
+    assert deleted == ['g1']
+    assert tracker.stats.orphans_deleted == 1
+    assert not list(tmp_path.glob('ledger-*.jsonl'))
@@ -0,0 +1,61 @@
+import os
+import random
+import subprocess
+import sys
+from pathlib import Path
+
+from utils.sharding import ExecutionResult, assign_shards, merge_shard_results, write_shard_results
+
+ROOT = Path(__file__).parents[2]
+
+
+def test_assignment_does_not_depend_on_the_order_of_the_input():
+    units = {f'test_{index}': [f'test_{index}'] for index in range(40)}
+    durations = {f'test_{index}': float(index % 7) for index in range(40)}
+    shuffled = list(units.items())
+    random.Random(0).shuffle(shuffled)
+
+    assert assign_shards(units, durations, 3) == assign_shards(dict(shuffled), dict(reversed(durations.items())), 3)
+
+
+def test_tests_of_one_test_id_share_a_shard():
+    units = {'SAMPLE-T1': ['test_a', 'test_b', 'test_c'], 'test_d': ['test_d'], 'test_e': ['test_e']}
+    durations = {'test_a': 1.0, 'test_b': 1.0, 'test_c': 1.0, 'test_d': 1.0, 'test_e': 1.0}
+
+    shards = assign_shards(units, durations, 3)
+
+    assert shards['test_a'] == shards['test_b'] == shards['test_c']
+    assert len({shards['test_a'], shards['test_d'], shards['test_e']}) == 3
+
+
+def test_unknown_durations_count_as_the_mean():
+    units = {name: [name] for name in ('slow', 'fast', 'new_1', 'new_2')}
+    # the mean of 3s and 1s makes the new tests 2s each: slow + fast against new_1 + new_2
+    shards = assign_shards(units, {'slow': 3.0, 'fast': 1.0}, 2)
+
+    assert shards['slow'] == shards['fast'] != shards['new_1'] == shards['new_2']
+    assert set(assign_shards(units, {}, 2).values()) == {0, 1}
+
+
+def test_merge_ignores_results_of_another_shard_count(tmp_path):
+    write_shard_results(tmp_path / 'old', 2, 3, [ExecutionResult('test_old', outcome='passed')])
+    old_time = os.path.getmtime(tmp_path / 'old' / 'shard-2-of-3.json') - 60
+    os.utime(tmp_path / 'old' / 'shard-2-of-3.json', (old_time, old_time))
+    for index in range(2):
+        write_shard_results(tmp_path / f'node-{index}', index, 2, [ExecutionResult(f'test_{index}', outcome='failed')])
+
+    report = merge_shard_results(tmp_path)
+
+    assert report['shards'] == 2 and report['missing_shards'] == []
+    assert [record['nodeid'] for record in report['results']] == ['test_0', 'test_1']
+    assert report['ignored'] == [str(tmp_path / 'old' / 'shard-2-of-3.json')]
+    assert merge_shard_results(tmp_path, 3)['missing_shards'] == [0, 1]
+
+
+def test_shard_index_needs_a_shard_count():
+    result = subprocess.run([sys.executable, '-m', 'pytest', '--shard-index', '0', '--collect-only', '-q',
+                             '-p', 'no:cacheprovider', 'tests/unit/test_sharding.py'],
+                            cwd=ROOT, capture_output=True, text=True)
+
+    assert result.returncode == 4
+    assert '--shard-index between 0 and count - 1' in result.stderr
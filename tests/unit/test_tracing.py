@@ -0,0 +1,50 @@
+import pytest
+
+from utils.tracing import Tracer
+
+
+@pytest.fixture
+def events():
+    received = []
+
+    def listener(kind, event):
+        received.append((kind, event))
+
+    Tracer.subscribe(listener)
+    yield received
+    Tracer.unsubscribe(listener)
+
+
+def describe(response):
+    return {'status': response}
+
+
+def test_trace_emits_start_and_response(events):
+    assert Tracer.trace('requests', 'GET', 'https://api/groups/1', 'groups/1', lambda: 200, describe) == 200
+
+    (start_kind, start), (end_kind, end) = events
+    assert (start_kind, end_kind) == ('request_start', 'response')
+    assert 'duration_ms' not in start and 'status' not in start
+    assert end['status'] == 200 and end['duration_ms'] >= 0
+
+
+def test_trace_emits_error_and_reraises(events):
+    def send():
+        raise ConnectionError('refused')
+
+    with pytest.raises(ConnectionError):
+        Tracer.trace('requests', 'GET', 'https://api/groups', 'groups', send, describe)
+    assert [kind for kind, _ in events] == ['request_start', 'error']
+    assert events[1][1]['error'] == "ConnectionError('refused')"
+
+
+def test_failing_listener_does_not_fail_the_request(events):
+    def broken(kind, event):
+        raise RuntimeError('listener bug')
+
+    Tracer.subscribe(broken)
+    try:
+        assert Tracer.trace('requests', 'GET', 'https://api/groups', 'groups', lambda: 200, describe) == 200
+    finally:
+        Tracer.unsubscribe(broken)
+    assert [kind for kind, _ in events] == ['request_start', 'response']
@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+import pytest
+
+from utils.web_vitals import WebVitals, WebVitalsReport
+
+
+class FakePage:
+    def __init__(self, lcp_ms):
+        self.lcp_ms = lcp_ms
+
+    def add_init_script(self, script):
+        pass
+
+    def evaluate(self, expression, *args):
+        return {'lcp_ms': self.lcp_ms, 'cls': None}
+
+
+@pytest.fixture
+def web_vitals():
+    WebVitals.configure(True)
+    yield
+    WebVitals.configure(False)
+    WebVitals.take()
+
+
+def teardown_report(nodeid, measurements):
+    return SimpleNamespace(nodeid=nodeid, when='teardown', user_properties=[('web_vitals', measurements)])
+
+
+def test_take_hands_over_each_measurement_once(web_vitals):
+    WebVitals.measure(FakePage(1200), 'app/groups', 'navigation', lambda: None)
+
+    measurements = WebVitals.take()
+
+    assert [(measurement['name'], measurement['values']['lcp_ms']) for measurement in measurements] == [('app/groups', 1200)]
+    assert WebVitals.take() == []
+
+
+def test_report_aggregates_the_measurements_of_all_workers(web_vitals):
+    # what two xdist workers send the controller
+    worker_measurements = []
+    for lcp_ms in (1000, 2000):
+        WebVitals.measure(FakePage(lcp_ms), 'app/groups', 'navigation', lambda: None)
+        worker_measurements.append(WebVitals.take())
+    report = WebVitalsReport()
+    report.pytest_runtest_logreport(SimpleNamespace(when='call', user_properties=[]))
+    for index, measurements in enumerate(worker_measurements):
+        report.pytest_runtest_logreport(teardown_report(f'test_{index}', measurements))
+
+    summary = report.summary()
+
+    assert summary['app/groups']['count'] == 2
+    assert summary['app/groups']['lcp_ms'] == 1750
+    assert summary['app/groups']['cls'] is None
@@ -0,0 +1,58 @@
+import threading
+from urllib.parse import parse_qs, urlparse
+
+from utils.zephyr_helper import ZephyrHelper
+
+CONFIG = {'access_key': 'access', 'secret_key': 'secret', 'account_id': 'account', 'project_id': '10000',
+          'version_id': '-1', 'zephyr_base_url': 'https://zephyr.example.com', 'zephyr_api_path': '/public/rest/api/1.0/',
+          'execution_page_size': 3, 'execution_page_workers': 4}
+
+
+class PageResponse:
+    def __init__(self, page):
+        self.page = page
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.page
+
+
+class PagedZephyr(ZephyrHelper):
+    """ZephyrHelper whose cycle holds the executions of the given issue keys, served page by page."""
+
+    def __init__(self, issue_keys):
+        super().__init__(CONFIG)
+        self.executions = [{'issueKey': key, 'execution': {'id': f'execution-{index}', 'issueId': f'issue-{index}'}}
+                           for index, key in enumerate(issue_keys)]
+        self.offsets = []
+        self._lock = threading.Lock()
+
+    def _send(self, method, url, canonical_path, **kwargs):
+        query = parse_qs(urlparse(url).query)
+        offset, size = int(query['offset'][0]), int(query['size'][0])
+        with self._lock:
+            self.offsets.append(offset)
+        return PageResponse({'totalCount': len(self.executions),
+                             'searchObjectList': self.executions[offset:offset + size]})
+
+
+def test_executions_of_every_page_are_merged():
+    zephyr = PagedZephyr([f'QA-T{index}' for index in range(1, 8)])
+
+    executions = zephyr.get_executions_by_cycle('cycle-1', ['QA-T1', 'QA-T5', 'QA-T7', 'QA-T99'])
+
+    # pages of 3, the last one short
+    assert sorted(zephyr.offsets) == [0, 3, 6]
+    assert executions == {'QA-T1': ('execution-0', 'issue-0'), 'QA-T5': ('execution-4', 'issue-4'),
+                          'QA-T7': ('execution-6', 'issue-6')}
+    assert zephyr.missing_executions == ['QA-T99']
+
+
+def test_single_page_cycle():
+    zephyr = PagedZephyr(['QA-T1', 'QA-T2'])
+
+    assert zephyr.get_executions_by_cycle('cycle-1', ['QA-T2']) == {'QA-T2': ('execution-1', 'issue-1')}
+    assert zephyr.offsets == [0]
+    assert zephyr.missing_executions == []
@@ -0,0 +1,98 @@
+import pytest
+
+from utils.sharding import ExecutionResult
+from utils.zephyr_helper import ZephyrHelper
+from utils.zephyr_snapshot import ZephyrSnapshot
+
+CONFIG = {'access_key': 'access', 'secret_key': 'secret', 'account_id': 'account', 'project_id': '10000',
+          'version_id': '-1', 'zephyr_base_url': 'https://zephyr.example.com', 'zephyr_api_path': '/public/rest/api/1.0/'}
+
+
+class CyclesResponse:
+    def __init__(self, cycles):
+        self.cycles = cycles
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return self.cycles
+
+
+class FakeZephyr(ZephyrHelper):
+    """ZephyrHelper with an existing cycle `nightly`, recording what it would send."""
+
+    def __init__(self):
+        super().__init__(CONFIG)
+        self.statuses, self.uploads = [], []
+
+    def get_test_cycles(self, project_id):
+        return CyclesResponse([{'id': 'cycle-1', 'name': 'nightly'}, {'id': 'cycle-2', 'name': 'weekly'}])
+
+    def create_test_cycle(self, cycle_name):
+        return {'id': 'cycle-new', 'name': cycle_name}
+
+    def add_test_case_to_cycle(self, cycle_id, issue_ids):
+        return b'added'
+
+    def get_executions_by_cycle(self, cycle_id, issue_ids):
+        self.missing_executions = []
+        return {'QA-T1': ('execution-1', 'issue-1')}
+
+    def update_test_results(self, issue_execution_tuple, cycle_id, status_id, comment=None, attempts=1):
+        self.statuses.append(status_id)
+
+    def upload_attachment(self, file_path, issue_execution_tuple, cycle_id):
+        self.uploads.append(file_path)
+
+
+def failed(screenshot):
+    return ExecutionResult('tests/ui/test_groups.py::test_create[chromium]', 'QA-T1', 'failed', screenshot=screenshot)
+
+
+def test_find_test_cycle_by_name():
+    zephyr = FakeZephyr()
+    assert zephyr.find_test_cycle('weekly') == {'id': 'cycle-2', 'name': 'weekly'}
+    assert zephyr.find_test_cycle('missing') is None
+
+
+def test_snapshot_keeps_status_and_attachments_between_runs(tmp_path):
+    snapshot = ZephyrSnapshot.for_cycle(tmp_path, 'cycle-1')
+    assert snapshot.status_changed('execution-1', 2)
+    snapshot.record_status('execution-1', 2)
+    snapshot.record_attachment('execution-1', 'test_a')
+    snapshot.save()
+
+    reloaded = ZephyrSnapshot.for_cycle(tmp_path, 'cycle-1')
+    assert not reloaded.status_changed('execution-1', 2)
+    assert not reloaded.new_attachment('execution-1', 'test_a')
+    assert reloaded.new_attachment('execution-1', 'test_b')
+
+
+def test_status_change_allows_new_attachments(tmp_path):
+    snapshot = ZephyrSnapshot.for_cycle(tmp_path, 'cycle-1')
+    snapshot.record_status('execution-1', 2)
+    snapshot.record_attachment('execution-1', 'test_a')
+
+    snapshot.record_status('execution-1', 1)
+    assert snapshot.new_attachment('execution-1', 'test_a')
+
+
+def test_repeated_failure_is_published_once(tmp_path):
+    first, second = FakeZephyr(), FakeZephyr()
+
+    first.publish_results('nightly', [failed('run1.png')], reuse_cycle=True, snapshot_dir=tmp_path)
+    second.publish_results('nightly', [failed('run2.png')], reuse_cycle=True, snapshot_dir=tmp_path)
+
+    assert (first.statuses, first.uploads) == ([2], ['run1.png'])
+    assert (second.statuses, second.uploads) == ([], [])
+
+
+@pytest.mark.parametrize('reuse_cycle', [False, True])
+def test_failure_after_a_pass_is_published_again(tmp_path, reuse_cycle):
+    zephyr = FakeZephyr()
+
+    for result in (failed('run1.png'), ExecutionResult(failed(None).nodeid, 'QA-T1', 'passed'), failed('run3.png')):
+        zephyr.publish_results('nightly', [result], reuse_cycle=reuse_cycle, snapshot_dir=tmp_path)
+
+    assert (zephyr.statuses, zephyr.uploads) == ([2, 1, 2], ['run1.png', 'run3.png'])
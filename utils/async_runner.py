@@ -0,0 +1,158 @@
+"""
+Built-in runner for `async def` tests and fixtures.
+
+All coroutine tests and async fixtures of a process run on one event loop, created on first use
+and closed when pytest unconfigures: one loop per session, or per worker under xdist. Async
+fixtures of any scope therefore share the loop, so a session scoped aiohttp session or async
+Playwright instance can serve every test:
+
+    @pytest.fixture(scope="session")
+    async def http_session():
+        async with aiohttp.ClientSession() as session:
+            yield session
+
+    async def test_endpoints(http_session):
+        await asyncio.gather(*(http_session.get(url) for url in urls))
+
+The loop runs in a dedicated thread: sync Playwright keeps its own loop registered as running in
+the main thread, and a second loop cannot run there. Tests and fixtures wait for their coroutine
+to finish on the loop thread; sync code can submit to the `asyncio_runner_loop` fixture with
+asyncio.run_coroutine_threadsafe. The runner is only registered without pytest-asyncio, and so is
+the fixture.
+
+With a slow callback threshold the loop runs in asyncio debug mode, which reports every callback
+or task step blocking the loop for longer than the threshold; the runner keeps them per test.
+"""
+import asyncio
+import functools
+import inspect
+import logging
+import threading
+from dataclasses import dataclass
+from typing import List, Optional
+
+import pytest
+
+from utils.tracing import Tracer
+
+
+@dataclass
+class SlowCallback:
+    test: Optional[str]
+    callback: str
+    seconds: float
+
+
+class _SlowCallbackHandler(logging.Handler):
+    """Collects asyncio debug mode's `Executing <handle> took 0.250 seconds` warnings."""
+
+    def __init__(self, slow_callbacks: List[SlowCallback]):
+        super().__init__(logging.WARNING)
+        self.slow_callbacks = slow_callbacks
+
+    def emit(self, record):
+        if record.msg == 'Executing %s took %.3f seconds':
+            handle, seconds = record.args
+            self.slow_callbacks.append(SlowCallback(Tracer.current_test, str(handle), seconds))
+
+
+class AsyncioRunner:
+    """
+    Pytest plugin running coroutine tests and async fixtures on one event loop per process.
+
+    Args:
+        slow_callback_ms (float, optional): Report callbacks blocking the loop longer than this;
+            None or 0 keeps the loop out of debug mode.
+    """
+
+    def __init__(self, slow_callback_ms: Optional[float] = None):
+        self.slow_callback_ms = slow_callback_ms
+        self.slow_callbacks: List[SlowCallback] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._handler: Optional[logging.Handler] = None
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        if self._loop is None:
+            self._loop = asyncio.new_event_loop()
+            if self.slow_callback_ms:
+                self._loop.set_debug(True)
+                self._loop.slow_callback_duration = self.slow_callback_ms / 1000
+                self._handler = _SlowCallbackHandler(self.slow_callbacks)
+                logging.getLogger('asyncio').addHandler(self._handler)
+            self._thread = threading.Thread(target=self._loop.run_forever, name='asyncio-runner', daemon=True)
+            self._thread.start()
+        return self._loop
+
+    @pytest.fixture(scope="session")
+    def asyncio_runner_loop(self):
+        """The loop async tests and fixtures run on; it runs in its own thread, use asyncio.run_coroutine_threadsafe."""
+        return self.loop
+
+    def run(self, awaitable):
+        """Run an awaitable on the loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(_awaited(awaitable), self.loop).result()
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_pyfunc_call(self, pyfuncitem):
+        if not inspect.iscoroutinefunction(pyfuncitem.obj):
+            return None
+        arguments = {name: pyfuncitem.funcargs[name] for name in pyfuncitem._fixtureinfo.argnames}
+        self.run(pyfuncitem.obj(**arguments))
+        return True
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_fixture_setup(self, fixturedef):
+        function = fixturedef.func
+        if getattr(function, '_runs_on_loop', False):
+            return
+        if inspect.isasyncgenfunction(function):
+            fixturedef.func = self._wrap_async_generator(function)
+        elif inspect.iscoroutinefunction(function):
+            fixturedef.func = self._wrap_coroutine(function)
+
+    def pytest_unconfigure(self):
+        if self._loop is None:
+            return
+        self.run(_shutdown())
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        self._loop.close()
+        if self._handler:
+            logging.getLogger('asyncio').removeHandler(self._handler)
+
+    def _wrap_coroutine(self, function):
+        @functools.wraps(function)
+        def fixture(*args, **kwargs):
+            return self.run(function(*args, **kwargs))
+        fixture._runs_on_loop = True
+        return fixture
+
+    def _wrap_async_generator(self, function):
+        @functools.wraps(function)
+        def fixture(*args, **kwargs):
+            generator = function(*args, **kwargs)
+            yield self.run(generator.__anext__())
+            try:
+                self.run(generator.__anext__())
+            except StopAsyncIteration:
+                return
+            raise RuntimeError(f"Async fixture {function.__name__} yielded more than once")
+        fixture._runs_on_loop = True
+        return fixture
+
+
+async def _awaited(awaitable):
+    # named after the test so slow callback reports of the task say where it came from
+    asyncio.current_task().set_name(Tracer.current_test or 'asyncio-runner')
+    return await awaitable
+
+
+async def _shutdown():
+    """Cancel the tasks left on the loop and finalize its async generators."""
+    pending = asyncio.all_tasks() - {asyncio.current_task()}
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    await asyncio.get_running_loop().shutdown_asyncgens()
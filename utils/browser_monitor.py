@@ -0,0 +1,154 @@
+"""
+Resource monitor of the session browser.
+
+The monitor launches the browser and finds its process tree (browser, GPU, renderer and utility
+processes started by the launch). After every test using the browser it samples RSS and CPU time
+of that tree, attaches them to the test's report and relaunches the browser once a configured
+threshold is exceeded, so long runs do not slow down or crash on an ever growing browser.
+"""
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Set
+
+import psutil
+
+MIB = 2 ** 20
+
+
+@dataclass
+class BrowserSample:
+    rss: int  # bytes, summed over the browser process tree
+    cpu_seconds: Dict[int, float]  # per pid
+    taken_at: float
+
+
+class BrowserMonitor:
+    """
+    Owns the session browser and samples its process tree between tests.
+
+    CPU is measured as the CPU time the processes alive at the sample spent since the previous
+    sample; processes which start and exit within one test (short-lived renderers) are not seen.
+
+    Usage:
+        monitor = BrowserMonitor(lambda: playwright.chromium.launch(), max_rss_mb=1500)
+        page = monitor.browser.new_page()
+        ...
+        measurements = monitor.sample()  # after the test, may relaunch monitor.browser
+    """
+
+    def __init__(self, launch: Callable, enabled: bool = True, max_rss_mb: Optional[float] = None,
+                 max_cpu_percent: Optional[float] = None):
+        self.launch = launch
+        self.enabled = enabled
+        self.max_rss_mb = max_rss_mb
+        self.max_cpu_percent = max_cpu_percent
+        self.recycles = 0
+        self.browser = None
+        self._roots: List[psutil.Process] = []
+        self._last: Optional[BrowserSample] = None
+        self._start()
+
+    def sample(self) -> Optional[dict]:
+        """
+        Sample the browser process tree and relaunch the browser when a threshold is exceeded.
+
+        Returns:
+            Optional[dict]: rss, rss_delta (bytes, since the previous sample), cpu_seconds, cpu_percent
+            and recycled (the exceeded threshold or None); None when the monitor is disabled.
+        """
+        if not self.enabled:
+            return None
+        current = self._measure()
+        cpu_seconds = sum(max(0.0, seconds - self._last.cpu_seconds.get(pid, 0.0))
+                          for pid, seconds in current.cpu_seconds.items())
+        wall = current.taken_at - self._last.taken_at
+        measurements = {
+            'rss': current.rss,
+            'rss_delta': current.rss - self._last.rss,
+            'cpu_seconds': round(cpu_seconds, 3),
+            'cpu_percent': round(100 * cpu_seconds / wall, 1) if wall else 0.0,
+            'recycled': None,
+        }
+        self._last = current
+        if self.max_rss_mb and current.rss > self.max_rss_mb * MIB:
+            measurements['recycled'] = f"rss {current.rss / MIB:.0f}MiB > {self.max_rss_mb}MiB"
+        elif self.max_cpu_percent and measurements['cpu_percent'] > self.max_cpu_percent:
+            measurements['recycled'] = f"cpu {measurements['cpu_percent']}% > {self.max_cpu_percent}%"
+        if measurements['recycled']:
+            self.recycle()
+        return measurements
+
+    def recycle(self) -> None:
+        """Close the browser and launch a fresh one."""
+        self.browser.close()
+        self.recycles += 1
+        self._start()
+
+    def close(self) -> None:
+        self.browser.close()
+
+    def _start(self) -> None:
+        before = self._descendant_pids()
+        self.browser = self.launch()
+        if not self.enabled:
+            return
+        started = [process for process in psutil.Process().children(recursive=True) if process.pid not in before]
+        started_pids = {process.pid for process in started}
+        self._roots = [process for process in started if process.ppid() not in started_pids]
+        self._last = self._measure()
+
+    def _measure(self) -> BrowserSample:
+        rss, cpu_seconds = 0, {}
+        for process in self._tree():
+            try:
+                with process.oneshot():
+                    rss += process.memory_info().rss
+                    times = process.cpu_times()
+                    cpu_seconds[process.pid] = times.user + times.system
+            except psutil.Error:
+                continue
+        return BrowserSample(rss, cpu_seconds, time.monotonic())
+
+    def _tree(self) -> List[psutil.Process]:
+        processes = []
+        for root in self._roots:
+            try:
+                processes += [root] + root.children(recursive=True)
+            except psutil.Error:
+                continue
+        return processes
+
+    @staticmethod
+    def _descendant_pids() -> Set[int]:
+        return {process.pid for process in psutil.Process().children(recursive=True)}
+
+
+class BrowserMemoryReport:
+    """
+    Pytest plugin collecting the browser measurements of every test from the reports' user_properties.
+
+    Works from reports, so the xdist controller sees the measurements of all workers.
+    """
+
+    def __init__(self):
+        self.rss_added: Dict[str, int] = {}
+        self.peak_rss = 0
+        self.samples = 0
+        self.recycles: List[str] = []
+
+    def pytest_runtest_logreport(self, report):
+        if report.when != 'teardown':
+            return
+        properties = dict(report.user_properties)
+        if 'browser_rss' not in properties:
+            return
+        self.samples += 1
+        self.peak_rss = max(self.peak_rss, properties['browser_rss'])
+        self.rss_added[report.nodeid] = self.rss_added.get(report.nodeid, 0) + properties['browser_rss_delta']
+        if properties.get('browser_recycled'):
+            self.recycles.append(f"{report.nodeid} ({properties['browser_recycled']})")
+
+    def leak_prone(self, top: int = 10) -> List[tuple]:
+        """Tests which left the browser with the most additional memory, (nodeid, bytes) largest first."""
+        added = [(nodeid, rss) for nodeid, rss in self.rss_added.items() if rss > 0]
+        return sorted(added, key=lambda entry: -entry[1])[:top]
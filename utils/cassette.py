@@ -0,0 +1,282 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, asdict
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.models import RequestEncodingMixin
+from requests.structures import CaseInsensitiveDict
+
+
+class CassetteMiss(LookupError):
+    """Raised in replay mode when a request has no recorded response."""
+
+
+@dataclass
+class RecordedResponse:
+    """
+    Data class representing one recorded http response.
+
+    Attributes:
+        status (int): http status code.
+        reason (str): http reason phrase.
+        headers (dict): response headers.
+        body (bytes): raw response body.
+        url (str): final url of the response.
+        elapsed_ms (float): how long the live request took.
+    """
+
+    status: int
+    reason: str
+    headers: Dict[str, str]
+    body: bytes
+    url: str
+    elapsed_ms: float
+
+    @classmethod
+    def from_requests(cls, response: requests.Response) -> 'RecordedResponse':
+        return RecordedResponse(status=response.status_code, reason=response.reason or '',
+                                headers=dict(response.headers), body=response.content, url=response.url,
+                                elapsed_ms=response.elapsed.total_seconds() * 1000)
+
+    @classmethod
+    def from_playwright(cls, response, elapsed_ms: float) -> 'RecordedResponse':
+        return RecordedResponse(status=response.status, reason=response.status_text,
+                                headers=dict(response.headers), body=response.body(), url=response.url,
+                                elapsed_ms=elapsed_ms)
+
+    def to_requests_response(self) -> requests.Response:
+        response = requests.Response()
+        response.status_code = self.status
+        response.reason = self.reason
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.url = self.url
+        response._content = self.body
+        response.encoding = requests.utils.get_encoding_from_headers(response.headers)
+        return response
+
+    def to_playwright_response(self) -> 'ReplayedPlaywrightResponse':
+        return ReplayedPlaywrightResponse(self)
+
+
+class ReplayedPlaywrightResponse:
+    """Minimal stand-in for playwright APIResponse built from a recorded response."""
+
+    def __init__(self, recorded: RecordedResponse):
+        self._recorded = recorded
+        self.status = recorded.status
+        self.status_text = recorded.reason
+        self.headers = {key.lower(): value for key, value in recorded.headers.items()}
+        self.url = recorded.url
+        self.ok = 200 <= recorded.status < 300
+
+    def body(self) -> bytes:
+        return self._recorded.body
+
+    def text(self) -> str:
+        return self._recorded.body.decode('utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self._recorded.body)
+
+    def dispose(self) -> None:
+        pass
+
+
+def normalize_query(url: str, params=None) -> str:
+    """Merge query of the url with params and sort it so equal queries give equal keys
+    :param url: request url, possibly with a query string.
+    :param params: query params the way requests accepts them.
+    :return: sorted, encoded query string.
+    """
+
+    pairs = parse_qsl(urlsplit(url).query, keep_blank_values=True)
+    if params:
+        pairs += parse_qsl(RequestEncodingMixin._encode_params(params), keep_blank_values=True)
+    return urlencode(sorted(pairs))
+
+
+def body_hash(body) -> str:
+    if body is None:
+        return ''
+    if isinstance(body, (dict, list)):
+        body = json.dumps(body, sort_keys=True, separators=(',', ':'))
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    return hashlib.sha256(body).hexdigest()
+
+
+def request_key(method: str, url: str, params=None, body=None) -> str:
+    """Key of a request in the cassette index: method, url without query, normalized query and body hash."""
+
+    scheme, netloc, path, _, _ = urlsplit(url)
+    bare_url = urlunsplit((scheme, netloc, path, '', ''))
+    return f'{method.upper()} {bare_url}?{normalize_query(url, params)} {body_hash(body)}'
+
+
+@dataclass
+class CassetteStats:
+    recorded: int = 0
+    replayed: int = 0
+    saved_ms: float = 0.0
+
+
+class Cassette:
+    """
+    Recorded http interactions of one test module.
+
+    Layout on disk:
+        <directory>/<name>/index.json      request key -> list of recorded responses (without bodies)
+        <directory>/<name>/objects/<sha>   gzip compressed bodies, stored once per distinct content
+
+    The index is loaded into memory once and looked up per request. Repeated requests with the
+    same key are replayed in recorded order, cycling when the recorded list is exhausted.
+    """
+
+    def __init__(self, directory: Path, name: str, mode: str):
+        self.path = Path(directory) / name
+        self.name = name
+        self.mode = mode
+        self.stats = CassetteStats()
+        self._index: Dict[str, List[dict]] = self._load_index()
+        self._cursors: Dict[str, int] = {}
+        self._recorded_keys = set()
+        self._lock = threading.Lock()
+
+    def play(self, method: str, url: str, params, body, send: Callable[[], RecordedResponse]) -> RecordedResponse:
+        """
+        Return the recorded response for a request, or send it live and record it.
+
+        Args:
+            method (str): http method.
+            url (str): full request url.
+            params: query params.
+            body: request payload.
+            send (Callable): Sends the request live and returns a RecordedResponse.
+
+        Returns:
+            RecordedResponse: Recorded or live response.
+
+        Raises:
+            CassetteMiss: In replay mode when the request was never recorded.
+        """
+        key = request_key(method, url, params, body)
+        if self.mode == 'replay':
+            return self._replay(key)
+        response = send()
+        self._record(key, response)
+        return response
+
+    def save(self) -> None:
+        """Write the index, merging keys other processes recorded into the same cassette."""
+        if not self._recorded_keys:
+            return
+        index = self._load_index()
+        with self._lock:
+            index.update({key: self._index[key] for key in self._recorded_keys})
+        self.path.mkdir(parents=True, exist_ok=True)
+        _write_atomic(self.path / 'index.json', json.dumps(index, indent=1, sort_keys=True).encode('utf-8'))
+
+    def _replay(self, key: str) -> RecordedResponse:
+        with self._lock:
+            entries = self._index.get(key)
+            if not entries:
+                raise CassetteMiss(f'No recorded response for "{key}" in cassette {self.name}')
+            position = self._cursors.get(key, 0)
+            self._cursors[key] = position + 1
+        entry = entries[position % len(entries)]
+        self.stats.replayed += 1
+        self.stats.saved_ms += entry['elapsed_ms']
+        return RecordedResponse(status=entry['status'], reason=entry['reason'], headers=entry['headers'],
+                                body=self._read_object(entry['body']), url=entry['url'],
+                                elapsed_ms=entry['elapsed_ms'])
+
+    def _record(self, key: str, response: RecordedResponse) -> None:
+        entry = asdict(response)
+        entry['body'] = self._write_object(response.body)
+        with self._lock:
+            if key not in self._recorded_keys:
+                self._index[key] = []
+                self._recorded_keys.add(key)
+            self._index[key].append(entry)
+        self.stats.recorded += 1
+
+    def _write_object(self, content: bytes) -> str:
+        digest = hashlib.sha256(content).hexdigest()
+        object_path = self.path / 'objects' / digest
+        if not object_path.exists():
+            object_path.parent.mkdir(parents=True, exist_ok=True)
+            _write_atomic(object_path, gzip.compress(content))
+        return digest
+
+    def _read_object(self, digest: str) -> bytes:
+        return gzip.decompress((self.path / 'objects' / digest).read_bytes())
+
+    def _load_index(self) -> Dict[str, List[dict]]:
+        index_path = self.path / 'index.json'
+        if not index_path.exists():
+            return {}
+        return json.loads(index_path.read_text())
+
+
+def _write_atomic(path: Path, content: bytes) -> None:
+    """Write through a temp file and rename, so readers and other workers never see a partial file."""
+    tmp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+
+
+class Cassettes:
+    """
+    Process wide cassette registry used by BaseApi and BaseAPIController.
+
+    Modes:
+        passthrough: requests always go to the live service (default, no cassette is active).
+        record: requests go to the live service and responses are recorded.
+        replay: responses come from cassettes only, unknown requests raise CassetteMiss.
+    """
+
+    MODES = ('record', 'replay', 'passthrough')
+    _mode = 'passthrough'
+    _directory = Path('cassettes')
+    _cassettes: Dict[str, Cassette] = {}
+    _current: Optional[Cassette] = None
+
+    @classmethod
+    def configure(cls, mode: str, directory) -> None:
+        if mode not in cls.MODES:
+            raise ValueError(f'Unknown cassette mode "{mode}", expected one of {cls.MODES}')
+        cls._mode = mode
+        cls._directory = Path(directory)
+
+    @classmethod
+    def use(cls, name: str) -> Optional[Cassette]:
+        """Make the named cassette current, loading it on first use."""
+        if cls._mode == 'passthrough':
+            return None
+        if name not in cls._cassettes:
+            cls._cassettes[name] = Cassette(cls._directory, name, cls._mode)
+        cls._current = cls._cassettes[name]
+        return cls._current
+
+    @classmethod
+    def current(cls) -> Optional[Cassette]:
+        return cls._current
+
+    @classmethod
+    def replaying(cls) -> bool:
+        return cls._mode == 'replay'
+
+    @classmethod
+    def save_all(cls) -> None:
+        for cassette in cls._cassettes.values():
+            cassette.save()
+
+    @classmethod
+    def summary(cls) -> Dict[str, CassetteStats]:
+        return {name: cassette.stats for name, cassette in cls._cassettes.items()}
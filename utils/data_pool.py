@@ -0,0 +1,167 @@
+import logging
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Optional
+
+
+class DataPool:
+    """
+    A pool of pre-provisioned test data items with exclusive lease/return semantics.
+
+    Items are created in parallel by the given factory when the pool is filled. Tests lease
+    an item exclusively and return it afterwards, optionally resetting it to its original
+    state. The pool keeps `size` live items, available or leased: when fewer than the refill
+    threshold are available, it replaces the items it lost (dropped after a failed reset or a
+    failed creation) in the background. Closing the pool destroys the items it still holds.
+    """
+
+    def __init__(self, factory: Callable[[], Any], reset: Optional[Callable[[Any], Any]] = None,
+                 size: int = 5, refill_threshold: int = 1, workers: int = 5, lease_timeout: float = 60,
+                 destroy: Optional[Callable[[Any], None]] = None):
+        """
+        Args:
+            factory (Callable): Creates a new item and returns it.
+            reset (Callable, optional): Restores a returned item. Its return value replaces the item
+                unless it is None. If reset raises, the item is dropped and a new one is created.
+            size (int): Number of live items, available plus leased, the pool is filled up to.
+            refill_threshold (int): Refill up to `size` in background when fewer items than this are available.
+            workers (int): Number of parallel workers used for creating items.
+            lease_timeout (float): Seconds to wait for an item before giving up.
+            destroy (Callable, optional): Deletes an item; called on close, on items returned after close
+                and on items dropped after a failed reset.
+        """
+        self.factory = factory
+        self.reset = reset
+        self.destroy = destroy
+        self.size = size
+        self.refill_threshold = refill_threshold
+        self.lease_timeout = lease_timeout
+        self.logger = logging.getLogger(__name__)
+        self._available = queue.Queue()
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='data-pool')
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._leased = 0
+        self._closed = False
+
+    def fill(self) -> None:
+        """
+        Create items in parallel until the pool holds `size` items. Blocks until done.
+
+        Raises:
+            Exception: The first error raised by the factory.
+        """
+        futures = [self._executor.submit(self._create) for _ in range(self._missing())]
+        for future in futures:
+            future.result()
+
+    def lease(self) -> Any:
+        """
+        Take an item out of the pool exclusively.
+
+        Returns:
+            Any: The leased item.
+
+        Raises:
+            TimeoutError: If no item became available within `lease_timeout` seconds.
+        """
+        try:
+            item = self._available.get(timeout=self.lease_timeout)
+        except queue.Empty:
+            raise TimeoutError(f'No pooled item became available within {self.lease_timeout}s')
+        with self._lock:
+            self._leased += 1
+        self._refill_if_low()
+        return item
+
+    def give_back(self, item: Any) -> None:
+        """
+        Return a leased item to the pool, resetting it first if a reset callable is set.
+
+        Args:
+            item (Any): The item previously returned by `lease`.
+        """
+        if self._closed:
+            self._release()
+            self._destroy(item)
+            return
+        self._executor.submit(self._reset_and_return, item)
+
+    @contextmanager
+    def leased(self):
+        """
+        Context manager which leases an item and always returns it afterwards.
+        """
+        item = self.lease()
+        try:
+            yield item
+        finally:
+            self.give_back(item)
+
+    def close(self) -> None:
+        """
+        Stop background work and destroy the available items. Items still leased are destroyed
+        when they are given back.
+        """
+        self._closed = True
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        while True:
+            try:
+                item = self._available.get_nowait()
+            except queue.Empty:
+                return
+            self._destroy(item)
+
+    @property
+    def available(self) -> int:
+        return self._available.qsize()
+
+    def _missing(self) -> int:
+        with self._lock:
+            missing = self.size - self._available.qsize() - self._pending - self._leased
+            missing = max(missing, 0)
+            self._pending += missing
+        return missing
+
+    def _refill_if_low(self) -> None:
+        if self._closed or self._available.qsize() >= self.refill_threshold:
+            return
+        for _ in range(self._missing()):
+            self._executor.submit(self._create)
+
+    def _create(self) -> None:
+        try:
+            self._available.put(self.factory())
+        except Exception:
+            self.logger.exception('Failed to create pooled item')
+            raise
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _reset_and_return(self, item: Any) -> None:
+        if self.reset is not None:
+            try:
+                item = self.reset(item) or item
+            except Exception:
+                self.logger.exception('Failed to reset pooled item, replacing it')
+                self._release()
+                self._destroy(item)
+                self._refill_if_low()
+                return
+        self._available.put(item)
+        self._release()
+
+    def _release(self) -> None:
+        with self._lock:
+            self._leased -= 1
+
+    def _destroy(self, item: Any) -> None:
+        if self.destroy is None:
+            return
+        try:
+            self.destroy(item)
+        except Exception:
+            self.logger.exception('Failed to destroy pooled item')
@@ -0,0 +1,168 @@
+"""
+Network and CPU emulation profiles for UI runs, and per-profile timing of POM actions.
+
+Profiles are defined in the env config:
+    emulation_profiles:
+      slow-4g: {latency_ms: 150, download_kbps: 1600, upload_kbps: 750}
+      cpu-4x: {cpu_slowdown: 4}
+
+and selected per test with `@pytest.mark.EMULATION('slow-4g')` or for the whole run with
+`--emulation slow-4g` (the marker wins).
+
+Chromium pages are throttled through a CDP session (Network.emulateNetworkConditions,
+Emulation.setCPUThrottlingRate). Firefox and WebKit have no CDP: there, only the latency of a
+profile is emulated by delaying every request in a route handler. The sync API handles routes
+one at a time, so concurrent requests queue up behind each other and the delay is an upper
+bound rather than a faithful emulation; bandwidth and CPU throttling are not applied and are
+returned by `apply_profile` so the run can report them.
+
+POM action durations of a test travel in its teardown report's user_properties, and
+ActionTimingsReport compares them per profile across the run.
+"""
+import functools
+import statistics
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Tuple
+
+NO_PROFILE = 'none'
+
+
+@dataclass
+class EmulationProfile:
+    name: str
+    latency_ms: float = 0
+    download_kbps: Optional[float] = None  # None: not throttled
+    upload_kbps: Optional[float] = None
+    cpu_slowdown: float = 1
+
+    @classmethod
+    def from_config(cls, profiles_config: Optional[dict], name: str) -> 'EmulationProfile':
+        """
+        Build the named profile of the `emulation_profiles` env config section.
+
+        Raises:
+            KeyError: If the profile is not configured.
+        """
+        profiles_config = profiles_config or {}
+        if name not in profiles_config:
+            raise KeyError(f"Unknown emulation profile '{name}', configured: {', '.join(profiles_config) or 'none'}")
+        return cls(name, **(profiles_config[name] or {}))
+
+    @property
+    def throttles_network(self) -> bool:
+        return bool(self.latency_ms or self.download_kbps or self.upload_kbps)
+
+
+def apply_profile(page, profile: EmulationProfile) -> List[str]:
+    """
+    Throttle a page according to a profile.
+
+    Args:
+        page: Playwright page, before the test navigates.
+        profile (EmulationProfile): The profile to apply.
+
+    Returns:
+        List[str]: Parts of the profile this browser could not apply.
+    """
+    if page.context.browser.browser_type.name == 'chromium':
+        cdp = page.context.new_cdp_session(page)
+        if profile.throttles_network:
+            cdp.send('Network.enable')
+            cdp.send('Network.emulateNetworkConditions', {
+                'offline': False,
+                'latency': profile.latency_ms,
+                'downloadThroughput': _bytes_per_second(profile.download_kbps),
+                'uploadThroughput': _bytes_per_second(profile.upload_kbps),
+            })
+        if profile.cpu_slowdown > 1:
+            cdp.send('Emulation.setCPUThrottlingRate', {'rate': profile.cpu_slowdown})
+        return []
+    if profile.latency_ms:
+        def delay(route):
+            time.sleep(profile.latency_ms / 1000)
+            route.continue_()
+        page.route('**/*', delay)
+    return [part for part, unsupported in (('bandwidth', profile.download_kbps or profile.upload_kbps),
+                                           ('cpu_slowdown', profile.cpu_slowdown > 1)) if unsupported]
+
+
+class ActionTimings:
+    """
+    Process wide durations of POM actions per emulation profile.
+
+    BasePage wraps the public methods of every page object with `timed`; while disabled the
+    wrapper only calls the method. The page fixture sets `current_profile` for each test and
+    hands the durations recorded during it over to its report with `take`.
+    """
+
+    enabled: bool = False
+    current_profile: str = NO_PROFILE
+    _pending: List[Tuple[str, str, float]] = []
+    _lock = threading.Lock()
+
+    @classmethod
+    def record(cls, action: str, duration_ms: float) -> None:
+        with cls._lock:
+            cls._pending.append((action, cls.current_profile, duration_ms))
+
+    @classmethod
+    def take(cls) -> List[Tuple[str, str, float]]:
+        """(action, profile, ms) of the actions recorded since the last call."""
+        with cls._lock:
+            pending, cls._pending = cls._pending, []
+        return pending
+
+
+class ActionTimingsReport:
+    """
+    Pytest plugin collecting the POM action durations of every test from the reports' user_properties.
+
+    Works from reports, so the xdist controller sees the durations of all workers.
+    """
+
+    def __init__(self):
+        self.durations: Dict[Tuple[str, str], List[float]] = {}
+
+    def pytest_runtest_logreport(self, report):
+        if report.when != 'teardown':
+            return
+        for action, profile, duration_ms in dict(report.user_properties).get('action_timings', []):
+            self.durations.setdefault((action, profile), []).append(duration_ms)
+
+    def summary(self) -> Dict[str, Dict[str, Tuple[int, float]]]:
+        """{action: {profile: (count, median ms)}}"""
+        summary: Dict[str, Dict[str, Tuple[int, float]]] = {}
+        for (action, profile), values in sorted(self.durations.items()):
+            summary.setdefault(action, {})[profile] = (len(values), round(statistics.median(values), 1))
+        return summary
+
+
+def timed(action: str, function: Callable) -> Callable:
+    """Wrap a POM method so its duration is recorded under `action` while ActionTimings is enabled."""
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        if not ActionTimings.enabled:
+            return function(*args, **kwargs)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            ActionTimings.record(action, (time.perf_counter() - start) * 1000)
+    return wrapper
+
+
+def format_action_timings(summary: Dict[str, Dict[str, Tuple[int, float]]]) -> List[str]:
+    lines = []
+    for action, profiles in summary.items():
+        baseline = profiles.get(NO_PROFILE, (0, 0.0))[1]
+        lines.append(f"{action}: " + ', '.join(
+            f"{profile} {median:.0f}ms x{count}" + (f" ({median / baseline:.1f}x)" if baseline and profile != NO_PROFILE
+                                                    else '')
+            for profile, (count, median) in sorted(profiles.items(), key=lambda entry: entry[0] != NO_PROFILE)))
+    return lines
+
+
+def _bytes_per_second(kbps: Optional[float]) -> float:
+    return kbps * 1000 / 8 if kbps else -1  # -1 disables throttling in CDP
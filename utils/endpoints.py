@@ -0,0 +1,27 @@
+import re
+from urllib.parse import urlparse
+
+_UUID_SEGMENT = re.compile(r'^[0-9a-fA-F]{8}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{4}-[0-9a-fA-F]{12}$')
+_ID_SEGMENT = re.compile(r'^\d+$')
+
+
+def template_endpoint(endpoint: str) -> str:
+    """
+    Replace identifier segments of an endpoint with placeholders so requests to the same
+    route are grouped together, e.g. `groups/3f2b...-.../emails` becomes `groups/{uuid}/emails`.
+
+    Args:
+        endpoint (str): Endpoint path or full url. Query string and host are dropped.
+
+    Returns:
+        str: The templated endpoint.
+    """
+    path = urlparse(endpoint).path if '://' in endpoint else endpoint.split('?', 1)[0]
+    segments = []
+    for segment in path.split('/'):
+        if _UUID_SEGMENT.match(segment):
+            segment = '{uuid}'
+        elif _ID_SEGMENT.match(segment):
+            segment = '{id}'
+        segments.append(segment)
+    return '/'.join(segments)
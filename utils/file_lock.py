@@ -0,0 +1,51 @@
+import os
+from contextlib import contextmanager
+from pathlib import Path
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+
+def lock_file(file, blocking: bool = True) -> bool:
+    """
+    Take an exclusive lock on an open file, shared by all processes of the machine.
+
+    Args:
+        file: Open file object.
+        blocking (bool): Wait for the lock instead of giving up when another process holds it.
+
+    Returns:
+        bool: Whether the lock was taken.
+    """
+    try:
+        if os.name == 'nt':
+            file.seek(0)
+            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK if blocking else msvcrt.LK_NBLCK, 1)
+        else:
+            fcntl.flock(file.fileno(), fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return True
+    except OSError:
+        return False
+
+
+def unlock_file(file) -> None:
+    if os.name == 'nt':
+        file.seek(0)
+        msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+
+
+@contextmanager
+def locked_file(path: Path):
+    """Open a binary file for reading and writing, creating it if needed, and hold its lock."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with os.fdopen(os.open(path, os.O_RDWR | os.O_CREAT), 'r+b') as file:
+        lock_file(file)
+        try:
+            file.seek(0)
+            yield file
+        finally:
+            unlock_file(file)
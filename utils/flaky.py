@@ -0,0 +1,127 @@
+import json
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+from _pytest.runner import call_and_report
+
+from utils.file_lock import locked_file
+
+OUTCOMES = ('passed', 'flaky', 'failed')
+
+
+class FlakyStore:
+    """
+    Outcome history of every test over the last `window` runs, kept in a local JSON file.
+
+    A run of a test is `passed`, `failed`, or `flaky` when it failed and then passed on a rerun.
+    The flakiness score is the share of runs which were flaky or whose outcome differs from the
+    run before; tests failing every time are broken, not flaky, and score 0.
+
+    Runs in parallel (xdist workers, the quarantine lane) merge their outcomes into the file under
+    a lock, so none of them overwrites the others.
+
+    File:
+        {"<nodeid>": ["passed", "flaky", "failed", ...]}   oldest first
+    """
+
+    def __init__(self, path: Path, window: int = 20):
+        self.path = Path(path)
+        self.window = window
+        self.history: Dict[str, List[str]] = {}
+        if self.path.exists():
+            with locked_file(self.path) as file:
+                self.history = self._read(file)
+        self.run_outcomes: Dict[str, str] = {}
+
+    def record(self, nodeid: str, outcome: str) -> None:
+        if outcome not in OUTCOMES:
+            raise ValueError(f'Unknown outcome {outcome}, expected one of {OUTCOMES}')
+        self.run_outcomes[nodeid] = outcome
+
+    def score(self, nodeid: str) -> float:
+        history = self.history.get(nodeid, [])
+        if not history:
+            return 0.0
+        unstable = sum(1 for index, outcome in enumerate(history)
+                       if outcome == 'flaky' or (index and outcome != history[index - 1]))
+        return unstable / len(history)
+
+    def quarantined(self, nodeid: str, threshold: float, min_runs: int) -> bool:
+        return len(self.history.get(nodeid, [])) >= min_runs and self.score(nodeid) >= threshold
+
+    def save(self) -> None:
+        """Append this run's outcomes to the stored history of each test."""
+        if not self.run_outcomes:
+            return
+        with locked_file(self.path) as file:
+            self.history = self._read(file)
+            for nodeid, outcome in self.run_outcomes.items():
+                self.history[nodeid] = (self.history.get(nodeid, []) + [outcome])[-self.window:]
+            file.seek(0)
+            file.truncate()
+            file.write(json.dumps(self.history, indent=1).encode())
+        self.run_outcomes = {}
+
+    @staticmethod
+    def _read(file) -> Dict[str, List[str]]:
+        raw = file.read()
+        return json.loads(raw) if raw else {}
+
+
+class FlakyReruns:
+    """
+    Pytest plugin rerunning failing tests in place.
+
+    Each attempt runs the full setup/call/teardown protocol, so function scoped fixtures such as
+    `page` (and its browser context) are fresh, while module and session scoped ones are set up
+    once: an attempt which is rerun tears down the test only, and just the attempt deciding the
+    result tears down towards the next item. Failed reports of earlier attempts are logged with
+    the `rerun` outcome, and `item.attempts` keeps the count. Outcomes are recorded in the
+    FlakyStore when one is given.
+    """
+
+    def __init__(self, reruns: int, store: Optional[FlakyStore] = None):
+        self.reruns = reruns
+        self.store = store
+        self.flaky: List[str] = []
+
+    @pytest.hookimpl(tryfirst=True)
+    def pytest_runtest_protocol(self, item, nextitem):
+        xfail = item.get_closest_marker('xfail') is not None
+        reruns = 0 if xfail else self.reruns
+        item.ihook.pytest_runtest_logstart(nodeid=item.nodeid, location=item.location)
+        for attempt in range(1, reruns + 2):
+            item.attempts = attempt
+            item.screenshot_path = None
+            reports = [call_and_report(item, 'setup', log=False)]
+            if reports[0].passed and not item.config.getoption('setuponly', False):
+                reports.append(call_and_report(item, 'call', log=False))
+            failed = any(report.failed for report in reports)
+            final = not failed or attempt > reruns
+            # tearing down towards the parent finalizes the test's own function scoped fixtures,
+            # the module and session ones stay up for the next attempt
+            teardown_next = nextitem if final else item.parent
+            if item.session.shouldfail or item.session.shouldstop:
+                teardown_next = None
+            reports.append(call_and_report(item, 'teardown', log=False, nextitem=teardown_next))
+            failed = failed or reports[-1].failed
+            for report in reports:
+                if report.failed and not final:
+                    report.outcome = 'rerun'
+                item.ihook.pytest_runtest_logreport(report=report)
+            if final:
+                break
+            # the next attempt requests its fixtures anew
+            item._initrequest()
+        item.funcargs = None
+        item.ihook.pytest_runtest_logfinish(nodeid=item.nodeid, location=item.location)
+        if item.attempts > 1 and not failed:
+            self.flaky.append(item.nodeid)
+        if self.store is not None and not xfail and (failed or not any(report.skipped for report in reports)):
+            self.store.record(item.nodeid, 'failed' if failed else 'flaky' if item.attempts > 1 else 'passed')
+        return True
+
+    def pytest_report_teststatus(self, report):
+        if report.outcome == 'rerun':
+            return 'rerun', 'R', ('RERUN', {'yellow': True})
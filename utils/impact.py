@@ -0,0 +1,222 @@
+import ast
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+# changes to these files can affect every test
+RUN_ALL_FILES = ('conftest.py', 'pytest.ini', 'requirements.txt')
+RUN_ALL_DIRS = ('configs/',)
+# non-Python files below these directories (JSON schemas, test data) are read at run time, unseen by the recorder
+RUN_ALL_DATA_DIRS = ('data/',)
+
+_MONITORING_TOOL_ID = 4
+
+
+class CoverageRecorder:
+    """
+    Records which project source files a test reaches.
+
+    Executed functions are seen through function level events only: on Python 3.12+
+    `sys.monitoring` PY_START, disabled per code object after its first hit, so each function costs
+    one callback per test; on older versions a global `sys.settrace` 'call' hook without local
+    tracing. Code which only runs at import time (enums, constants) is covered by
+    `imported_files`, the project modules a test module imports directly or indirectly.
+
+    Session, package, module and class scoped fixtures are set up during the first test using
+    them; the files their setup executes are kept per fixture, so every later test using the
+    fixture gets them as well.
+    """
+
+    def __init__(self, root: Path):
+        self.root = str(Path(root).resolve()) + os.sep
+        self.files: Set[str] = set()
+        self.fixture_files: Dict[Tuple[str, str], Set[str]] = {}
+        self._fixtures: List[Set[str]] = []
+        self._relative: Dict[str, Optional[str]] = {}
+        self._imports: Dict[str, Set[str]] = {}
+        self._monitoring = hasattr(sys, 'monitoring')
+        if self._monitoring:
+            sys.monitoring.use_tool_id(_MONITORING_TOOL_ID, 'test-impact')
+            sys.monitoring.register_callback(_MONITORING_TOOL_ID, sys.monitoring.events.PY_START, self._on_start)
+
+    def start(self) -> None:
+        self.files = set()
+        if self._monitoring:
+            sys.monitoring.set_events(_MONITORING_TOOL_ID, sys.monitoring.events.PY_START)
+            sys.monitoring.restart_events()
+        else:
+            threading.settrace(self._trace)
+            sys.settrace(self._trace)
+
+    def stop(self) -> Set[str]:
+        if self._monitoring:
+            sys.monitoring.set_events(_MONITORING_TOOL_ID, 0)
+        else:
+            sys.settrace(None)
+            threading.settrace(None)
+        return self.files
+
+    def start_fixture(self) -> None:
+        """Start collecting the files a shared fixture's setup executes, see `stop_fixture`."""
+        self._fixtures.append(set())
+        if self._monitoring:
+            # functions the test already hit were disabled; the fixture has to see them again
+            sys.monitoring.restart_events()
+
+    def stop_fixture(self, baseid: str, argname: str) -> None:
+        self.fixture_files[(baseid, argname)] = self._fixtures.pop()
+
+    def files_of_fixtures(self, fixturedefs: Iterable) -> Set[str]:
+        """Files recorded for the setup of the given shared fixtures, whichever test set them up."""
+        files: Set[str] = set()
+        for fixturedef in fixturedefs:
+            files |= self.fixture_files.get((fixturedef.baseid, fixturedef.argname), set())
+        return files
+
+    def imported_files(self, filename: str) -> Set[str]:
+        """
+        Project files a module imports, directly or through other project modules.
+
+        Only modules already loaded are resolved, which after collection covers the imports of
+        every test module.
+        """
+        pending, seen = [os.path.abspath(filename)], set()
+        while pending:
+            path = pending.pop()
+            if path in seen:
+                continue
+            seen.add(path)
+            pending.extend(self._direct_imports(path))
+        seen.discard(os.path.abspath(filename))
+        return {self._project_file(path) for path in seen}
+
+    def close(self) -> None:
+        if self._monitoring:
+            sys.monitoring.register_callback(_MONITORING_TOOL_ID, sys.monitoring.events.PY_START, None)
+            sys.monitoring.free_tool_id(_MONITORING_TOOL_ID)
+
+    def _on_start(self, code, offset):
+        self._add(code.co_filename)
+        return sys.monitoring.DISABLE
+
+    def _trace(self, frame, event, arg):
+        self._add(frame.f_code.co_filename)
+        return None
+
+    def _add(self, filename: str) -> None:
+        try:
+            relative = self._relative[filename]
+        except KeyError:
+            relative = self._relative[filename] = self._project_file(filename)
+        if relative:
+            self.files.add(relative)
+            for files in self._fixtures:
+                files.add(relative)
+
+    def _direct_imports(self, path: str) -> Set[str]:
+        """Absolute paths of the project modules a file imports."""
+        if path not in self._imports:
+            names = set()
+            for node in ast.walk(ast.parse(Path(path).read_text(encoding='utf-8'))):
+                if isinstance(node, ast.Import):
+                    names.update(alias.name for alias in node.names)
+                elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+                    names.add(node.module)
+                    # `from package import module`
+                    names.update(f'{node.module}.{alias.name}' for alias in node.names)
+            modules = [sys.modules.get(name) for name in names]
+            self._imports[path] = {os.path.abspath(module.__file__) for module in modules
+                                   if getattr(module, '__file__', None) and self._project_file(module.__file__)}
+        return self._imports[path]
+
+    def _project_file(self, filename: str) -> Optional[str]:
+        path = os.path.abspath(filename)
+        if (not path.startswith(self.root) or 'site-packages' in path or not path.endswith('.py')
+                or path == os.path.abspath(__file__)):
+            return None
+        return Path(path[len(self.root):]).as_posix()
+
+
+class ImpactMap:
+    """
+    Test -> executed project files map, stored as JSON files in a local directory.
+
+    Every recording process (xdist worker) writes its own `map-<name>.json`; loading merges them
+    and keeps the most recent record of each test.
+
+    Record:
+        {"<nodeid>": {"files": ["utils/generator.py", ...], "duration": 1.2, "recorded_at": 1700000000.0}}
+    """
+
+    def __init__(self, directory: Path, tests: Optional[Dict[str, dict]] = None):
+        self.directory = Path(directory)
+        self.tests: Dict[str, dict] = tests if tests is not None else {}
+
+    @classmethod
+    def load(cls, directory: Path) -> 'ImpactMap':
+        tests: Dict[str, dict] = {}
+        for path in sorted(Path(directory).glob('map-*.json')):
+            for nodeid, record in json.loads(path.read_text()).items():
+                if nodeid not in tests or record['recorded_at'] > tests[nodeid]['recorded_at']:
+                    tests[nodeid] = record
+        return cls(directory, tests)
+
+    def record(self, nodeid: str, files: Iterable[str], duration: float) -> None:
+        self.tests[nodeid] = {'files': sorted(files), 'duration': round(duration, 3), 'recorded_at': time.time()}
+
+    def save(self, name: str) -> Path:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f'map-{name}.json'
+        temp_path = path.with_suffix('.tmp')
+        temp_path.write_text(json.dumps(self.tests, indent=1))
+        os.replace(temp_path, path)
+        return path
+
+    def affected(self, nodeid: str, changed: Set[str]) -> bool:
+        """
+        Whether a test has to run for the given changed files.
+
+        Args:
+            nodeid (str): Test nodeid, relative to the rootdir like the changed paths.
+            changed (Set[str]): Changed file paths relative to the rootdir.
+
+        Returns:
+            bool: True for unknown tests, tests in changed files and tests executing a changed file.
+        """
+        record = self.tests.get(nodeid)
+        if record is None or nodeid.split('::')[0] in changed:
+            return True
+        return not changed.isdisjoint(record['files'])
+
+
+def changed_files(root: Path, revision: str) -> Set[str]:
+    """
+    Files changed since a git revision, including uncommitted and untracked ones.
+
+    Args:
+        root (Path): Directory the returned paths are relative to.
+        revision (str): Any git revision, e.g. `origin/main` or `HEAD~3`.
+
+    Returns:
+        Set[str]: Changed paths relative to `root`, with forward slashes.
+    """
+    diff = _git(root, 'diff', '--name-only', '--relative', revision, '--')
+    untracked = _git(root, 'ls-files', '--others', '--exclude-standard')
+    return set(diff + untracked)
+
+
+def runs_everything(changed: Set[str]) -> List[str]:
+    """Changed files which affect every test, e.g. a conftest, the environment configs or a JSON schema."""
+    return sorted(path for path in changed
+                  if path.rsplit('/', 1)[-1] in RUN_ALL_FILES or path.startswith(RUN_ALL_DIRS)
+                  or (path.startswith(RUN_ALL_DATA_DIRS) and not path.endswith('.py')))
+
+
+def _git(root: Path, *args: str) -> List[str]:
+    output = subprocess.run(['git', *args], cwd=root, check=True, capture_output=True, text=True).stdout
+    return [line for line in output.splitlines() if line]
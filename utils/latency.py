@@ -0,0 +1,197 @@
+import math
+import threading
+import time
+from contextlib import AbstractContextManager, nullcontext
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, List
+
+from utils.rate_limiter import RateLimiter
+
+
+@dataclass
+class LatencyStats:
+    """
+    Data class representing latency samples of one endpoint.
+
+    Attributes:
+        count (int): Number of timed requests.
+        errors (int): Number of timed requests which raised an exception, error statuses included.
+        min_ms (float): Fastest request.
+        mean_ms (float): Average request duration.
+        p50_ms (float): Median request duration.
+        p90_ms (float): 90th percentile request duration.
+        p95_ms (float): 95th percentile request duration.
+        p99_ms (float): 99th percentile request duration.
+        max_ms (float): Slowest request.
+        throughput (float): Requests per second over the timed phase.
+    """
+
+    count: int
+    errors: int
+    min_ms: float
+    mean_ms: float
+    p50_ms: float
+    p90_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    throughput: float
+
+    @classmethod
+    def from_samples(cls, samples_ns: List[int], errors: int, elapsed_ns: int) -> 'LatencyStats':
+        """Build stats from raw durations in nanoseconds
+        :param samples_ns: request durations in nanoseconds.
+        :param errors: number of failed requests.
+        :param elapsed_ns: wall clock duration of the timed phase in nanoseconds.
+        :return: LatencyStats
+        """
+
+        ordered = sorted(samples_ns)
+        count = len(ordered)
+        throughput = count / (elapsed_ns / 1e9) if elapsed_ns else 0.0
+        return LatencyStats(
+            count=count,
+            errors=errors,
+            min_ms=_to_ms(ordered[0]) if ordered else 0.0,
+            mean_ms=_to_ms(sum(ordered) / count) if ordered else 0.0,
+            p50_ms=percentile(ordered, 50),
+            p90_ms=percentile(ordered, 90),
+            p95_ms=percentile(ordered, 95),
+            p99_ms=percentile(ordered, 99),
+            max_ms=_to_ms(ordered[-1]) if ordered else 0.0,
+            throughput=round(throughput, 2)
+        )
+
+    def as_dict(self) -> dict:
+        return asdict(self)
+
+
+def percentile(ordered_ns: List[int], pct: float) -> float:
+    """Nearest-rank percentile of sorted nanosecond samples
+    :param ordered_ns: sorted durations in nanoseconds.
+    :param pct: percentile between 0 and 100.
+    :return: percentile in milliseconds.
+    """
+
+    if not ordered_ns:
+        return 0.0
+    rank = max(math.ceil(pct / 100 * len(ordered_ns)) - 1, 0)
+    return _to_ms(ordered_ns[rank])
+
+
+def sample_latency(worker: Callable[[], AbstractContextManager], n: int = 200, warmup: int = 20,
+                   concurrency: int = 1) -> LatencyStats:
+    """
+    Call an endpoint repeatedly and collect its latency distribution.
+
+    Each of the `concurrency` threads enters its own `worker()` context, which yields the
+    callable that sends one request. This lets clients which are bound to a thread (e.g. the
+    Playwright sync API) create their own connection inside the thread that uses it.
+    With concurrency 1 everything runs in the calling thread. Time spent waiting for the
+    RateLimiter is excluded from the request durations.
+
+    Args:
+        worker (Callable): Returns a context manager yielding a zero-argument request callable.
+        n (int): Number of timed requests in total.
+        warmup (int): Number of untimed requests sent before timing starts.
+        concurrency (int): Number of parallel workers.
+
+    Returns:
+        LatencyStats: Distribution of the timed requests.
+    """
+    samples = []
+    errors = [0]
+    lock = threading.Lock()
+    remaining = [n]
+    window = {}
+    barrier = threading.Barrier(concurrency, action=lambda: window.update(start=time.perf_counter_ns()))
+    warmup_per_worker = math.ceil(warmup / concurrency)
+    failures = []
+
+    def run():
+        try:
+            with worker() as call:
+                for _ in range(warmup_per_worker):
+                    try:
+                        call()
+                    except Exception:
+                        pass
+                barrier.wait()
+                while True:
+                    with lock:
+                        if remaining[0] <= 0:
+                            break
+                        remaining[0] -= 1
+                    failed = False
+                    throttled = RateLimiter.thread_seconds()
+                    start = time.perf_counter_ns()
+                    try:
+                        call()
+                    except Exception:
+                        failed = True
+                    # time waiting for the rate limiter is not latency of the endpoint
+                    duration = time.perf_counter_ns() - start - round((RateLimiter.thread_seconds() - throttled) * 1e9)
+                    with lock:
+                        samples.append(duration)
+                        errors[0] += failed
+        except threading.BrokenBarrierError:
+            pass
+        except Exception as e:
+            failures.append(e)
+            barrier.abort()
+
+    if concurrency == 1:
+        run()
+    else:
+        threads = [threading.Thread(target=run, name=f'latency-{i}') for i in range(concurrency)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    if failures:
+        raise failures[0]
+    return LatencyStats.from_samples(samples, errors[0], time.perf_counter_ns() - window['start'])
+
+
+def shared_worker(call: Callable[[], Any]) -> Callable[[], AbstractContextManager]:
+    """Worker factory for thread safe clients which can share one callable between threads
+    :param call: zero-argument request callable.
+    :return: worker factory for sample_latency.
+    """
+
+    return lambda: nullcontext(call)
+
+
+def assert_latency(stats: LatencyStats, max_error_ratio: float = 0.0, min_throughput: float = None,
+                   **budgets_ms: float) -> None:
+    """
+    Assert that latency stats meet the given SLO budgets.
+
+    Example:
+        assert_latency(stats, p95=300, p99=800)
+
+    Args:
+        stats (LatencyStats): Stats returned by `measure`.
+        max_error_ratio (float): Highest allowed share of failed requests; by default any failure violates the SLO.
+        min_throughput (float, optional): Lowest allowed requests per second.
+        **budgets_ms: Metric name (min, mean, p50, p90, p95, p99, max) mapped to its budget in ms.
+
+    Raises:
+        AssertionError: Listing every budget which was exceeded.
+    """
+    violations = []
+    for metric, budget in budgets_ms.items():
+        name = metric if metric.endswith('_ms') else f'{metric}_ms'
+        value = getattr(stats, name)
+        if value >= budget:
+            violations.append(f'{name}={value:.2f}ms exceeds budget {budget}ms')
+    error_ratio = stats.errors / stats.count if stats.count else 0.0
+    if error_ratio > max_error_ratio:
+        violations.append(f'error ratio {error_ratio:.2%} exceeds {max_error_ratio:.2%}')
+    if min_throughput is not None and stats.throughput < min_throughput:
+        violations.append(f'throughput {stats.throughput}/s is below {min_throughput}/s')
+    assert not violations, f'Latency SLO violated: {"; ".join(violations)} ({stats.as_dict()})'
+
+
+def _to_ms(value_ns: float) -> float:
+    return round(value_ns / 1e6, 3)
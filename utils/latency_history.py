@@ -0,0 +1,230 @@
+"""
+Per-endpoint API latency history.
+
+Every traced BaseApi / BaseAPIController response is added to a log-linear (HDR style) histogram
+of its templated endpoint; at the end of the session the histograms are stored in a SQLite run
+history. `compare` flags p50/p95 regressions of a run against the runs before it.
+
+Compare from the command line:
+    python -m utils.latency_history --db .latency/history.sqlite --env qa --baseline-runs 10
+"""
+import argparse
+import json
+import sqlite3
+import statistics
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+CLIENTS = ('requests', 'playwright')
+SUB_BUCKETS = 64  # per power of two, about 1.6% relative precision
+
+
+class LatencyHistogram:
+    """
+    Log-linear histogram of durations in microseconds.
+
+    Values below 2 * SUB_BUCKETS get one bucket each; above that every power of two is split
+    into SUB_BUCKETS equal buckets. Only non-empty buckets are stored, so a histogram of a
+    typical endpoint is a few dozen integers, and histograms of several runs or workers merge
+    by adding counts.
+    """
+
+    def __init__(self, counts: Optional[Dict[int, int]] = None):
+        self.counts: Dict[int, int] = counts if counts is not None else {}
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+    def add(self, duration_ms: float) -> None:
+        index = _bucket(int(duration_ms * 1000))
+        self.counts[index] = self.counts.get(index, 0) + 1
+
+    def merge(self, other: 'LatencyHistogram') -> None:
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+
+    def percentile(self, percent: float) -> float:
+        """Value in milliseconds at the given percentile, 0.0 for an empty histogram."""
+        total = self.total
+        if not total:
+            return 0.0
+        rank = max(1, round(percent / 100 * total))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return round(_bucket_value(index) / 1000, 3)
+        return 0.0
+
+    def to_json(self) -> str:
+        return json.dumps(self.counts, separators=(',', ':'))
+
+    @classmethod
+    def from_json(cls, raw: str) -> 'LatencyHistogram':
+        return cls({int(index): count for index, count in json.loads(raw).items()})
+
+
+class LatencyRecorder:
+    """Tracer listener adding every API response duration to the histogram of its endpoint."""
+
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, kind: str, event: dict) -> None:
+        if kind != 'response' or event['client'] not in CLIENTS:
+            return
+        key = f"{event['method']} {event['endpoint']}"
+        with self._lock:
+            self.histograms.setdefault(key, LatencyHistogram()).add(event['duration_ms'])
+
+
+@dataclass
+class Regression:
+    endpoint: str
+    metric: str
+    baseline_ms: float
+    current_ms: float
+    count: int
+
+    @property
+    def change(self) -> float:
+        return self.current_ms / self.baseline_ms - 1 if self.baseline_ms else 0.0
+
+
+class LatencyHistory:
+    """
+    SQLite run history of endpoint histograms.
+
+    Each process (xdist worker) stores its own rows under the shared run id; reading merges them.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS histograms ('
+                               'run_id TEXT, recorded_at REAL, env TEXT, endpoint TEXT, counts TEXT)')
+            connection.execute('CREATE INDEX IF NOT EXISTS histograms_env ON histograms (env, recorded_at)')
+
+    def store(self, run_id: str, env: str, histograms: Dict[str, LatencyHistogram]) -> None:
+        now = time.time()
+        with self._connect() as connection:
+            connection.executemany('INSERT INTO histograms VALUES (?, ?, ?, ?, ?)',
+                                   [(run_id, now, env, endpoint, histogram.to_json())
+                                    for endpoint, histogram in histograms.items() if histogram.counts])
+
+    def runs(self, env: str) -> List[str]:
+        """Run ids of an environment, oldest first."""
+        with self._connect() as connection:
+            rows = connection.execute('SELECT run_id FROM histograms WHERE env = ? GROUP BY run_id '
+                                      'ORDER BY MIN(recorded_at)', (env,)).fetchall()
+        return [row[0] for row in rows]
+
+    def load(self, run_id: str, env: str) -> Dict[str, LatencyHistogram]:
+        histograms: Dict[str, LatencyHistogram] = {}
+        with self._connect() as connection:
+            rows = connection.execute('SELECT endpoint, counts FROM histograms WHERE run_id = ? AND env = ?',
+                                      (run_id, env)).fetchall()
+        for endpoint, counts in rows:
+            histograms.setdefault(endpoint, LatencyHistogram()).merge(LatencyHistogram.from_json(counts))
+        return histograms
+
+    def compare(self, env: str, run_id: Optional[str] = None, baseline_runs: int = 10, threshold: float = 0.2,
+                min_count: int = 20, min_baseline_runs: int = 3) -> List[Regression]:
+        """
+        Flag endpoints whose p50 or p95 of a run is significantly above the runs before it.
+
+        A value is a regression when it exceeds the baseline median by more than `threshold`
+        (relative) and by more than three scaled median absolute deviations of the baseline
+        runs, so normal run to run noise of an endpoint does not trigger it.
+
+        Args:
+            env (str): Environment to compare.
+            run_id (str, optional): Run to check, the latest run of the environment by default.
+            baseline_runs (int): Number of preceding runs forming the baseline window.
+            threshold (float): Minimal relative slowdown, 0.2 = 20%.
+            min_count (int): Endpoints with fewer requests in the run are not judged.
+            min_baseline_runs (int): Endpoints seen in fewer baseline runs are not judged.
+
+        Returns:
+            List[Regression]: Regressions found, empty if there is nothing to compare against.
+        """
+        runs = self.runs(env)
+        if run_id is None:
+            run_id = runs[-1] if runs else None
+        if run_id not in runs:
+            return []
+        baseline = [self.load(baseline_id, env) for baseline_id in runs[:runs.index(run_id)][-baseline_runs:]]
+        regressions = []
+        for endpoint, histogram in sorted(self.load(run_id, env).items()):
+            if histogram.total < min_count:
+                continue
+            for metric, percent in (('p50', 50), ('p95', 95)):
+                history = [run[endpoint].percentile(percent) for run in baseline
+                           if endpoint in run and run[endpoint].total >= min_count]
+                if len(history) < min_baseline_runs:
+                    continue
+                median = statistics.median(history)
+                spread = 1.4826 * statistics.median(abs(value - median) for value in history)
+                current = histogram.percentile(percent)
+                if current - median > max(threshold * median, 3 * spread):
+                    regressions.append(Regression(endpoint, metric, median, current, histogram.total))
+        return regressions
+
+    @contextmanager
+    def _connect(self):
+        connection = sqlite3.connect(self.path, timeout=30)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+
+def format_regressions(regressions: Iterable[Regression]) -> List[str]:
+    return [f"{regression.endpoint} {regression.metric}: {regression.baseline_ms:.1f}ms -> "
+            f"{regression.current_ms:.1f}ms (+{regression.change:.0%}, {regression.count} requests)"
+            for regression in regressions]
+
+
+def _bucket(value_us: int) -> int:
+    if value_us < 2 * SUB_BUCKETS:
+        return max(value_us, 0)
+    shift = value_us.bit_length() - SUB_BUCKETS.bit_length()
+    return shift * SUB_BUCKETS + (value_us >> shift)
+
+
+def _bucket_value(index: int) -> float:
+    """Middle of a bucket in microseconds."""
+    if index < 2 * SUB_BUCKETS:
+        return float(index)
+    shift = index // SUB_BUCKETS - 1
+    return ((index - shift * SUB_BUCKETS) << shift) + (1 << shift) / 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare the latest run with the API latency history')
+    parser.add_argument('--db', default='.latency/history.sqlite')
+    parser.add_argument('--env', default='qa')
+    parser.add_argument('--run-id', default=None)
+    parser.add_argument('--baseline-runs', type=int, default=10)
+    parser.add_argument('--threshold', type=float, default=0.2)
+    parser.add_argument('--min-count', type=int, default=20)
+    args = parser.parse_args()
+
+    regressions = LatencyHistory(args.db).compare(args.env, args.run_id, args.baseline_runs, args.threshold,
+                                                  args.min_count)
+    for line in format_regressions(regressions):
+        print(line)
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+import requests
+
+# config key -> (section, marker of the tests depending on it)
+PROBES = {
+    'token_url': ('tempo_configuration', 'API'),
+    'api_base_url': ('tempo_configuration', 'API'),
+    'api_base_query_url': ('tempo_configuration', 'API'),
+    'base_ui_url': ('tempo_configuration', 'UI'),
+    'zephyr_base_url': ('zephyr', 'ZEPHYR'),
+}
+
+# probe marker -> test markers skipped while that service is down
+DEPENDENT_MARKERS = {
+    'API': ('API',),
+    'UI': ('UI', 'E2E'),
+    'ZEPHYR': (),
+}
+
+
+@dataclass
+class ProbeResult:
+    """
+    Data class representing the outcome of one pre-flight probe.
+
+    Attributes:
+        name (str): Config key of the probed url.
+        url (str): Probed url.
+        marker (str): Marker of the tests which depend on the url (API, UI or ZEPHYR).
+        healthy (bool): Whether the service answered with a non 5xx status in time.
+        latency_ms (float): Time until the answer or the failure.
+        detail (str): Status code or error description.
+    """
+
+    name: str
+    url: str
+    marker: str
+    healthy: bool
+    latency_ms: float
+    detail: str
+
+
+def probe(name: str, url: str, marker: str, timeout: float) -> ProbeResult:
+    """
+    Send one HEAD request; any answer below 500 means the service is up.
+
+    Args:
+        name (str): Config key of the url.
+        url (str): Url to probe.
+        marker (str): Marker of the tests depending on the url.
+        timeout (float): Connect and read timeout in seconds.
+
+    Returns:
+        ProbeResult: Outcome and latency of the probe.
+    """
+    start = time.perf_counter()
+    try:
+        response = requests.head(url, timeout=timeout, allow_redirects=False)
+        healthy = response.status_code < 500
+        detail = f'HTTP {response.status_code}'
+    except requests.exceptions.RequestException as e:
+        healthy = False
+        detail = type(e).__name__
+    return ProbeResult(name=name, url=url, marker=marker, healthy=healthy,
+                       latency_ms=round((time.perf_counter() - start) * 1000, 1), detail=detail)
+
+
+def run_preflight(config: dict, timeout: float = 3.0,
+                  markers: Iterable[str] = ('API', 'UI', 'ZEPHYR')) -> List[ProbeResult]:
+    """
+    Probe every configured service concurrently.
+
+    Args:
+        config (dict): Environment config loaded by ConfigLoader.
+        timeout (float): Per probe timeout in seconds.
+        markers (Iterable[str]): Only services needed by these markers are probed.
+
+    Returns:
+        List[ProbeResult]: One result per configured url, urls missing from config are skipped.
+    """
+    targets = []
+    for name, (section, marker) in PROBES.items():
+        url = _url(config.get(section), name)
+        if url and marker in markers:
+            targets.append((name, url, marker))
+    if not targets:
+        return []
+    with ThreadPoolExecutor(max_workers=len(targets)) as executor:
+        return list(executor.map(lambda target: probe(*target, timeout), targets))
+
+
+def skipped_markers(results: List[ProbeResult]) -> List[str]:
+    """Test markers whose services failed their probe."""
+    down = {result.marker for result in results if not result.healthy}
+    return sorted({marker for probe_marker in down for marker in DEPENDENT_MARKERS[probe_marker]})
+
+
+def _url(section: Optional[dict], name: str) -> Optional[str]:
+    if not section:
+        return None
+    url = section.get(name)
+    return url if url and url.startswith('http') else None
+
@@ -0,0 +1,150 @@
+"""
+Per-test CPU and memory profiling.
+
+With `--profile` every test (setup, call and teardown) runs under cProfile and tracemalloc and gets
+    <dir>/<test>.pstats       for pstats / snakeviz
+    <dir>/<test>.collapsed    collapsed stacks for flamegraph.pl or speedscope
+and its peak traced Python memory. The session summary lists the hottest framework functions,
+i.e. project code outside the test modules, over all tests. Without the option the plugin is
+not registered and nothing is traced.
+"""
+import cProfile
+import json
+import os
+import pstats
+import re
+import tracemalloc
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pytest
+
+MAX_STACK_DEPTH = 64
+MIN_SHARE = 1e-6  # seconds
+
+
+class TestProfiler:
+    """
+    Pytest plugin profiling every test into its own files.
+
+    xdist workers inherit the run directory from the controller through PYTEST_PROFILE_DIR,
+    so the controller's summary covers the tests of all workers.
+    """
+    __test__ = False
+
+    def __init__(self, directory: Path, root: Path, top: int = 20):
+        self.directory = Path(os.environ.setdefault('PYTEST_PROFILE_DIR', str(directory)))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.root = str(Path(root).resolve()) + os.sep
+        self.top = top
+        self.peak_memory: Dict[str, int] = {}
+
+    @pytest.hookimpl(hookwrapper=True)
+    def pytest_runtest_protocol(self, item):
+        profiler = cProfile.Profile()
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        else:
+            tracemalloc.start()
+            start_memory = 0
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            self.peak_memory[item.nodeid] = tracemalloc.get_traced_memory()[1] - start_memory
+            if not tracing:
+                tracemalloc.stop()
+            self.write(item.nodeid, profiler)
+
+    def write(self, nodeid: str, profiler: cProfile.Profile) -> None:
+        name = re.sub(r'[^\w.-]+', '_', nodeid)[-150:]
+        profiler.create_stats()
+        profiler.dump_stats(self.directory / f'{name}.pstats')
+        (self.directory / f'{name}.collapsed').write_text(
+            ''.join(f'{stack} {micros}\n' for stack, micros in collapsed_stacks(profiler.stats).items()))
+
+    def pytest_sessionfinish(self, session):
+        worker = os.environ.get('PYTEST_XDIST_WORKER', 'main')
+        (self.directory / f'memory-{worker}.json').write_text(json.dumps(self.peak_memory, indent=1))
+
+    def pytest_terminal_summary(self, terminalreporter):
+        hottest, peaks = summarize(self.directory, self.root, self.top)
+        terminalreporter.write_sep('-', f'profile: {self.directory}')
+        for function, calls, own, cumulative in hottest:
+            terminalreporter.write_line(f'{cumulative:9.3f}s cum {own:9.3f}s own {calls:8d} calls  {function}')
+        for nodeid, peak in peaks:
+            terminalreporter.write_line(f'{peak / 2 ** 20:9.2f}MiB peak  {nodeid}')
+
+
+def collapsed_stacks(stats: dict) -> Dict[str, int]:
+    """
+    Collapsed stacks ("outer;inner microseconds") of own time, rebuilt from cProfile caller data.
+
+    cProfile only keeps caller -> callee totals, so the own time of a function called from several
+    places is split over its stacks in proportion to the time spent under each caller.
+    """
+    callees: Dict[tuple, List[tuple]] = {}
+    for function, (_, _, _, _, callers) in stats.items():
+        for caller in callers:
+            callees.setdefault(caller, []).append(function)
+    stacks: Dict[str, int] = {}
+
+    def walk(function, share, path):
+        _, _, own, cumulative, _ = stats[function]
+        fraction = share / cumulative if cumulative else 0.0
+        micros = int(own * fraction * 1e6)
+        if micros:
+            stacks[';'.join(path)] = stacks.get(';'.join(path), 0) + micros
+        if len(path) >= MAX_STACK_DEPTH:
+            return
+        for callee in callees.get(function, []):
+            label = _label(callee)
+            callee_share = stats[callee][4][function][3] * fraction
+            # branches below a microsecond would not show up in a flame graph
+            if callee_share >= MIN_SHARE and label not in path:
+                walk(callee, callee_share, path + [label])
+
+    for function, (_, _, _, cumulative, callers) in stats.items():
+        if not callers:
+            walk(function, cumulative, [_label(function)])
+    return stacks
+
+
+def summarize(directory: Path, root: str, top: int) -> Tuple[List[tuple], List[Tuple[str, int]]]:
+    """
+    Hottest framework functions and the tests with the highest peak memory of a profile directory.
+
+    Returns:
+        Tuple: ([(function, calls, own seconds, cumulative seconds)], [(nodeid, peak bytes)]), top entries each.
+    """
+    paths = sorted(Path(directory).glob('*.pstats'))
+    hottest = []
+    if paths:
+        stats = pstats.Stats(str(paths[0]))
+        for path in paths[1:]:
+            stats.add(str(path))
+        for function, (_, calls, own, cumulative, _) in stats.stats.items():
+            filename = os.path.abspath(function[0])
+            # hook implementations (reruns, tracing, ...) wrap whole tests and say nothing about them
+            if (not function[0].startswith(('~', '<')) and filename.startswith(root)
+                    and 'site-packages' not in filename and not os.path.basename(filename).startswith('test_')
+                    and not function[2].startswith('pytest_')):
+                hottest.append((_label(function, root), calls, own, cumulative))
+        hottest.sort(key=lambda entry: -entry[3])
+    peaks: Dict[str, int] = {}
+    for path in Path(directory).glob('memory-*.json'):
+        peaks.update(json.loads(path.read_text()))
+    return hottest[:top], sorted(peaks.items(), key=lambda entry: -entry[1])[:top]
+
+
+def _label(function: tuple, root: str = '') -> str:
+    """`name (file:line)`, the file relative to the root when given, otherwise its base name."""
+    filename, line, name = function
+    if filename == '~':
+        return name  # builtins, e.g. <built-in method time.sleep>
+    filename = os.path.abspath(filename)
+    filename = filename[len(root):] if root and filename.startswith(root) else os.path.basename(filename)
+    return f'{name} ({filename}:{line})'
@@ -0,0 +1,142 @@
+import re
+import struct
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import urlsplit
+
+from utils.endpoints import template_endpoint
+from utils.file_lock import locked_file
+
+_STATE = struct.Struct('dd')  # tokens, last refill timestamp
+
+
+@dataclass
+class BucketStats:
+    requests: int = 0
+    throttled: int = 0
+    throttled_seconds: float = 0.0
+
+
+class TokenBucket:
+    """
+    Token bucket whose state lives in a small file, so every process on the machine
+    (e.g. all xdist workers) draws from the same budget. The file is locked with
+    flock/msvcrt while the state is read and updated.
+    """
+
+    def __init__(self, path: Path, rate: float, burst: float):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self.stats = BucketStats()
+        self._thread_lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+    def acquire(self) -> float:
+        """
+        Take one token, sleeping until one is available.
+
+        Returns:
+            float: Seconds spent waiting.
+        """
+        waited = 0.0
+        with self._thread_lock:
+            while True:
+                wait = self._take()
+                if wait <= 0:
+                    break
+                time.sleep(wait)
+                waited += wait
+        self.stats.requests += 1
+        if waited:
+            self.stats.throttled += 1
+            self.stats.throttled_seconds += waited
+        return waited
+
+    def _take(self) -> float:
+        with locked_file(self.path) as file:
+            raw = file.read(_STATE.size)
+            now = time.time()
+            tokens, last = _STATE.unpack(raw) if len(raw) == _STATE.size else (self.burst, now)
+            tokens = min(self.burst, tokens + (now - last) * self.rate)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / self.rate
+            if wait == 0.0:
+                tokens -= 1
+            file.seek(0)
+            file.write(_STATE.pack(tokens, now))
+            file.flush()
+        return wait
+
+
+class RateLimiter:
+    """
+    Process wide rate limiter used by BaseApi, BaseAPIController and ZephyrHelper before every
+    request which actually goes to the network. Budgets apply per host, per host and templated
+    endpoint, or both; a request draws one token from every matching bucket.
+
+    Time spent in `acquire` is added up per thread, so Tracer and sample_latency can leave it out
+    of the request durations they measure around the send call.
+
+    Config (env YAML):
+        rate_limits:
+          directory:                  # optional, shared state dir, defaults to the system temp dir
+          budgets:
+            some-base-url.com:
+              rate: 20                # tokens per second
+              burst: 40               # bucket capacity
+            some-base-url.com/api/v1/groups/{uuid}/emails:
+              rate: 5
+              burst: 5
+    """
+
+    _budgets: Dict[str, TokenBucket] = {}
+    _local = threading.local()
+
+    @classmethod
+    def configure(cls, rate_config: Optional[dict]) -> None:
+        cls._budgets = {}
+        if not rate_config or not rate_config.get('budgets'):
+            return
+        directory = Path(rate_config.get('directory') or Path(tempfile.gettempdir()) / 'automation_rate_limits')
+        for key, budget in rate_config['budgets'].items():
+            file_name = re.sub(r'[^A-Za-z0-9_.-]', '_', key)
+            cls._budgets[key] = TokenBucket(directory / file_name, float(budget['rate']),
+                                            float(budget.get('burst', budget['rate'])))
+
+    @classmethod
+    def acquire(cls, url: str) -> float:
+        """
+        Wait for a token of every budget matching the url.
+
+        Args:
+            url (str): Full request url.
+
+        Returns:
+            float: Seconds spent throttled.
+        """
+        if not cls._budgets:
+            return 0.0
+        start = time.perf_counter()
+        waited = sum(bucket.acquire() for bucket in cls._matching(url))
+        cls._local.seconds = cls.thread_seconds() + time.perf_counter() - start
+        return waited
+
+    @classmethod
+    def thread_seconds(cls) -> float:
+        """Seconds the current thread spent in `acquire` so far, waiting for tokens and file locks."""
+        return getattr(cls._local, 'seconds', 0.0)
+
+    @classmethod
+    def summary(cls) -> Dict[str, BucketStats]:
+        return {key: bucket.stats for key, bucket in cls._budgets.items() if bucket.stats.requests}
+
+    @classmethod
+    def _matching(cls, url: str) -> List[TokenBucket]:
+        parts = urlsplit(url)
+        path = re.sub('/+', '/', template_endpoint(parts.path))
+        keys = (parts.netloc, f'{parts.netloc}{path}')
+        return [cls._budgets[key] for key in keys if key in cls._budgets]
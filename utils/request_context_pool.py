@@ -0,0 +1,86 @@
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from playwright.sync_api import APIRequestContext, Playwright
+
+
+@dataclass
+class PoolStats:
+    borrows: int = 0
+    created: int = 0
+    discarded: int = 0  # given back with cookies or storage
+    borrow_ns_total: int = 0
+    borrow_ns_max: int = 0
+
+    @property
+    def mean_borrow_ms(self) -> float:
+        return self.borrow_ns_total / self.borrows / 1e6 if self.borrows else 0.0
+
+    @property
+    def max_borrow_ms(self) -> float:
+        return self.borrow_ns_max / 1e6
+
+
+class RequestContextPool:
+    """
+    Pool of Playwright APIRequestContexts sharing one Playwright runtime.
+
+    Contexts are keyed by base_url, extra headers and timeout. A controller borrows a context in
+    setup and gives it back in teardown, so the driver process and the contexts are created once
+    per session (per xdist worker) instead of once per test. APIRequestContext cannot clear its
+    cookies, so a context given back with cookies or storage is disposed instead of reused:
+    tests never see state left by another test.
+
+    The sync Playwright API is bound to the thread which started it, so a pool must only be
+    used from that thread.
+    """
+
+    def __init__(self, playwright: Playwright):
+        self.playwright = playwright
+        self.stats = PoolStats()
+        self._idle: Dict[Tuple, List[APIRequestContext]] = {}
+        self._all: List[APIRequestContext] = []
+
+    def borrow(self, base_url: str, timeout: float, extra_http_headers: Optional[Dict[str, str]] = None):
+        """
+        Take an idle context for the given settings, creating one if none is idle.
+
+        Args:
+            base_url (str): Base url of the context.
+            timeout (float): Default request timeout in milliseconds.
+            extra_http_headers (dict, optional): Headers sent with every request.
+
+        Returns:
+            tuple: (pool key, APIRequestContext). Pass both back to `give_back`.
+        """
+        start = time.perf_counter_ns()
+        key = (base_url, timeout, tuple(sorted((extra_http_headers or {}).items())))
+        idle = self._idle.setdefault(key, [])
+        if idle:
+            context = idle.pop()
+        else:
+            context = self.playwright.request.new_context(base_url=base_url, timeout=timeout,
+                                                          extra_http_headers=extra_http_headers)
+            self._all.append(context)
+            self.stats.created += 1
+        duration = time.perf_counter_ns() - start
+        self.stats.borrows += 1
+        self.stats.borrow_ns_total += duration
+        self.stats.borrow_ns_max = max(self.stats.borrow_ns_max, duration)
+        return key, context
+
+    def give_back(self, key: Tuple, context: APIRequestContext) -> None:
+        state = context.storage_state()
+        if state['cookies'] or state['origins']:
+            self._all.remove(context)
+            context.dispose()
+            self.stats.discarded += 1
+            return
+        self._idle.setdefault(key, []).append(context)
+
+    def close(self) -> None:
+        for context in self._all:
+            context.dispose()
+        self._all.clear()
+        self._idle.clear()
@@ -0,0 +1,213 @@
+import random
+import threading
+import time
+from dataclasses import dataclass
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple
+from urllib.parse import urlsplit
+
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError
+
+IDEMPOTENT_METHODS = frozenset({'GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE'})
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised without sending the request while the circuit breaker of a host is open."""
+
+
+@dataclass
+class HostMetrics:
+    attempts: int = 0
+    retries: int = 0
+    breaker_opens: int = 0
+    short_circuited: int = 0
+    backoff_seconds: float = 0.0
+
+
+class CircuitBreaker:
+    """
+    Per host circuit breaker.
+
+    closed      requests pass, consecutive failures are counted
+    open        after `failure_threshold` consecutive failures requests fail fast for `reset_timeout` seconds
+    half open   after the timeout one trial request passes; success closes, failure opens again,
+                any other outcome (an unexpected exception) lets the next request try again
+    """
+
+    def __init__(self, failure_threshold: int, reset_timeout: float, metrics: HostMetrics):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.metrics = metrics
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    def before_call(self, host: str) -> bool:
+        """Let a request pass, returning whether it is the half open trial; raise while open."""
+        with self._lock:
+            if self._opened_at is None:
+                return False
+            if time.monotonic() - self._opened_at >= self.reset_timeout and not self._trial_running:
+                self._trial_running = True
+                return True
+            self.metrics.short_circuited += 1
+        raise CircuitOpenError(f'Circuit breaker for {host} is open after {self._failures} consecutive failures')
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial_running = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._trial_running or (self._opened_at is None and self._failures >= self.failure_threshold):
+                self._opened_at = time.monotonic()
+                self.metrics.breaker_opens += 1
+            self._trial_running = False
+
+    def release_trial(self) -> None:
+        """End a trial request which neither succeeded nor failed, keeping the breaker state."""
+        with self._lock:
+            self._trial_running = False
+
+
+class ResiliencePolicy:
+    """
+    Retry with jittered exponential backoff plus a per host circuit breaker.
+
+    Idempotent methods are retried on connection errors and on `retry_statuses`. Non idempotent
+    methods (POST, PATCH) are only retried when the server refused to process them (429) or the
+    connection could not be established (refused, unresolved or timed out connect).
+    `Retry-After` is honoured up to `backoff_max`. Retryable 5xx responses and connection errors
+    count as breaker failures; a 429 shows the host is up and counts as a success.
+    Metrics are shared by every client of the process, keyed by host; breakers are keyed by host
+    and breaker settings, so policies with different thresholds do not share a breaker.
+
+    Config (env YAML, top level for Tempo apis and under `zephyr` for Zephyr):
+        resilience:
+          enabled: true
+          max_attempts: 3
+          backoff_base: 0.5
+          backoff_max: 10
+          retry_statuses: [429, 502, 503, 504]
+          failure_threshold: 5
+          reset_timeout: 30
+    """
+
+    _breakers: Dict[Tuple[str, int, float], CircuitBreaker] = {}
+    metrics: Dict[str, HostMetrics] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, max_attempts: int = 3, backoff_base: float = 0.5, backoff_max: float = 10.0,
+                 retry_statuses=(429, 502, 503, 504), failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.retry_statuses = frozenset(retry_statuses)
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.sleep = sleep
+
+    @classmethod
+    def from_config(cls, resilience_config: Optional[dict]) -> Optional['ResiliencePolicy']:
+        """Build a policy from a `resilience` config section, None if missing or disabled."""
+        if not resilience_config or not resilience_config.get('enabled'):
+            return None
+        options = {key: value for key, value in resilience_config.items() if key != 'enabled'}
+        return ResiliencePolicy(**options)
+
+    def call(self, method: str, url: str, send: Callable[[], requests.Response]) -> requests.Response:
+        """
+        Send a request with retries, failing fast while the host's breaker is open.
+
+        Args:
+            method (str): http method, decides whether the request may be repeated.
+            url (str): full request url, its host selects the breaker.
+            send (Callable): Sends the request once and returns the response.
+
+        Returns:
+            requests.Response: The last response. Status checks stay with the caller.
+
+        Raises:
+            CircuitOpenError: If the breaker of the host is open.
+            requests.exceptions.RequestException: If the last attempt raised.
+        """
+        host = urlsplit(url).netloc
+        metrics, breaker = self._host(host)
+        idempotent = method.upper() in IDEMPOTENT_METHODS
+        for attempt in range(1, self.max_attempts + 1):
+            trial = breaker.before_call(host)
+            metrics.attempts += 1
+            last_attempt = attempt == self.max_attempts
+            try:
+                response = send()
+            except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as e:
+                breaker.record_failure()
+                if last_attempt or not (idempotent or _never_sent(e)):
+                    raise
+                self._wait(metrics, self._backoff(attempt))
+                continue
+            except BaseException:
+                if trial:
+                    breaker.release_trial()
+                raise
+            if response.status_code not in self.retry_statuses:
+                breaker.record_success()
+                return response
+            # a retryable 5xx means the host is unhealthy, a 429 that it is up: every trial settles
+            if response.status_code >= 500:
+                breaker.record_failure()
+            else:
+                breaker.record_success()
+            if last_attempt or not (idempotent or response.status_code == 429):
+                return response
+            self._wait(metrics, self._retry_after(response) or self._backoff(attempt))
+        return response
+
+    @classmethod
+    def summary(cls) -> Dict[str, HostMetrics]:
+        return dict(cls.metrics)
+
+    def _host(self, host: str):
+        key = (host, self.failure_threshold, self.reset_timeout)
+        with ResiliencePolicy._lock:
+            metrics = ResiliencePolicy.metrics.setdefault(host, HostMetrics())
+            if key not in ResiliencePolicy._breakers:
+                ResiliencePolicy._breakers[key] = CircuitBreaker(self.failure_threshold, self.reset_timeout, metrics)
+            return metrics, ResiliencePolicy._breakers[key]
+
+    def _wait(self, metrics: HostMetrics, seconds: float) -> None:
+        metrics.retries += 1
+        metrics.backoff_seconds += seconds
+        self.sleep(seconds)
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1)))
+
+    def _retry_after(self, response: requests.Response) -> Optional[float]:
+        value = response.headers.get('Retry-After')
+        if not value:
+            return None
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                seconds = parsedate_to_datetime(value).timestamp() - time.time()
+            except (TypeError, ValueError):
+                return None
+        return min(max(seconds, 0.0), self.backoff_max)
+
+
+def _never_sent(error: requests.exceptions.RequestException) -> bool:
+    """Whether the connection failed before any byte of the request was sent."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    reason = error.args[0] if error.args else None
+    if isinstance(reason, MaxRetryError):
+        reason = reason.reason
+    return isinstance(reason, NewConnectionError)  # refused or unresolved, name resolution errors included
@@ -0,0 +1,272 @@
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from utils.file_lock import lock_file, unlock_file
+from utils.tracing import Tracer
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class TrackedResource:
+    """
+    Data class representing one resource created by a test run.
+
+    Attributes:
+        kind (str): Resource type, selects the registered deleter (e.g. `group`, `group_name`).
+        key (str): Identifier passed to the deleter.
+        namespace (str): Environment the resource lives in, orphans of other environments are left alone.
+        owner (str, optional): Nodeid of the owning test, None for session owned resources.
+    """
+
+    kind: str
+    key: str
+    namespace: str
+    owner: Optional[str] = None
+
+    @property
+    def module(self) -> Optional[str]:
+        return self.owner.split('::')[0] if self.owner else None
+
+
+@dataclass
+class CleanupStats:
+    tracked: int = 0
+    deleted: int = 0
+    failed: int = 0
+    orphans_deleted: int = 0
+    seconds: float = 0.0
+
+
+class Ledger:
+    """
+    Append only JSON lines file of created and deleted resources, one file per process.
+
+    Every line is flushed and fsynced, so a crashed run leaves an accurate list of what it did not
+    delete. The file stays locked while its process lives, which lets a later run tell the ledgers
+    of crashed runs from the ones of runs still in progress (e.g. other xdist workers).
+    """
+
+    def __init__(self, directory: Path):
+        directory.mkdir(parents=True, exist_ok=True)
+        self.path = directory / f'ledger-{os.getpid()}-{time.time_ns()}.jsonl'
+        self._file = open(self.path, 'a', encoding='utf-8')
+        lock_file(self._file)
+        self._write_lock = threading.Lock()
+
+    def append(self, op: str, resource: TrackedResource) -> None:
+        line = json.dumps({'op': op, **asdict(resource)})
+        with self._write_lock:
+            self._file.write(line + '\n')
+            self._file.flush()
+            os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        pending = self.pending(self.path)
+        unlock_file(self._file)
+        self._file.close()
+        if not pending:
+            self.path.unlink()
+
+    @staticmethod
+    def pending(path: Path) -> List[TrackedResource]:
+        """Resources created but not deleted according to a ledger file, oldest first."""
+        resources: Dict[TrackedResource, None] = {}
+        for line in path.read_text(encoding='utf-8').splitlines():
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # line cut short by a crash
+            op = entry.pop('op')
+            resource = TrackedResource(**entry)
+            if op == 'created':
+                resources[resource] = None
+            else:
+                resources.pop(resource, None)
+        return list(resources)
+
+    @staticmethod
+    @contextmanager
+    def claim(path: Path):
+        """
+        Lock the ledger of a finished run and yield its pending resources, or None while the run
+        which wrote it is still alive. Whatever is still pending after the block is written back.
+        """
+        with open(path, 'r+', encoding='utf-8') as file:
+            if not lock_file(file, blocking=False):
+                yield None
+                return
+            try:
+                pending = Ledger.pending(path)
+                yield pending
+                if pending:
+                    file.seek(0)
+                    file.truncate()
+                    file.writelines(json.dumps({'op': 'created', **asdict(resource)}) + '\n'
+                                    for resource in pending)
+                    file.flush()
+                    os.fsync(file.fileno())
+            finally:
+                unlock_file(file)
+        if not pending:
+            path.unlink()
+
+
+class ResourceTracker:
+    """
+    Registry of resources created by tests through API clients and page objects, deleted in
+    parallel batches after every test, module or the whole session.
+
+    Clients call `ResourceTracker.track(kind, key)` after creating something; the active tracker
+    records it with the running test as owner. Deleters are registered per kind by conftest.
+    Failed deletions stay in the ledger and are retried as orphans by a later run.
+
+    Config (env YAML):
+        cleanup:
+          enabled: true
+          deletes_supported: true   # the target implements the DELETE endpoints, off by default
+          scope: module             # test, module or session
+          workers: 8                # parallel deletions
+          batch_size: 50
+          ledger_dir:               # optional, defaults to resource_ledger/ in the project
+          orphans_on_start: true
+    """
+
+    SCOPES = ('test', 'module', 'session')
+    active: Optional['ResourceTracker'] = None
+    _session_owned = threading.local()
+
+    def __init__(self, ledger_dir: Path, namespace: str = '', scope: str = 'session', workers: int = 8,
+                 batch_size: int = 50):
+        if scope not in self.SCOPES:
+            raise ValueError(f'Unknown cleanup scope {scope}, expected one of {self.SCOPES}')
+        self.ledger_dir = Path(ledger_dir)
+        self.namespace = namespace
+        self.scope = scope
+        self.workers = workers
+        self.batch_size = batch_size
+        self.stats = CleanupStats()
+        self._deleters: Dict[str, Callable[[str], None]] = {}
+        self._resources: List[TrackedResource] = []
+        self._lock = threading.Lock()
+        self._ledger = Ledger(self.ledger_dir)
+
+    @classmethod
+    def from_config(cls, cleanup_config: Optional[dict], default_ledger_dir: Path,
+                    namespace: str = '') -> Optional['ResourceTracker']:
+        """Build a tracker from a `cleanup` config section, None if missing, disabled or the target cannot delete."""
+        if not cleanup_config or not cleanup_config.get('enabled'):
+            return None
+        if not cleanup_config.get('deletes_supported'):
+            logger.warning('Resource cleanup is enabled but the target does not support deletes, skipping it')
+            return None
+        return cls(cleanup_config.get('ledger_dir') or default_ledger_dir, namespace,
+                   cleanup_config.get('scope', 'session'), cleanup_config.get('workers', 8),
+                   cleanup_config.get('batch_size', 50))
+
+    def activate(self) -> Optional['ResourceTracker']:
+        """Make this tracker receive `track` calls, returning the previously active one."""
+        previous, ResourceTracker.active = ResourceTracker.active, self
+        return previous
+
+    def register_deleter(self, kind: str, deleter: Callable[[str], None]) -> None:
+        self._deleters[kind] = deleter
+
+    @classmethod
+    def track(cls, kind: str, key: str) -> None:
+        """
+        Record a created resource with the running test as owner. No-op without an active tracker.
+
+        Args:
+            kind (str): Resource type with a registered deleter.
+            key (str): Identifier passed to the deleter.
+        """
+        tracker = cls.active
+        if tracker is None:
+            return
+        owner = None if getattr(cls._session_owned, 'value', False) else Tracer.current_test
+        resource = TrackedResource(kind, str(key), tracker.namespace, owner)
+        tracker._ledger.append('created', resource)
+        with tracker._lock:
+            tracker._resources.append(resource)
+            tracker.stats.tracked += 1
+
+    @classmethod
+    @contextmanager
+    def session_owned(cls):
+        """Resources tracked by this thread inside the block live until the end of the session."""
+        cls._session_owned.value = True
+        try:
+            yield
+        finally:
+            cls._session_owned.value = False
+
+    def cleanup(self, owner: Optional[str] = None, module: Optional[str] = None) -> None:
+        """
+        Delete tracked resources, newest first, in parallel batches.
+
+        Args:
+            owner (str, optional): Only resources of this test.
+            module (str, optional): Only resources of tests in this module.
+        """
+        with self._lock:
+            selected = [resource for resource in self._resources
+                        if (owner is None or resource.owner == owner)
+                        and (module is None or resource.module == module)]
+            self._resources = [resource for resource in self._resources if resource not in selected]
+        deleted = self._delete(list(reversed(selected)))
+        for resource in deleted:
+            self._ledger.append('deleted', resource)
+        self.stats.deleted += len(deleted)
+        self.stats.failed += len(selected) - len(deleted)
+
+    def cleanup_orphans(self) -> None:
+        """Delete what crashed or failed runs left behind in the ledger directory."""
+        for path in sorted(self.ledger_dir.glob('ledger-*.jsonl')):
+            if path == self._ledger.path:
+                continue
+            with Ledger.claim(path) as pending:
+                if not pending:
+                    continue
+                orphans = [resource for resource in pending if resource.namespace == self.namespace]
+                deleted = set(self._delete(orphans))
+                self.stats.orphans_deleted += len(deleted)
+                pending[:] = [resource for resource in pending if resource not in deleted]
+
+    def close(self) -> None:
+        if ResourceTracker.active is self:
+            ResourceTracker.active = None
+        self._ledger.close()
+
+    def _delete(self, resources: List[TrackedResource]) -> List[TrackedResource]:
+        if not resources:
+            return []
+        start = time.perf_counter()
+        deleted = []
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for index in range(0, len(resources), self.batch_size):
+                batch = resources[index:index + self.batch_size]
+                deleted.extend(resource for resource, ok in zip(batch, executor.map(self._delete_one, batch)) if ok)
+        self.stats.seconds += time.perf_counter() - start
+        return deleted
+
+    def _delete_one(self, resource: TrackedResource) -> bool:
+        deleter = self._deleters.get(resource.kind)
+        if deleter is None:
+            logger.error('No deleter registered for %s %s', resource.kind, resource.key)
+            return False
+        try:
+            deleter(resource.key)
+            return True
+        except Exception as e:
+            logger.error('Failed to delete %s %s: %r', resource.kind, resource.key, e)
+            return False
+
@@ -0,0 +1,135 @@
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from utils.cassette import normalize_query
+from utils.endpoints import template_endpoint
+
+
+@dataclass
+class CacheEntry:
+    url: str
+    body: bytes
+    etag: Optional[str]
+    expires_at: float
+
+    @property
+    def fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    revalidated: int = 0
+    evictions: int = 0
+    invalidations: int = 0
+
+
+class ResponseCache:
+    """
+    Opt-in LRU cache for GET responses of reference data endpoints, shared by every BaseApi instance.
+
+    Entries are keyed by url and normalized query params and live for the TTL configured for
+    their templated endpoint. Stale entries with an ETag are revalidated with If-None-Match.
+    The least recently used entries are evicted when the cached bodies exceed `max_bytes`.
+
+    Config (env YAML):
+        response_cache:
+          enabled: true
+          max_bytes: 5000000
+          default_ttl: 0
+          ttl:
+            groups/verificationfields: 300
+    """
+
+    _instance: Optional['ResponseCache'] = None
+
+    def __init__(self, ttl: Optional[Dict[str, float]] = None, default_ttl: float = 0, max_bytes: int = 5_000_000):
+        self.ttl = ttl or {}
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.stats = CacheStats()
+        self._entries: 'OrderedDict[str, CacheEntry]' = OrderedDict()
+        self._keys_by_url: Dict[str, set] = {}
+        self._size = 0
+        self._lock = threading.Lock()
+
+    @classmethod
+    def shared(cls, cache_config: Optional[dict]) -> Optional['ResponseCache']:
+        """Process wide cache built from the `response_cache` config section, None if disabled."""
+        if not cache_config or not cache_config.get('enabled'):
+            return None
+        if cls._instance is None:
+            cls._instance = ResponseCache(ttl=cache_config.get('ttl'),
+                                          default_ttl=cache_config.get('default_ttl', 0),
+                                          max_bytes=cache_config.get('max_bytes', 5_000_000))
+        return cls._instance
+
+    @classmethod
+    def reset(cls) -> None:
+        cls._instance = None
+
+    @classmethod
+    def instance(cls) -> Optional['ResponseCache']:
+        return cls._instance
+
+    def ttl_for(self, endpoint: str) -> float:
+        return self.ttl.get(template_endpoint(endpoint), self.default_ttl)
+
+    def lookup(self, url: str, params=None) -> Optional[CacheEntry]:
+        """Return the entry for the request (fresh or stale) and mark it recently used."""
+        key = self._key(url, params)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            if entry is not None and entry.fresh:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+        return entry
+
+    def store(self, url: str, params, body: bytes, etag: Optional[str], ttl: float) -> None:
+        if ttl <= 0 and not etag:
+            return
+        key = self._key(url, params)
+        entry = CacheEntry(url=url, body=body, etag=etag, expires_at=time.monotonic() + ttl)
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = entry
+            self._keys_by_url.setdefault(url, set()).add(key)
+            self._size += len(body)
+            while self._size > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self.stats.evictions += 1
+
+    def revalidated(self, entry: CacheEntry, ttl: float) -> None:
+        """Extend a stale entry after the server answered 304 Not Modified."""
+        entry.expires_at = time.monotonic() + ttl
+        self.stats.revalidated += 1
+
+    def invalidate(self, url: str) -> None:
+        """Drop every cached query of the given url."""
+        with self._lock:
+            for key in list(self._keys_by_url.get(url, ())):
+                self._remove(key)
+                self.stats.invalidations += 1
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._size -= len(entry.body)
+        keys = self._keys_by_url.get(entry.url)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_url[entry.url]
+
+    @staticmethod
+    def _key(url: str, params) -> str:
+        return f'{url}?{normalize_query(url, params)}'
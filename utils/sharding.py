@@ -0,0 +1,219 @@
+"""
+Deterministic test sharding across CI nodes.
+
+Every node collects the same tests and runs only its partition: `--shard-index i --shard-count n`.
+Partitions are balanced on the recorded test durations, so all nodes have to read the same
+durations file (restore it from the CI cache before the run) and none of them may change it.
+Tests sharing a Zephyr TEST_ID always land in the same shard.
+
+Each shard writes `shard-<i>-of-<n>.json` with its results, copying failure screenshots next to it.
+Collect the shard directories into one and merge them into one report and one Zephyr publication,
+recording the durations for the next run; result files of another shard count are ignored:
+    python -m utils.sharding --results-dir shard_results --durations .durations.json --env qa \
+        --push-to-zephyr --cycle-name "Nightly"
+"""
+import argparse
+import heapq
+import json
+import os
+import shutil
+import statistics
+import sys
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional
+
+from utils.file_lock import locked_file
+
+
+@dataclass
+class ExecutionResult:
+    nodeid: str
+    test_case_key: Optional[str] = None
+    outcome: Optional[str] = None  # of the call phase, None when the test did not get that far
+    comment: Optional[str] = None
+    screenshot: Optional[str] = None
+    attempts: int = 1
+    duration: float = 0.0
+
+
+class ResultCollector:
+    """
+    Pytest plugin building an ExecutionResult of every test from its reports.
+
+    Works from reports rather than items, so the xdist controller sees the tests of all workers.
+    The test case key, screenshot and attempts travel in the reports' user_properties.
+    """
+
+    def __init__(self, describe_failure: Callable[[object], str]):
+        self.describe_failure = describe_failure
+        self.results: Dict[str, ExecutionResult] = {}
+
+    def pytest_runtest_logreport(self, report):
+        result = self.results.get(report.nodeid)
+        if result is None:
+            result = self.results[report.nodeid] = ExecutionResult(report.nodeid)
+        properties = dict(report.user_properties)
+        result.test_case_key = properties.get('test_case_key', result.test_case_key)
+        result.attempts = properties.get('attempts', result.attempts)
+        result.duration += report.duration
+        if report.when == 'setup':
+            # a new attempt starts
+            result.outcome, result.comment, result.screenshot = None, None, None
+        if report.when == 'call':
+            result.outcome = report.outcome
+            result.comment = self.describe_failure(report.longrepr) if report.failed else None
+            result.screenshot = properties.get('screenshot')
+
+
+class DurationStore:
+    """
+    Last recorded duration of every test, in seconds, kept in a local JSON file.
+
+    Runs merge their durations into the file under a lock, so parallel runs of one machine and
+    the merge of several shards do not overwrite each other.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.durations: Dict[str, float] = {}
+        if self.path.exists():
+            with locked_file(self.path) as file:
+                self.durations = self._read(file)
+
+    def save(self, durations: Dict[str, float]) -> None:
+        if not durations:
+            return
+        with locked_file(self.path) as file:
+            self.durations = self._read(file)
+            self.durations.update({nodeid: round(duration, 3) for nodeid, duration in durations.items()})
+            file.seek(0)
+            file.truncate()
+            file.write(json.dumps(self.durations, indent=1, sort_keys=True).encode())
+
+    @staticmethod
+    def _read(file) -> Dict[str, float]:
+        raw = file.read()
+        return json.loads(raw) if raw else {}
+
+
+def assign_shards(units: Dict[str, List[str]], durations: Dict[str, float], count: int) -> Dict[str, int]:
+    """
+    Partition tests into shards of about equal total duration.
+
+    Longest processing time first: the longest unit goes to the currently lightest shard. Tests
+    without a recorded duration count as the mean recorded duration, and ties are broken by unit
+    name and shard index, so every node computes the same partition from the same input.
+
+    Args:
+        units (Dict[str, List[str]]): Nodeids per unit which has to stay in one shard.
+        durations (Dict[str, float]): Recorded test durations in seconds.
+        count (int): Number of shards.
+
+    Returns:
+        Dict[str, int]: Shard index of every nodeid.
+    """
+    known = [durations[nodeid] for nodeids in units.values() for nodeid in nodeids if nodeid in durations]
+    default = statistics.mean(known) if known else 1.0
+    weights = {unit: sum(durations.get(nodeid, default) for nodeid in nodeids) for unit, nodeids in units.items()}
+    loads = [(0.0, index) for index in range(count)]
+    shards = {}
+    for unit in sorted(units, key=lambda unit: (-weights[unit], unit)):
+        load, index = heapq.heappop(loads)
+        shards.update({nodeid: index for nodeid in units[unit]})
+        heapq.heappush(loads, (load + weights[unit], index))
+    return shards
+
+
+def write_shard_results(directory: Path, index: int, count: int, results: Iterable[ExecutionResult]) -> Path:
+    """Write the results of one shard, with copies of its screenshots, into the results directory."""
+    directory = Path(directory)
+    screenshots = directory / 'screenshots'
+    records = []
+    for result in results:
+        record = asdict(result)
+        if result.screenshot and Path(result.screenshot).exists():
+            screenshots.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(result.screenshot, screenshots / Path(result.screenshot).name)
+            record['screenshot'] = f'screenshots/{Path(result.screenshot).name}'
+        records.append(record)
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f'shard-{index}-of-{count}.json'
+    temp_path = path.with_suffix('.tmp')
+    temp_path.write_text(json.dumps({'shard': index, 'count': count, 'results': records}, indent=1))
+    os.replace(temp_path, path)
+    return path
+
+
+def merge_shard_results(directory: Path, count: Optional[int] = None) -> dict:
+    """
+    Merge the shard result files of one shard count found anywhere below a directory into one report.
+
+    Files written for another shard count are leftovers of earlier runs and are ignored; without
+    `count` the shard count of the most recently written file is merged. Screenshot paths are
+    resolved against the file which listed them.
+
+    Returns:
+        dict: {"shards": n, "missing_shards": [...], "ignored": [paths], "summary": {outcome: count},
+               "results": [...]}
+    """
+    files = [(path, json.loads(path.read_text())) for path in sorted(Path(directory).rglob('shard-*-of-*.json'))]
+    if count is None:
+        count = max(files, key=lambda entry: entry[0].stat().st_mtime)[1]['count'] if files else 0
+    results, shards, ignored = [], set(), []
+    for path, data in files:
+        if data['count'] != count:
+            ignored.append(str(path))
+            continue
+        shards.add(data['shard'])
+        for record in data['results']:
+            if record['screenshot'] and not Path(record['screenshot']).is_absolute():
+                record['screenshot'] = str(path.parent / record['screenshot'])
+            results.append(record)
+    summary: Dict[str, int] = {}
+    for record in results:
+        summary[record['outcome'] or 'not run'] = summary.get(record['outcome'] or 'not run', 0) + 1
+    return {'shards': count, 'missing_shards': sorted(set(range(count)) - shards), 'ignored': ignored,
+            'summary': summary, 'results': sorted(results, key=lambda record: record['nodeid'])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Merge shard results into one report and Zephyr publication')
+    parser.add_argument('--results-dir', default='shard_results')
+    parser.add_argument('--report', default=None, help='Merged report path, <results-dir>/merged.json by default')
+    parser.add_argument('--shard-count', type=int, default=None,
+                        help='Merge the results of this many shards, the count of the newest result file by default')
+    parser.add_argument('--durations', default=None, help='Update this durations file with the merged durations')
+    parser.add_argument('--env', default='qa')
+    parser.add_argument('--push-to-zephyr', action='store_true')
+    parser.add_argument('--cycle-name', default=None)
+    parser.add_argument('--reuse-cycle', action='store_true')
+    args = parser.parse_args()
+
+    report = merge_shard_results(Path(args.results_dir), args.shard_count)
+    report_path = Path(args.report or Path(args.results_dir) / 'merged.json')
+    report_path.write_text(json.dumps(report, indent=1))
+    print(f"Merged {report['shards']} shards, {len(report['results'])} tests: "
+          f"{', '.join(f'{count} {outcome}' for outcome, count in sorted(report['summary'].items()))}")
+    for path in report['ignored']:
+        print(f"Ignored {path}, written for another shard count")
+    if report['missing_shards']:
+        print(f"Missing results of shards {', '.join(map(str, report['missing_shards']))}")
+    if args.durations:
+        DurationStore(Path(args.durations)).save({record['nodeid']: record['duration']
+                                                  for record in report['results']})
+    if args.push_to_zephyr:
+        from utils.config_loader import ConfigLoader
+        from utils.zephyr_helper import ZephyrHelper
+
+        config = ConfigLoader.load_config(Path(__file__).parent / f'../configs/{args.env}.yaml')['zephyr']
+        cycle_name = args.cycle_name or f"Automation Run {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
+        results = [ExecutionResult(**record) for record in report['results']]
+        ZephyrHelper(config).publish_results(cycle_name, results, args.reuse_cycle,
+                                             config.get('snapshot_dir') or Path(__file__).parent / '../zephyr_snapshots')
+    sys.exit(1 if report['missing_shards'] else 0)
+
+
+if __name__ == '__main__':
+    main()
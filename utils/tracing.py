@@ -0,0 +1,162 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from utils.endpoints import template_endpoint
+from utils.rate_limiter import RateLimiter
+
+EventListener = Callable[[str, Dict[str, Any]], None]
+
+logger = logging.getLogger(__name__)
+
+
+class Tracer:
+    """
+    Process wide request tracing hooks shared by BaseApi, BaseAPIController and ZephyrHelper.
+
+    Every client wraps its send call in `Tracer.trace`, which emits three kinds of events to the
+    subscribed listeners:
+        request_start   before the request is sent
+        response        after a response arrived (status, bytes, ttfb where the client knows it)
+        error           when sending raised
+
+    Each event is a dict with client, method, templated endpoint, url, test nodeid, start time
+    and duration. Time the client spent waiting for the rate limiter before sending is reported
+    as throttled_ms and left out of start time and duration. Every listener gets its own copy,
+    and a listener raising is logged without failing the request. When nobody is subscribed,
+    `trace` only calls `send`.
+    """
+
+    _listeners: List[EventListener] = []
+    current_test: Optional[str] = None
+
+    @classmethod
+    def subscribe(cls, listener: EventListener) -> None:
+        cls._listeners = cls._listeners + [listener]
+
+    @classmethod
+    def unsubscribe(cls, listener: EventListener) -> None:
+        cls._listeners = [item for item in cls._listeners if item is not listener]
+
+    @classmethod
+    def trace(cls, client: str, method: str, url: str, endpoint: str, send: Callable[[], Any],
+              describe: Callable[[Any], Dict[str, Any]]) -> Any:
+        """
+        Send a request and emit its tracing events.
+
+        Args:
+            client (str): Name of the http stack, e.g. `requests`, `playwright`, `zephyr`.
+            method (str): http method.
+            url (str): full request url.
+            endpoint (str): endpoint path, templated before it is emitted.
+            send (Callable): Sends the request and returns the response.
+            describe (Callable): Extracts status, bytes and timings from the response.
+
+        Returns:
+            Any: The response returned by `send`.
+        """
+        listeners = cls._listeners
+        if not listeners:
+            return send()
+        event = {
+            'client': client,
+            'method': method,
+            'endpoint': template_endpoint(endpoint),
+            'url': url,
+            'test': cls.current_test,
+            'thread': threading.get_ident(),
+            'start_ns': time.perf_counter_ns(),
+        }
+        cls._emit(listeners, 'request_start', event)
+        throttled_before = RateLimiter.thread_seconds()
+        try:
+            response = send()
+        except Exception as e:
+            cls._finish(event, throttled_before)
+            event['error'] = repr(e)
+            cls._emit(listeners, 'error', event)
+            raise
+        cls._finish(event, throttled_before)
+        event.update(describe(response))
+        cls._emit(listeners, 'response', event)
+        return response
+
+    @staticmethod
+    def _finish(event: Dict[str, Any], throttled_before: float) -> None:
+        # the rate limiter is waited for before the request goes out, so the request starts after it
+        throttled_ns = round((RateLimiter.thread_seconds() - throttled_before) * 1e9)
+        event['start_ns'] += throttled_ns
+        event['duration_ms'] = (time.perf_counter_ns() - event['start_ns']) / 1e6
+        event['throttled_ms'] = throttled_ns / 1e6
+
+    @staticmethod
+    def _emit(listeners: List[EventListener], kind: str, event: Dict[str, Any]) -> None:
+        for listener in listeners:
+            try:
+                listener(kind, dict(event))
+            except Exception:
+                logger.exception('Tracing listener %r failed on %s event', listener, kind)
+
+
+def describe_requests_response(response) -> Dict[str, Any]:
+    """Status, body size and time to first byte (requests measures up to parsed headers)."""
+    return {
+        'status': response.status_code,
+        'bytes': len(response.content),
+        'ttfb_ms': response.elapsed.total_seconds() * 1000 if response.elapsed else None,
+    }
+
+
+def describe_playwright_response(response) -> Dict[str, Any]:
+    """Status and declared body size; the body itself is not read to keep responses lazy."""
+    content_length = response.headers.get('content-length')
+    return {
+        'status': response.status,
+        'bytes': int(content_length) if content_length else None,
+        'ttfb_ms': None,
+    }
+
+
+class TraceCollector:
+    """
+    In-process listener keeping finished request events and writing them out once per run.
+
+    Output:
+        <path>.json         list of events, one per request
+        <path>.trace.json   Chrome trace format, open in chrome://tracing or ui.perfetto.dev
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.events: List[Dict[str, Any]] = []
+        self._origin_ns = time.perf_counter_ns()
+
+    def __call__(self, kind: str, event: Dict[str, Any]) -> None:
+        if kind != 'request_start':
+            self.events.append(event)
+
+    def write(self) -> Optional[Path]:
+        if not self.events:
+            return None
+        events_path = Path(f'{self.path}.json')
+        events_path.parent.mkdir(parents=True, exist_ok=True)
+        events_path.write_text(json.dumps(self.events, indent=1, default=str))
+        Path(f'{self.path}.trace.json').write_text(json.dumps({'traceEvents': self._chrome_events()}))
+        return events_path
+
+    def _chrome_events(self) -> List[Dict[str, Any]]:
+        pid = os.getpid()
+        return [{
+            'name': f"{event['method']} {event['endpoint']}",
+            'cat': event['client'],
+            'ph': 'X',
+            'ts': (event['start_ns'] - self._origin_ns) / 1000,
+            'dur': event['duration_ms'] * 1000,
+            'pid': pid,
+            'tid': event['thread'],
+            'args': {key: event.get(key) for key in ('status', 'bytes', 'ttfb_ms', 'test', 'url', 'error')},
+        } for event in self.events]
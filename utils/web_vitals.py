@@ -0,0 +1,209 @@
+"""
+Frontend performance metrics of BasePage navigations and tab switches.
+
+When enabled, every page gets an init script with PerformanceObservers for Largest Contentful
+Paint, layout shifts, long tasks and event timing. After `BasePage.navigate` the Navigation Timing
+entry, resource timing, long tasks and the Core Web Vitals (LCP, CLS, INP) of the page are read;
+after `navigate_to_tab` / `navigate_to_sub_page` (client side routing, no new document) the same
+is read for the entries which started during the switch. The measurements of a test travel in its
+teardown report's user_properties and WebVitalsReport aggregates them per page name across the run.
+
+Browsers without an entry type (WebKit has no LCP, layout-shift, longtask or event timing)
+report None for the metrics based on it; budgets ignore None metrics.
+"""
+import statistics
+import threading
+import time
+import weakref
+from dataclasses import asdict, dataclass, field
+from typing import Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from utils.endpoints import template_endpoint
+
+OBSERVER_SCRIPT = """
+(() => {
+    if (window.__webVitals) return;
+    const vitals = window.__webVitals = {lcp: null, layoutShifts: [], longTasks: [], interactions: {}};
+    const observe = (type, callback, options) => {
+        try {
+            new PerformanceObserver(list => list.getEntries().forEach(callback))
+                .observe({type, buffered: true, ...options});
+        } catch (e) {
+            // entry type not supported by this browser
+        }
+    };
+    observe('largest-contentful-paint', entry => { vitals.lcp = entry.renderTime || entry.loadTime || entry.startTime; });
+    observe('layout-shift', entry => { if (!entry.hadRecentInput) vitals.layoutShifts.push([entry.startTime, entry.value]); });
+    observe('longtask', entry => { vitals.longTasks.push([entry.startTime, entry.duration]); });
+    observe('event', entry => {
+        if (entry.interactionId) {
+            vitals.interactions[entry.interactionId] = Math.max(vitals.interactions[entry.interactionId] || 0, entry.duration);
+        }
+    }, {durationThreshold: 16});
+})();
+"""
+
+COLLECT_SCRIPT = """
+since => {
+    const vitals = window.__webVitals;
+    const navigation = since === 0 ? performance.getEntriesByType('navigation')[0] : null;
+    const resources = performance.getEntriesByType('resource').filter(entry => entry.startTime >= since);
+    const slowest = resources.reduce((slowest, entry) => !slowest || entry.duration > slowest.duration ? entry : slowest, null);
+    let cls = null, longTasks = null, inp = null;
+    if (vitals) {
+        // CLS: largest session window of shifts less than 1s apart and at most 5s long
+        let current = 0, first = 0, last = 0;
+        cls = 0;
+        for (const [start, value] of vitals.layoutShifts.filter(([start]) => start >= since)) {
+            if (current && (start - last > 1000 || start - first > 5000)) current = 0;
+            if (!current) first = start;
+            current += value;
+            last = start;
+            cls = Math.max(cls, current);
+        }
+        longTasks = vitals.longTasks.filter(([start]) => start >= since).map(([, duration]) => duration);
+        // INP: the 98th percentile of interaction durations so far, the worst one below 50 interactions
+        const interactions = Object.values(vitals.interactions).sort((a, b) => b - a);
+        inp = interactions.length ? interactions[Math.min(interactions.length - 1, Math.floor(interactions.length / 50))] : null;
+    }
+    return {
+        lcp_ms: since === 0 && vitals ? vitals.lcp : null,
+        cls: cls,
+        inp_ms: inp,
+        ttfb_ms: navigation ? navigation.responseStart : null,
+        dom_content_loaded_ms: navigation ? navigation.domContentLoadedEventEnd : null,
+        load_ms: navigation && navigation.loadEventEnd ? navigation.loadEventEnd : null,
+        long_tasks: longTasks ? longTasks.length : null,
+        long_task_ms: longTasks ? longTasks.reduce((total, duration) => total + duration, 0) : null,
+        resources: resources.length,
+        transfer_bytes: resources.reduce((total, entry) => total + (entry.transferSize || 0), 0),
+        slowest_resource: slowest ? slowest.name : null,
+        slowest_resource_ms: slowest ? slowest.duration : null,
+    };
+}
+"""
+
+BUDGET_METRICS = ('duration_ms', 'lcp_ms', 'cls', 'inp_ms', 'ttfb_ms', 'load_ms', 'long_task_ms', 'transfer_bytes')
+
+
+@dataclass
+class PageMetrics:
+    name: str
+    kind: str  # navigation, tab or sub page
+    duration_ms: float  # of the BasePage call, as seen by the test
+    values: Dict[str, Optional[float]] = field(default_factory=dict)
+
+    def get(self, metric: str) -> Optional[float]:
+        return self.duration_ms if metric == 'duration_ms' else self.values.get(metric)
+
+    def over_budget(self, **budget: Optional[float]) -> Dict[str, float]:
+        """Metrics above their budget, {metric: measured value}; metrics not measured are ignored."""
+        unknown = set(budget) - set(BUDGET_METRICS)
+        if unknown:
+            raise ValueError(f"Unknown budget metrics {sorted(unknown)}, expected some of {BUDGET_METRICS}")
+        return {metric: self.get(metric) for metric, limit in budget.items()
+                if limit is not None and self.get(metric) is not None and self.get(metric) > limit}
+
+
+class WebVitals:
+    """
+    Process wide collector of page performance metrics, used by BasePage.
+
+    Disabled by default; `measure` then only runs the action. Measurements are kept until `take`
+    hands them over to the report of the running test.
+    """
+
+    enabled: bool = False
+    _installed: 'weakref.WeakSet' = weakref.WeakSet()
+    _last: 'weakref.WeakKeyDictionary' = weakref.WeakKeyDictionary()
+    _pending: List[PageMetrics] = []
+    _lock = threading.Lock()
+
+    @classmethod
+    def configure(cls, enabled: bool) -> None:
+        cls.enabled = enabled
+
+    @classmethod
+    def measure(cls, page, name: str, kind: str, action: Callable[[], None]) -> Optional[PageMetrics]:
+        """
+        Run a navigation or tab switch and record the page metrics it produced.
+
+        Args:
+            page: Playwright page.
+            name (str): Page or tab name the metrics are aggregated under.
+            kind (str): `navigation` for a new document, otherwise metrics only cover entries
+                which started during the action.
+            action (Callable): Performs the navigation.
+
+        Returns:
+            Optional[PageMetrics]: The measurement, None when disabled.
+        """
+        if not cls.enabled:
+            action()
+            return None
+        if page not in cls._installed:
+            page.add_init_script(OBSERVER_SCRIPT)
+            cls._installed.add(page)
+        since = 0 if kind == 'navigation' else page.evaluate('performance.now()')
+        start = time.perf_counter()
+        action()
+        metrics = PageMetrics(name, kind, round((time.perf_counter() - start) * 1000, 1),
+                              page.evaluate(COLLECT_SCRIPT, since))
+        with cls._lock:
+            cls._pending.append(metrics)
+        cls._last[page] = metrics
+        return metrics
+
+    @classmethod
+    def last(cls, page) -> Optional[PageMetrics]:
+        """The latest measurement taken on a page."""
+        return cls._last.get(page)
+
+    @classmethod
+    def take(cls) -> List[dict]:
+        """Measurements taken since the last call, as plain dicts for a report's user_properties."""
+        with cls._lock:
+            pending, cls._pending = cls._pending, []
+        return [asdict(metrics) for metrics in pending]
+
+
+class WebVitalsReport:
+    """
+    Pytest plugin aggregating the page metrics of every test from the reports' user_properties.
+
+    Works from reports, so the xdist controller sees the measurements of all workers.
+    """
+
+    def __init__(self):
+        self.samples: Dict[str, List[PageMetrics]] = {}
+
+    def pytest_runtest_logreport(self, report):
+        if report.when != 'teardown':
+            return
+        for measurement in dict(report.user_properties).get('web_vitals', []):
+            metrics = PageMetrics(**measurement)
+            self.samples.setdefault(metrics.name, []).append(metrics)
+
+    def summary(self) -> Dict[str, Dict[str, Optional[float]]]:
+        """p75 (the Core Web Vitals assessment percentile) of every metric per page name, plus the count."""
+        summary = {}
+        for name, metrics in self.samples.items():
+            summary[name] = {'count': len(metrics)}
+            for metric in BUDGET_METRICS:
+                values = [sample.get(metric) for sample in metrics if sample.get(metric) is not None]
+                summary[name][metric] = _p75(values)
+        return summary
+
+
+def page_name(url: str) -> str:
+    """Host and templated path of a url, e.g. `app.example.com/groups/{uuid}`."""
+    return urlparse(url).netloc + template_endpoint(url)
+
+
+def _p75(values: List[float]) -> Optional[float]:
+    if not values:
+        return None
+    if len(values) == 1:
+        return round(values[0], 3)
+    return round(statistics.quantiles(values, n=4, method='inclusive')[2], 3)
@@ -3,8 +3,16 @@ import hashlib
 import time
 import requests
 import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable, Optional
 from urllib.parse import urlencode, urlparse, parse_qsl
 
+from utils.rate_limiter import RateLimiter
+from utils.resilience import ResiliencePolicy
+from utils.tracing import Tracer, describe_requests_response
+from utils.zephyr_snapshot import ZephyrSnapshot
+
 
 class ZephyrHelper:
     """
@@ -20,6 +28,10 @@ class ZephyrHelper:
         self.jwt_expire = 3600
         self.base_url = self.zephyr_config['zephyr_base_url']
         self.base_api_path = self.zephyr_config['zephyr_api_path']
+        self.resilience = ResiliencePolicy.from_config(self.zephyr_config.get('resilience'))
+        self.execution_page_size = self.zephyr_config.get('execution_page_size') or 50
+        self.execution_page_workers = self.zephyr_config.get('execution_page_workers') or 8
+        self.missing_executions = []
 
     def generate_jwt_token(self, canonical_path: str, method: str) -> str:
         """
@@ -78,6 +90,28 @@ class ZephyrHelper:
             'zapiAccessKey': self.access_key
         }
 
+    def _send(self, method: str, url: str, canonical_path: str, **kwargs) -> requests.Response:
+        """
+        Send an API request, emitting request tracing events and retrying transient failures.
+
+        Args:
+            method (str): The HTTP method of the API request.
+            url (str): The full url of the API request.
+            canonical_path (str): The canonical path, used as the traced endpoint.
+            **kwargs: Passed to requests.request.
+
+        Returns:
+            requests.Response: The response from the API.
+        """
+        def send():
+            RateLimiter.acquire(url)
+            return requests.request(method, url, **kwargs)
+
+        traced_send = lambda: Tracer.trace('zephyr', method, url, canonical_path, send, describe_requests_response)
+        if self.resilience is None:
+            return traced_send()
+        return self.resilience.call(method, url, traced_send)
+
     def get_test_cycles(self, project_id: str) -> requests.Response:
         """
         Get the test cycles for the given project ID.
@@ -89,12 +123,29 @@ class ZephyrHelper:
             requests.Response: The response from the API.
         """
         method = 'GET'
-        endpoint = f'cycles/search?projectId={project_id}&versionId=21132'
+        endpoint = f'cycles/search?projectId={project_id}&versionId={self.version_id}'
         canonical_path = self.base_api_path + endpoint
         url = self.base_url + canonical_path
-        response = requests.get(url, headers=self.headers(canonical_path, method))
+        response = self._send(method, url, canonical_path, headers=self.headers(canonical_path, method))
         return response
 
+    def find_test_cycle(self, cycle_name: str) -> Optional[dict]:
+        """
+        Find an existing test cycle of the configured project and version by name.
+
+        Args:
+            cycle_name (str): The name of the test cycle.
+
+        Returns:
+            Optional[dict]: The cycle, None if the version has no cycle with that name.
+
+        Raises:
+            requests.exceptions.RequestException: If there was an error making the API request.
+        """
+        response = self.get_test_cycles(self.project_id)
+        response.raise_for_status()
+        return next((cycle for cycle in response.json() if cycle.get('name') == cycle_name), None)
+
     def create_test_cycle(self, cycle_name: str) -> dict:
         """
         Create a new test cycle with the given name.
@@ -124,7 +175,7 @@ class ZephyrHelper:
                 "projectId": self.project_id,
                 "versionId": self.version_id
             }
-            response = requests.post(url, headers=self.headers(canonical_path, method), json=payload)
+            response = self._send(method, url, canonical_path, headers=self.headers(canonical_path, method), json=payload)
             response.raise_for_status()
             return response.json()
         except requests.exceptions.RequestException as e:
@@ -155,7 +206,7 @@ class ZephyrHelper:
                 "projectId": self.project_id,
                 "versionId": -1,
             }
-            response = requests.post(url, headers=self.headers(canonical_path, method), json=payload)
+            response = self._send(method, url, canonical_path, headers=self.headers(canonical_path, method), json=payload)
             response.raise_for_status()
             return response.content
         except requests.exceptions.RequestException as e:
@@ -165,6 +216,9 @@ class ZephyrHelper:
         """
         Get the executions for the given test cases in the test cycle with the given ID.
 
+        The first page gives the total count, the remaining pages are fetched concurrently.
+        Requested test cases without an execution are kept in `missing_executions`.
+
         Args:
             cycle_id (str): The ID of the test cycle.
             issue_ids (list): The IDs of the test cases.
@@ -176,20 +230,35 @@ class ZephyrHelper:
             requests.exceptions.RequestException: If there was an error making the API request.
         """
         try:
-            method = "GET"
-            endpoint = f'executions/search/cycle/{cycle_id}?projectId={self.project_id}&versionId={self.version_id}'
-            canonical_path = self.base_api_path + endpoint
-            url = self.base_url + canonical_path
-            response = requests.get(url, headers=self.headers(canonical_path, method))
-            response.raise_for_status()
-            executions = response.json()['searchObjectList']
+            wanted = set(issue_ids)
+            first_page = self._get_executions_page(cycle_id, 0)
+            pages = [first_page]
+            offsets = range(self.execution_page_size, first_page.get('totalCount', 0), self.execution_page_size)
+            if offsets:
+                with ThreadPoolExecutor(max_workers=self.execution_page_workers) as executor:
+                    pages.extend(executor.map(lambda offset: self._get_executions_page(cycle_id, offset), offsets))
             execution_dict = {execution['issueKey']: (execution['execution']['id'], execution['execution']['issueId'])
-                              for execution in executions if execution['issueKey'] in issue_ids}
+                              for page in pages for execution in page['searchObjectList']
+                              if execution['issueKey'] in wanted}
+            self.missing_executions = sorted(wanted.difference(execution_dict))
+            if self.missing_executions:
+                print(f"No execution in cycle {cycle_id} for: {', '.join(self.missing_executions)}")
             return execution_dict
         except requests.exceptions.RequestException as e:
             raise e
 
-    def update_test_results(self, issue_execution_tuple: tuple, cycle_id: str, status_id: int, comment=None):
+    def _get_executions_page(self, cycle_id: str, offset: int) -> dict:
+        method = "GET"
+        endpoint = (f'executions/search/cycle/{cycle_id}?projectId={self.project_id}&versionId={self.version_id}'
+                    f'&offset={offset}&size={self.execution_page_size}')
+        canonical_path = self.base_api_path + endpoint
+        url = self.base_url + canonical_path
+        response = self._send(method, url, canonical_path, headers=self.headers(canonical_path, method))
+        response.raise_for_status()
+        return response.json()
+
+    def update_test_results(self, issue_execution_tuple: tuple, cycle_id: str, status_id: int, comment=None,
+                            attempts: int = 1):
         """
         Update the test results for the given execution and status.
 
@@ -198,6 +267,7 @@ class ZephyrHelper:
             cycle_id (str): The ID of the test cycle.
             status_id (str): The ID of the status.
             comment (str, optional): The comment to include in the request. Defaults to None.
+            attempts (int, optional): Number of times the test ran in this session, including reruns. Defaults to 1.
 
         Returns:
             None
@@ -212,6 +282,9 @@ class ZephyrHelper:
             canonical_path = f'{self.base_api_path}{endpoint}'
 
             url = self.base_url + canonical_path
+            comment = "Failed due to: " + comment if comment else "Automation execution"
+            if attempts > 1:
+                comment = f"{comment} (attempt {attempts})"
 
             payload = {
                 "status": {"id": status_id},
@@ -220,11 +293,11 @@ class ZephyrHelper:
                 "issueId": issue_id,
                 "cycleId": cycle_id,
                 "versionId": -1,
-                "comment": "Failed due to: " + comment if comment else "Automation execution",
+                "comment": comment,
                 "assigneeType": "currentUser",
                 "assignee": "712020:e75707b5-5bb4-417a-80ee-a53f4333792d"
             }
-            response = requests.put(url, headers=self.headers(canonical_path, method), json=payload)
+            response = self._send(method, url, canonical_path, headers=self.headers(canonical_path, method), json=payload)
             response.raise_for_status()
         except requests.exceptions.RequestException as e:
             print(f'RequestException: {e}')
@@ -263,8 +336,9 @@ class ZephyrHelper:
             headers.pop('Content-Type', None)
 
             with open(file_path, 'rb') as file:
-                files = {'file': (os.path.basename(file_path), file)}
-                response = requests.post(url, headers=headers, files=files)
+                # Read into memory so a retried request sends the whole file again
+                files = {'file': (os.path.basename(file_path), file.read())}
+                response = self._send(method, url, canonical_path, headers=headers, files=files)
 
             response.raise_for_status()
             return response.json()
@@ -272,3 +346,72 @@ class ZephyrHelper:
             if e.response:
                 raise f'Response content: {e.response.content}'
             raise f'Failed to upload attachment. RequestException: {e}'
+
+    def publish_results(self, cycle_name: str, results: Iterable, reuse_cycle: bool = False,
+                        snapshot_dir: Optional[Path] = None) -> None:
+        """
+        Publish test results into a test cycle.
+
+        Results of the same test case (e.g. one test per browser, possibly run on different shards)
+        are published once, failed if any of them failed. With `reuse_cycle` the existing cycle of
+        that name is used: only statuses changed since the last publication are sent, and a test's
+        screenshot is uploaded once per status of its execution.
+
+        Args:
+            cycle_name (str): The name of the test cycle to create or reuse.
+            results (Iterable): ExecutionResult records; those without a test case key are ignored.
+            reuse_cycle (bool): Publish into the existing cycle of that name.
+            snapshot_dir (Path, optional): Directory of the published state snapshots, used with reuse_cycle.
+
+        Returns:
+            None
+        """
+        by_case = {}
+        for result in results:
+            if result.test_case_key:
+                by_case.setdefault(result.test_case_key, []).append(result)
+        reused_cycle = self.find_test_cycle(cycle_name) if reuse_cycle else None
+        new_cycle = reused_cycle or self.create_test_cycle(cycle_name)
+
+        if not new_cycle:
+            print("Failed to create or retrieve test cycle.")
+            return
+
+        cycle_id = new_cycle['id']
+        issue_ids = list(by_case)
+        if not issue_ids:
+            return
+        execution_ids = self.get_executions_by_cycle(cycle_id, issue_ids) if reused_cycle else {}
+        new_issue_ids = self.missing_executions if reused_cycle else issue_ids
+        if new_issue_ids:
+            add_cases_response = self.add_test_case_to_cycle(cycle_id, new_issue_ids)
+            if not add_cases_response:
+                print("Failed to add test cases to the cycle.")
+                return
+            execution_ids.update(self.get_executions_by_cycle(cycle_id, new_issue_ids))
+
+        snapshot = ZephyrSnapshot.for_cycle(snapshot_dir, cycle_id) if reuse_cycle and snapshot_dir else None
+        for test_case_key, case_results in by_case.items():
+            execution_id = execution_ids.get(test_case_key)
+            outcomes = [result.outcome for result in case_results if result.outcome]
+            if not execution_id or not outcomes:
+                continue
+            status = 1 if all(outcome == 'passed' for outcome in outcomes) else 2  # 1 for pass, 2 for fail
+            comment = '\n'.join(result.comment for result in case_results if result.comment) or None
+            if snapshot is None or snapshot.status_changed(execution_id[0], status):
+                self.update_test_results(execution_id, cycle_id, status, comment,
+                                         max(result.attempts for result in case_results))
+                if snapshot:
+                    snapshot.record_status(execution_id[0], status)
+
+            for result in [result for result in case_results if result.screenshot]:
+                if snapshot is None:
+                    self.upload_attachment(str(result.screenshot), execution_id, cycle_id)
+                elif snapshot.new_attachment(execution_id[0], result.nodeid):
+                    self.upload_attachment(str(result.screenshot), execution_id, cycle_id)
+                    snapshot.record_attachment(execution_id[0], result.nodeid)
+        if snapshot:
+            snapshot.save()
+            stats = snapshot.stats
+            print(f"Zephyr delta sync: {stats.statuses_sent} statuses sent, {stats.statuses_unchanged} unchanged, "
+                  f"{stats.attachments_sent} attachments uploaded, {stats.attachments_unchanged} unchanged")
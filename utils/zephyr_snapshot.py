@@ -0,0 +1,65 @@
+import json
+import os
+from dataclasses import dataclass
+from pathlib import Path
+
+
+@dataclass
+class SyncStats:
+    statuses_sent: int = 0
+    statuses_unchanged: int = 0
+    attachments_sent: int = 0
+    attachments_unchanged: int = 0
+
+
+class ZephyrSnapshot:
+    """
+    Last published status and attachments per execution of one Zephyr cycle.
+
+    Kept on disk between runs, so publishing into a reused cycle only sends statuses which
+    changed. Screenshots are taken anew on every run and never have equal bytes, so attachments
+    are keyed by the test node which produced them: a node's screenshot is uploaded once per
+    status of the execution, and again after the status changed.
+
+    File: <directory>/<cycle_id>.json
+        {"<execution_id>": {"status": 2, "attachments": ["<test nodeid>", ...]}}
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.stats = SyncStats()
+        self.executions = json.loads(path.read_text()) if path.exists() else {}
+
+    @classmethod
+    def for_cycle(cls, directory: str, cycle_id: str) -> 'ZephyrSnapshot':
+        return cls(Path(directory) / f'{cycle_id}.json')
+
+    def status_changed(self, execution_id: str, status: int) -> bool:
+        changed = self.executions.get(execution_id, {}).get('status') != status
+        if not changed:
+            self.stats.statuses_unchanged += 1
+        return changed
+
+    def record_status(self, execution_id: str, status: int) -> None:
+        execution = self.executions.setdefault(execution_id, {})
+        if execution.get('status') != status:
+            execution['attachments'] = []
+        execution['status'] = status
+        self.stats.statuses_sent += 1
+
+    def new_attachment(self, execution_id: str, nodeid: str) -> bool:
+        """Whether the execution has no attachment of this test node since its status last changed."""
+        if nodeid in self.executions.get(execution_id, {}).get('attachments', []):
+            self.stats.attachments_unchanged += 1
+            return False
+        return True
+
+    def record_attachment(self, execution_id: str, nodeid: str) -> None:
+        self.executions.setdefault(execution_id, {}).setdefault('attachments', []).append(nodeid)
+        self.stats.attachments_sent += 1
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix('.tmp')
+        temp_path.write_text(json.dumps(self.executions, indent=1))
+        os.replace(temp_path, self.path)